@@ -0,0 +1,2 @@
+from .circuits import GENERATORS, Benchmark
+from .run import PHASES, compare, run
@@ -0,0 +1,39 @@
+import argparse
+import json
+import sys
+
+from .circuits import GENERATORS
+from .run import compare, run
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Time circuit_simulator on generated circuits")
+    parser.add_argument("--generators", nargs="+", default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 1000, 10000], help="approximate node counts")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--frequencies", type=int, default=16, help="points per sweep")
+    parser.add_argument("--backend", default="auto", choices=["auto", "dense", "sparse"])
+    parser.add_argument("--output", help="write the JSON results here")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = run(args.generators, args.sizes, args.repeat, args.frequencies, args.backend, log=print)
+    failed = [result for result in results["results"] if not result["accuracy"]["passed"]]
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        results["comparison"] = compare(results, baseline, args.threshold)
+        for row in results["comparison"]:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(f"{row['generator']:>13} {row['nodes']:>7} {row['phase']:>15} x{row['ratio']:.2f} {flag}")
+        failed += [row for row in results["comparison"] if row["regression"]]
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
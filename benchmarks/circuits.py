@@ -0,0 +1,118 @@
+import typing
+import numpy as np
+
+from circuit_simulator.circuit import Circuit
+import circuit_simulator.components as Component
+
+class Benchmark(typing.NamedTuple):
+    # A generated circuit with the probes the timings use. reference(s_values) is the
+    # exact transfer function input -> output, or None when only invariants are checked.
+    name: str
+    nodes: int
+    circuit: Circuit
+    ground: str
+    input: typing.Tuple[str, str]
+    output: typing.Tuple[str, str]
+    s: complex
+    frequencies: np.ndarray
+    reference: typing.Optional[typing.Callable[[np.ndarray], np.ndarray]]
+
+def chain(series: np.ndarray, shunt: np.ndarray, sections: int) -> np.ndarray:
+    # Unloaded output over input of identical series/shunt sections, from the ABCD matrix
+    section = np.zeros(shape=series.shape + (2, 2), dtype=complex)
+    section[..., 0, 0] = 1 + series * shunt
+    section[..., 0, 1] = series
+    section[..., 1, 0] = shunt
+    section[..., 1, 1] = 1
+    return 1 / np.linalg.matrix_power(section, sections)[..., 0, 0]
+
+def ladder(sections: int, resistance: float, capacitance: float, inductance: float = 0) -> Circuit:
+    circuit = Circuit()
+    components: typing.List[Component.Component] = [Component.VoltageSource("V1", "n0", "0", 1)]
+    for k in range(1, sections + 1):
+        node = f"n{k}"
+        if inductance:
+            components.append(Component.Resistor(f"R{k}", f"n{k - 1}", f"m{k}", resistance))
+            components.append(Component.Inductor(f"L{k}", f"m{k}", node, inductance))
+        else:
+            components.append(Component.Resistor(f"R{k}", f"n{k - 1}", node, resistance))
+        components.append(Component.Capacitor(f"C{k}", node, "0", capacitance))
+    circuit.add_components(components)
+    return circuit
+
+def rc_ladder(nodes: int, frequencies: int = 16) -> Benchmark:
+    sections = max(1, nodes - 1)
+    r, c = 1e3, 1e-9
+    # Around the ladder's first pole so the response is neither flat nor vanishing
+    scale = 1 / (sections ** 2 * r * c)
+    return Benchmark("rc_ladder", nodes, ladder(sections, r, c), "0", ("V1", "Voltage"), (f"C{sections}", "Voltage"),
+                     1j * scale, 1j * scale * np.logspace(-2, 1, frequencies),
+                     lambda s: chain(r + 0 * s, s * c, sections))
+
+def rlc_ladder(nodes: int, frequencies: int = 16) -> Benchmark:
+    sections = max(1, (nodes - 1) // 2)
+    r, l, c = 1.0, 1e-6, 1e-9
+    scale = 1 / (sections * np.sqrt(l * c))
+    return Benchmark("rlc_ladder", nodes, ladder(sections, r, c, l), "0", ("V1", "Voltage"), (f"C{sections}", "Voltage"),
+                     1j * scale, 1j * scale * np.logspace(-2, 0, frequencies),
+                     lambda s: chain(r + s * l, s * c, sections))
+
+def mesh(nodes: int, frequencies: int = 16) -> Benchmark:
+    # Square resistor grid driven corner to corner; resistive, so checked by invariants only
+    side = max(2, int(round(np.sqrt(nodes))))
+    circuit = Circuit()
+    components: typing.List[Component.Component] = []
+    for i in range(side):
+        for j in range(side):
+            if j + 1 < side:
+                components.append(Component.Resistor(f"Rh{i}_{j}", f"m{i}_{j}", f"m{i}_{j + 1}", 1.0))
+            if i + 1 < side:
+                components.append(Component.Resistor(f"Rv{i}_{j}", f"m{i}_{j}", f"m{i + 1}_{j}", 1.0))
+    last = f"m{side - 1}_{side - 1}"
+    components.append(Component.CurrentSource("I1", last, "m0_0", 1))
+    circuit.add_components(components)
+    return Benchmark("mesh", side * side, circuit, last, ("I1", "Voltage"), ("Rh0_0", "Voltage"),
+                     1j, 1j * np.logspace(0, 3, frequencies), None)
+
+def multi_source(nodes: int, frequencies: int = 16, sources: int = 8) -> Benchmark:
+    # RC ladder with resistive shunts and current sources spread along it
+    sections = max(sources, nodes - 1)
+    r, c = 1e3, 1e-9
+    circuit = Circuit()
+    components: typing.List[Component.Component] = [Component.Resistor("R0", "n0", "0", r)]
+    for k in range(1, sections + 1):
+        components.append(Component.Resistor(f"R{k}", f"n{k - 1}", f"n{k}", r))
+        components.append(Component.Capacitor(f"C{k}", f"n{k}", "0", c))
+        components.append(Component.Resistor(f"S{k}", f"n{k}", "0", 100 * r))
+    for i, k in enumerate(np.linspace(1, sections, sources).astype(int)):
+        components.append(Component.CurrentSource(f"I{i + 1}", "0", f"n{k}", i + 1))
+    circuit.add_components(components)
+    scale = 1 / (sections ** 2 * r * c)
+    return Benchmark("multi_source", nodes, circuit, "0", ("I1", "Voltage"), (f"C{sections}", "Voltage"),
+                     1j * scale, 1j * scale * np.logspace(-2, 1, frequencies), None)
+
+def amplifier(nodes: int, frequencies: int = 16) -> Benchmark:
+    # Alternating VCCS stages (R || C load) and unit CCVS buffers
+    stages = max(1, nodes // 2)
+    gm, r, c, rt = 1e-3, 1e3, 1e-9, 1.0
+    circuit = Circuit()
+    components: typing.List[Component.Component] = [Component.VoltageSource("V1", "b0", "0", 1)]
+    for k in range(1, stages + 1):
+        components.append(Component.VoltageControlledCurrentSource(f"G{k}", f"a{k}", "0", f"b{k - 1}", "0", gm))
+        components.append(Component.Resistor(f"R{k}", f"a{k}", "0", r))
+        components.append(Component.Capacitor(f"C{k}", f"a{k}", "0", c))
+        components.append(Component.CurrentControlledVoltageSource(f"H{k}", f"b{k}", "0", f"a{k}", "0", rt))
+    circuit.add_components(components)
+    # Keeps |H| above e^-1 however many stages there are
+    scale = 1 / (r * c * np.sqrt(stages))
+    return Benchmark("amplifier", nodes, circuit, "0", ("V1", "Voltage"), (f"R{stages}", "Voltage"),
+                     1j * scale, 1j * scale * np.logspace(-2, 0, frequencies),
+                     lambda s: (-gm / (1 / r + s * c)) ** stages * rt ** (stages - 1))
+
+GENERATORS: typing.Dict[str, typing.Callable[..., Benchmark]] = {
+    "rc_ladder": rc_ladder,
+    "rlc_ladder": rlc_ladder,
+    "mesh": mesh,
+    "multi_source": multi_source,
+    "amplifier": amplifier,
+}
@@ -0,0 +1,160 @@
+import datetime
+import importlib.metadata
+import platform
+import statistics
+import time
+import typing
+import numpy as np
+
+from circuit_simulator.backends import select_backend
+from .circuits import GENERATORS, Benchmark
+
+PHASES: typing.List[str] = ["assembly", "factorization", "solve", "circuit_solve", "post_processing", "sweep", "bode"]
+
+def version() -> typing.Optional[str]:
+    try:
+        return importlib.metadata.version("circuit_simulator")
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+def timed(function: typing.Callable[[], typing.Any]) -> typing.Tuple[float, typing.Any]:
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def summary(runs: typing.List[float]) -> typing.Dict[str, typing.Any]:
+    return {"median": statistics.median(runs), "min": min(runs), "runs": runs}
+
+def assemble(bench: Benchmark):
+    # A fresh plan every time: node indexing, stamps and per-term systems from scratch
+    circuit = bench.circuit
+    circuit.plan = None
+    plan = circuit.compile()
+    coefficients = plan.coefficients()
+    assembled = []
+    for system in plan.systems(bench.ground):
+        backend = select_backend(circuit.backend, system.size)
+        values = system.matrix.values(coefficients, bench.s)
+        assembled.append((system, backend, backend.assemble(system, values), system.currents(coefficients, bench.s)))
+    return assembled
+
+def profile(bench: Benchmark, repeat: int) -> typing.Dict[str, typing.Any]:
+    circuit = bench.circuit
+    runs: typing.Dict[str, typing.List[float]] = {phase: [] for phase in PHASES}
+    tf = circuit.transfer_function(bench.ground, bench.input, bench.output)
+    tf.resolution = bench.frequencies.size
+    tf.imag_range = (bench.frequencies[0].imag, bench.frequencies[-1].imag)
+
+    for _ in range(repeat):
+        elapsed, assembled = timed(lambda: assemble(bench))
+        runs["assembly"].append(elapsed)
+        elapsed, factors = timed(lambda: [backend.factorize(system, matrix) for system, backend, matrix, _ in assembled])
+        runs["factorization"].append(elapsed)
+        runs["solve"].append(timed(lambda: [f.solve(rhs) for f, (_, _, _, rhs) in zip(factors, assembled)])[0])
+
+        runs["circuit_solve"].append(timed(lambda: circuit.solve(bench.ground, sweep=bench.s))[0])
+        runs["post_processing"].append(timed(lambda: circuit.table())[0])
+        runs["sweep"].append(timed(lambda: circuit.sweep(bench.ground, bench.frequencies, bench.output))[0])
+        # The data path behind plot_bode, without drawing
+        runs["bode"].append(timed(lambda: tf.sample_bode(log=True))[0])
+
+    plan = circuit.compile()
+    systems = plan.systems(bench.ground)
+    return {
+        "generator": bench.name,
+        "nodes": bench.nodes,
+        "unknowns": plan.n,
+        "systems": len(systems),
+        "entries": int(sum(system.matrix.rows.size for system in systems)),
+        "frequencies": int(bench.frequencies.size),
+        "phases": {phase: summary(values) for phase, values in runs.items()},
+        "accuracy": accuracy(bench),
+    }
+
+def accuracy(bench: Benchmark, tolerance: float = 1e-6) -> typing.Dict[str, typing.Any]:
+    # Exact transfer functions where the generator has one; Tellegen's theorem
+    # (complex power sums to zero over all components) everywhere
+    circuit = bench.circuit
+    checks: typing.Dict[str, typing.Any] = dict()
+    if bench.reference is not None:
+        tf = circuit.transfer_function(bench.ground, bench.input, bench.output)
+        expected = bench.reference(bench.frequencies)
+        checks["transfer_function"] = float(np.max(np.abs(tf.f(bench.frequencies) - expected) / np.abs(expected)))
+
+    circuit.solve(bench.ground, sweep=bench.s)
+    power = circuit.results().power
+    checks["power_balance"] = float(np.abs(power.sum()) / max(np.abs(power).sum(), np.finfo(float).tiny))
+    checks["passed"] = all(error <= tolerance for error in checks.values())
+    return checks
+
+def exponents(results: typing.List[typing.Dict[str, typing.Any]]) -> typing.Dict[str, typing.Dict[str, float]]:
+    # Log-log slope of median time against node count, per generator and phase
+    scaling: typing.Dict[str, typing.Dict[str, float]] = dict()
+    for name in dict.fromkeys(result["generator"] for result in results):
+        members = [result for result in results if result["generator"] == name]
+        if len(members) < 2:
+            continue
+        nodes = np.log([result["nodes"] for result in members])
+        scaling[name] = dict()
+        for phase in PHASES:
+            times = np.log([max(result["phases"][phase]["median"], 1e-9) for result in members])
+            scaling[name][phase] = float(np.polyfit(nodes, times, 1)[0])
+    return scaling
+
+def run(generators: typing.List[str], sizes: typing.List[int], repeat: int = 3, frequencies: int = 16,
+        backend: str = "auto", log: typing.Optional[typing.Callable[[str], None]] = None) -> typing.Dict[str, typing.Any]:
+    results = []
+    for name in generators:
+        assert name in GENERATORS, f"Unknown generator '{name}'"
+        for size in sizes:
+            bench = GENERATORS[name](size, frequencies)
+            bench.circuit.backend = backend
+            results.append(profile(bench, repeat))
+            if log is not None:
+                log(line(results[-1]))
+
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "backend": backend,
+            "repeat": repeat,
+            "package": version(),
+        },
+        "results": results,
+        "scaling": exponents(results),
+    }
+
+def line(result: typing.Dict[str, typing.Any]) -> str:
+    phases = " ".join(f"{phase}={result['phases'][phase]['median'] * 1e3:.2f}ms" for phase in PHASES)
+    status = "ok" if result["accuracy"]["passed"] else "INACCURATE"
+    return f"{result['generator']:>13} {result['nodes']:>7} {status:<10} {phases}"
+
+def compare(current: typing.Dict[str, typing.Any], baseline: typing.Dict[str, typing.Any],
+            threshold: float = 1.25, floor: float = 1e-4) -> typing.List[typing.Dict[str, typing.Any]]:
+    # Median time ratios against a saved run for every (generator, nodes) both contain.
+    # Phases faster than floor seconds in the baseline are too noisy to flag.
+    previous = {(result["generator"], result["nodes"]): result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        old = previous.get((result["generator"], result["nodes"]))
+        if old is None:
+            continue
+        for phase in PHASES:
+            before = old["phases"].get(phase, {}).get("median")
+            after = result["phases"][phase]["median"]
+            if before is None:
+                continue
+            ratio = after / before if before > 0 else float("inf")
+            rows.append({
+                "generator": result["generator"],
+                "nodes": result["nodes"],
+                "phase": phase,
+                "baseline": before,
+                "current": after,
+                "ratio": ratio,
+                "regression": ratio > threshold and before >= floor,
+            })
+    return rows
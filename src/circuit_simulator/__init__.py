@@ -1,3 +1,4 @@
 from .circuit import Circuit
 from .components import *
 from .graphical import ComplexFunction
+from .subcircuit import Subcircuit
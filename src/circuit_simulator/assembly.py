@@ -0,0 +1,328 @@
+import typing
+import numpy as np
+
+from . import components as Component
+from . import profiling
+from .store import ComponentTable, Store
+
+class Entries(typing.NamedTuple):
+    # COO layout of a group of stamps. cols is None for right-hand side entries.
+    rows: np.ndarray
+    cols: typing.Optional[np.ndarray]
+    signs: np.ndarray
+    orders: np.ndarray
+    slots: np.ndarray
+
+    def values(self, coefficients: np.ndarray, s: complex) -> np.ndarray:
+        return self.signs * coefficients[self.slots] * np.power(complex(s), self.orders)
+
+    def substitute(self, slot: int) -> "Entries":
+        # Entries whose coefficient is s itself become unit entries one order higher
+        mask = self.slots == slot
+        return self._replace(orders=self.orders + mask, slots=np.where(mask, 0, self.slots))
+
+    def select(self, mask: np.ndarray) -> "Entries":
+        return Entries(
+            rows=self.rows[mask],
+            cols=None if self.cols is None else self.cols[mask],
+            signs=self.signs[mask],
+            orders=self.orders[mask],
+            slots=self.slots[mask],
+        )
+
+    def restrict(self, mapping: np.ndarray, col_mapping: typing.Optional[np.ndarray] = None) -> "Entries":
+        # Renumber into a reduced index space, dropping entries on removed unknowns
+        col_mapping = mapping if col_mapping is None else col_mapping
+        mask = mapping[self.rows] >= 0
+        if self.cols is not None:
+            mask &= col_mapping[self.cols] >= 0
+        return Entries(
+            rows=mapping[self.rows[mask]],
+            cols=None if self.cols is None else col_mapping[self.cols[mask]],
+            signs=self.signs[mask],
+            orders=self.orders[mask],
+            slots=self.slots[mask],
+        )
+
+    @staticmethod
+    def concat(groups: typing.List["Entries"]) -> "Entries":
+        return Entries(
+            rows=np.concatenate([g.rows for g in groups]),
+            cols=None if groups[0].cols is None else np.concatenate([g.cols for g in groups]),
+            signs=np.concatenate([g.signs for g in groups]),
+            orders=np.concatenate([g.orders for g in groups]),
+            slots=np.concatenate([g.slots for g in groups]),
+        )
+
+def empty(with_cols: bool) -> Entries:
+    nothing = np.zeros(0, dtype=np.int64)
+    return Entries(nothing, nothing if with_cols else None, np.zeros(0), nothing, nothing)
+
+class Term(typing.NamedTuple):
+    # One superposition term: an active component with every passive component.
+    component: Component.Component
+    matrix: Entries
+    rhs: Entries
+    live: np.ndarray
+
+class System:
+    # A superposition term (or the passive network alone when term is None)
+    # with ground and unused unknowns removed
+    def __init__(self, term: typing.Optional[Term], keep: np.ndarray, matrix: Entries, rhs: Entries) -> None:
+        self.term = term
+        self.keep = keep
+        self.size: int = keep.size
+        self.matrix = matrix
+        self.rhs = rhs
+
+        # Filled in lazily by the backends and reused while the topology is unchanged
+        self.buffer: typing.Optional[np.ndarray] = None
+        self.pattern: typing.Any = None
+        self.ordering: typing.Optional[np.ndarray] = None
+
+    def currents(self, coefficients: np.ndarray, s: complex, excitation: int = -1) -> np.ndarray:
+        rhs = self.rhs.substitute(excitation)
+        currents = np.zeros(shape=(self.size,), dtype=complex)
+        np.add.at(currents, rhs.rows, rhs.values(coefficients, s))
+        return currents
+
+    def expand(self, coefficients: np.ndarray, excitation: int = -1) -> typing.Tuple[typing.Dict[int, np.ndarray], typing.Dict[int, np.ndarray]]:
+        # Split the system into one array per power of s, e.g. G + s*C for the matrix
+        return self.split(self.matrix, coefficients, (self.size, self.size)), self.expand_rhs(coefficients, excitation)
+
+    def expand_rhs(self, coefficients: np.ndarray, excitation: int = -1) -> typing.Dict[int, np.ndarray]:
+        return self.split(self.rhs.substitute(excitation), coefficients, (self.size,))
+
+    @staticmethod
+    def split(entries: Entries, coefficients: np.ndarray, shape: typing.Tuple[int, ...]) -> typing.Dict[int, np.ndarray]:
+        terms: typing.Dict[int, np.ndarray] = dict()
+        values = entries.signs * coefficients[entries.slots]
+        for order in np.unique(entries.orders):
+            mask = entries.orders == order
+            index = entries.rows[mask] if entries.cols is None else (entries.rows[mask], entries.cols[mask])
+            terms[int(order)] = np.zeros(shape=shape, dtype=complex)
+            np.add.at(terms[int(order)], index, values[mask])
+        return terms
+
+class Border(typing.NamedTuple):
+    # A superposition term written as extra unknowns (e.g. a branch current)
+    # bordering the passive system: [[P, B], [C, D]] with right-hand side [r, r_extra]
+    extra: np.ndarray
+    coupling: Entries
+    constraint: Entries
+    block: Entries
+    rhs: Entries
+    extra_rhs: Entries
+
+class AssemblyPlan:
+    def __init__(self, components: Store) -> None:
+        self.store = components
+        self.topology: int = components.topology
+        self.index: typing.Mapping[str, int] = components.index
+        self.n: int = components.size
+
+        # Slot 0 is the unit coefficient shared by every incidence entry; each
+        # (table, parameter) pair then owns one slot per live row of the table
+        self.blocks: typing.List[typing.Tuple[ComponentTable, str, np.ndarray, int]] = []
+        self.block_starts: typing.Dict[typing.Tuple[type, str], int] = dict()
+        # Blocks of dynamic parameters, evaluated per s instead of read from the tables
+        self.dynamic: typing.List[typing.Tuple[type, str, int, int]] = []
+        self.positions: typing.Dict[type, np.ndarray] = dict()
+        self.slot_count: int = 1
+
+        passive_matrix, passive_rhs, passive_nodes = [], [], []
+        terms = []
+        for table in components.tables.values():
+            rows = table.rows()
+            if not rows.size:
+                continue
+            self.positions[table.kind] = np.full(table.count, -1, dtype=np.int64)
+            self.positions[table.kind][rows] = np.arange(rows.size)
+
+            (matrix, matrix_owners), (rhs, rhs_owners) = self.compile_table(table, rows)
+            nodes = np.array([table.nodes[role][rows] for role in table.layout.roles]).reshape(-1, rows.size)
+            if not table.kind.active:
+                passive_matrix.append(matrix)
+                passive_rhs.append(rhs)
+                passive_nodes.append(nodes.reshape(-1))
+                continue
+            # One superposition term per source, in the order the sources were added
+            for position, row in enumerate(rows):
+                terms.append((table.order[row], table, row, matrix.select(matrix_owners == position),
+                              rhs.select(rhs_owners == position), nodes[:, position]))
+
+        self.passive_matrix = Entries.concat(passive_matrix) if passive_matrix else empty(True)
+        self.passive_rhs = Entries.concat(passive_rhs) if passive_rhs else empty(False)
+        self.passive_live: np.ndarray = np.unique(np.concatenate(passive_nodes)) if passive_nodes else np.zeros(0, dtype=np.int64)
+
+        self.terms: typing.List[Term] = []
+        for _, table, row, matrix, rhs, nodes in sorted(terms, key=lambda term: term[0]):
+            live = np.union1d(self.passive_live, nodes)
+            self.terms.append(Term(table.view(row), matrix, rhs, live))
+
+        self.reduced: typing.Dict[str, typing.List[System]] = dict()
+        self.bordered: typing.Dict[str, typing.Tuple[System, typing.List[typing.Optional[Border]]]] = dict()
+        self.combined: typing.Dict[str, System] = dict()
+
+    @property
+    def active(self) -> typing.List[Component.Component]:
+        return [term.component for term in self.terms]
+
+    @property
+    def passive(self) -> typing.List[Component.Component]:
+        return [table.view(row) for table in self.store.tables.values() if not table.kind.active for row in table.rows()]
+
+    def compile_table(self, table: ComponentTable, rows: np.ndarray) -> typing.Tuple[typing.Tuple[Entries, np.ndarray], typing.Tuple[Entries, np.ndarray]]:
+        # The class's own stamps on a gathered view give every row's entries at once;
+        # owners records which row (by position) each entry belongs to
+        count = rows.size
+        owners = np.arange(count)
+        matrix: typing.List[Entries] = []
+        rhs: typing.List[Entries] = []
+        for entry in table.gather(rows).stamps():
+            slots = np.zeros(count, dtype=np.int64)
+            if entry.parameter is not None:
+                slots = self.block(table, entry.parameter, rows) + owners
+            entries = Entries(
+                rows=np.broadcast_to(entry.row, (count,)).astype(np.int64),
+                cols=None if entry.col is None else np.broadcast_to(entry.col, (count,)).astype(np.int64),
+                signs=np.full(count, float(entry.sign)),
+                orders=np.full(count, entry.order, dtype=np.int64),
+                slots=slots,
+            )
+            (rhs if entry.col is None else matrix).append(entries)
+
+        def collect(groups: typing.List[Entries], with_cols: bool) -> typing.Tuple[Entries, np.ndarray]:
+            if not groups:
+                return empty(with_cols), np.zeros(0, dtype=np.int64)
+            return Entries.concat(groups), np.tile(owners, len(groups))
+
+        return collect(matrix, True), collect(rhs, False)
+
+    def block(self, table: ComponentTable, parameter: str, rows: np.ndarray) -> int:
+        key = (table.kind, parameter)
+        if key not in self.block_starts:
+            self.block_starts[key] = self.slot_count
+            if parameter in table.kind.dynamic:
+                self.dynamic.append((table.kind, parameter, self.slot_count, rows.size))
+            else:
+                self.blocks.append((table, parameter, rows, self.slot_count))
+            self.slot_count += rows.size
+        return self.block_starts[key]
+
+    def find(self, name: typing.Optional[str], parameter: str) -> int:
+        # Slot of one component's parameter, or -1 when it is not part of the system
+        if name is None or name not in self.store.locations:
+            return -1
+        table, row = self.store.locations[name]
+        start = self.block_starts.get((table.kind, parameter))
+        if start is None or self.positions[table.kind][row] < 0:
+            return -1
+        return start + int(self.positions[table.kind][row])
+
+    @profiling.instrument("coefficients")
+    def coefficients(self, overrides: typing.Optional[typing.Dict[typing.Tuple[str, str], np.ndarray]] = None) -> np.ndarray:
+        # Parameter values are read once per solve so component edits are picked up.
+        # With overrides ({(name, parameter): values}) there is one row per variant.
+        per_table: typing.Dict[type, typing.Dict[str, typing.Dict[int, np.ndarray]]] = dict()
+        count = 0
+        for (name, parameter), values in (overrides or dict()).items():
+            table, row = self.store.locations[name]
+            values = np.asarray(values).reshape(-1)
+            per_table.setdefault(table.kind, dict()).setdefault(parameter, dict())[row] = values
+            count = max(count, values.size)
+
+        extra = 1 if overrides else 0
+        coefficients = np.ones(shape=(self.slot_count, max(count, 1)), dtype=complex)
+        views: typing.Dict[type, Component.Component] = dict()
+        for table, parameter, rows, start in self.blocks:
+            if table.kind not in views:
+                views[table.kind] = table.gather(rows, extra, overrides=per_table.get(table.kind))
+            values = np.asarray(getattr(views[table.kind], parameter))
+            coefficients[start:start + rows.size] = values.reshape(rows.size, -1)
+
+        return coefficients.T if overrides else coefficients[:, 0]
+
+    def at(self, coefficients: np.ndarray, s: complex) -> np.ndarray:
+        # Coefficients with the dynamic parameters filled in for one s; every row of a
+        # table shares its class's values (e.g. the instances of one subcircuit)
+        if not self.dynamic:
+            return coefficients
+        coefficients = coefficients.copy()
+        values: typing.Dict[type, typing.Dict[str, complex]] = dict()
+        for kind, parameter, start, count in self.dynamic:
+            if kind not in values:
+                values[kind] = kind.values(s)
+            coefficients[..., start:start + count] = values[kind][parameter]
+        return coefficients
+
+    def dependencies(self) -> typing.Tuple[str, ...]:
+        # State of whatever the dynamic parameters are computed from, for cache keys
+        return tuple(kind.state() for kind in dict.fromkeys(kind for kind, _, _, _ in self.dynamic))
+
+    def systems(self, ground: str) -> typing.List[System]:
+        if ground not in self.reduced:
+            assert ground in self.index, f"Ground node '{ground}' not found in circuit."
+            g_idx = self.index[ground]
+
+            systems = []
+            for term in self.terms:
+                assert g_idx in term.live, f"Ground node '{ground}' not found in circuit."
+                keep = term.live[term.live != g_idx]
+                mapping = np.full(self.n, -1, dtype=int)
+                mapping[keep] = np.arange(keep.size)
+
+                matrix = Entries.concat([self.passive_matrix, term.matrix]).restrict(mapping)
+                rhs = Entries.concat([self.passive_rhs, term.rhs]).restrict(mapping)
+                systems.append(System(term, keep, matrix, rhs))
+            self.reduced[ground] = systems
+
+        return self.reduced[ground]
+
+    def borders(self, ground: str) -> typing.Tuple[System, typing.List[typing.Optional[Border]]]:
+        # Terms that would change the passive block itself get no border and are solved directly
+        if ground not in self.bordered:
+            g_idx = self.index[ground]
+            keep = self.passive_live[self.passive_live != g_idx]
+            mapping = np.full(self.n, -1, dtype=int)
+            mapping[keep] = np.arange(keep.size)
+            passive = System(None, keep, self.passive_matrix.restrict(mapping), self.passive_rhs.restrict(mapping))
+
+            borders: typing.List[typing.Optional[Border]] = []
+            for term in self.terms:
+                extra = np.setdiff1d(term.live, self.passive_live)
+                extra = extra[extra != g_idx]
+                extra_mapping = np.full(self.n, -1, dtype=int)
+                extra_mapping[extra] = np.arange(extra.size)
+
+                if term.matrix.restrict(mapping).rows.size:
+                    borders.append(None)
+                    continue
+                borders.append(Border(
+                    extra=extra,
+                    coupling=term.matrix.restrict(mapping, extra_mapping),
+                    constraint=term.matrix.restrict(extra_mapping, mapping),
+                    block=term.matrix.restrict(extra_mapping),
+                    rhs=term.rhs.restrict(mapping),
+                    extra_rhs=term.rhs.restrict(extra_mapping),
+                ))
+            self.bordered[ground] = (passive, borders)
+
+        return self.bordered[ground]
+
+    def whole(self, ground: str) -> System:
+        # Every component in one system, all sources at once (no superposition)
+        if ground not in self.combined:
+            assert ground in self.index, f"Ground node '{ground}' not found in circuit."
+            g_idx = self.index[ground]
+            live = np.unique(np.concatenate([self.passive_live] + [term.live for term in self.terms]))
+            assert g_idx in live, f"Ground node '{ground}' not found in circuit."
+            keep = live[live != g_idx]
+            mapping = np.full(self.n, -1, dtype=int)
+            mapping[keep] = np.arange(keep.size)
+
+            matrix = Entries.concat([self.passive_matrix] + [term.matrix for term in self.terms]).restrict(mapping)
+            rhs = Entries.concat([self.passive_rhs] + [term.rhs for term in self.terms]).restrict(mapping)
+            self.combined[ground] = System(None, keep, matrix, rhs)
+
+        return self.combined[ground]
@@ -0,0 +1,177 @@
+import typing
+import numpy as np
+
+from . import profiling
+from .assembly import System
+
+# Systems with at least this many unknowns use the sparse backend under "auto"
+SPARSE_THRESHOLD: int = 400
+
+def singular() -> ValueError:
+    return ValueError("Singular matrix. Circuit may be unsolvable or nodes are floating.")
+
+class DenseFactorization:
+    # LU factors from scipy.linalg when it is installed. Without scipy the matrix is kept
+    # and LAPACK factors and substitutes in one call, so dense time shows up in solve.
+    def __init__(self, matrix: np.ndarray) -> None:
+        try:
+            import scipy.linalg
+        except ImportError:
+            self.linalg = None
+            self.matrix = matrix.copy()
+            return
+        self.linalg = scipy.linalg
+        self.factors = scipy.linalg.lu_factor(matrix, check_finite=False)
+        if np.any(np.diag(self.factors[0]) == 0):
+            raise singular()
+
+    @property
+    def size(self) -> int:
+        return (self.matrix if self.linalg is None else self.factors[0]).shape[0]
+
+    def solve(self, rhs: np.ndarray) -> np.ndarray:
+        with profiling.phase("back_substitute", size=self.size) as phase:
+            solution = self.substitute(rhs, 0)
+            if phase:
+                phase.note(estimated_bytes=solution.nbytes)
+            return solution
+
+    def solve_transposed(self, rhs: np.ndarray) -> np.ndarray:
+        # A^T x = rhs, for adjoint solves
+        with profiling.phase("back_substitute", size=self.size, transposed=True):
+            return self.substitute(rhs, 1)
+
+    def substitute(self, rhs: np.ndarray, trans: int) -> np.ndarray:
+        if self.linalg is not None:
+            return self.linalg.lu_solve(self.factors, rhs, trans=trans, check_finite=False)
+        try:
+            return np.linalg.solve(self.matrix.T if trans else self.matrix, rhs)
+        except np.linalg.LinAlgError:
+            raise singular()
+
+class DenseBackend:
+    name: str = "dense"
+
+    def assemble(self, system: System, values: np.ndarray) -> np.ndarray:
+        with profiling.phase("assemble", size=system.size) as phase:
+            if phase:
+                phase.note(nnz=values.size, estimated_bytes=0 if system.buffer is not None else 16 * system.size ** 2)
+            if system.buffer is None:
+                system.buffer = np.zeros(shape=(system.size, system.size), dtype=complex)
+            system.buffer.fill(0)
+            np.add.at(system.buffer, (system.matrix.rows, system.matrix.cols), values)
+            return system.buffer
+
+    def factorize(self, system: System, matrix: np.ndarray) -> DenseFactorization:
+        with profiling.phase("factorize", size=system.size):
+            factorization = DenseFactorization(matrix)
+        if profiling.condition() and matrix.size:
+            # Outside "factorize": cond computes the inverse, far more work than the LU
+            with profiling.phase("condition", size=system.size) as phase:
+                phase.note(condition=float(np.linalg.cond(matrix, 1)))
+        return factorization
+
+class SparsePattern:
+    # CSC structure of a system, computed once per topology. columns optionally
+    # renumbers the columns so assembly directly yields the reordered matrix.
+    def __init__(self, system: System, columns: typing.Optional[np.ndarray] = None) -> None:
+        n = system.size
+        cols = system.matrix.cols if columns is None else columns[system.matrix.cols]
+        # Column-major keys col * n + row reach n^2, which overflows int32 (the dtype of
+        # splu's perm_c, hence of reordered columns) past ~46k unknowns and used to scramble
+        # the pattern of large systems; they are always computed in int64
+        keys = cols.astype(np.int64) * n + system.matrix.rows
+        unique, self.positions = np.unique(keys, return_inverse=True)
+        self.indices = (unique % n).astype(np.int32)
+        self.indptr = np.searchsorted(unique // n, np.arange(n + 1)).astype(np.int32)
+        self.shape = (n, n)
+
+class SparseFactorization:
+    def __init__(self, lu, ordering: typing.Optional[np.ndarray]) -> None:
+        self.lu = lu
+        self.ordering = ordering
+
+    def solve(self, rhs: np.ndarray) -> np.ndarray:
+        with profiling.phase("back_substitute", size=self.lu.shape[0]) as phase:
+            solution = self.lu.solve(np.asarray(rhs, dtype=complex))
+            if phase:
+                phase.note(estimated_bytes=solution.nbytes)
+            if self.ordering is None:
+                return solution
+            # The factored matrix had its columns permuted by the cached ordering
+            unpermuted = np.empty_like(solution)
+            unpermuted[self.ordering] = solution
+            return unpermuted
+
+    def solve_transposed(self, rhs: np.ndarray) -> np.ndarray:
+        # A^T x = rhs with the same factors; the factored matrix is A Q, so this is (A Q)^T x = Q^T rhs
+        with profiling.phase("back_substitute", size=self.lu.shape[0], transposed=True):
+            rhs = np.asarray(rhs, dtype=complex)
+            return self.lu.solve(rhs if self.ordering is None else rhs[self.ordering], trans="T")
+
+class SparseBackend:
+    name: str = "sparse"
+
+    def __init__(self) -> None:
+        try:
+            import scipy.sparse
+            import scipy.sparse.linalg
+        except ImportError:
+            raise ImportError("The sparse backend requires scipy: pip install circuit_simulator[sparse]")
+        self.sparse = scipy.sparse
+        self.linalg = scipy.sparse.linalg
+
+    def assemble(self, system: System, values: np.ndarray):
+        with profiling.phase("assemble", size=system.size) as phase:
+            if system.pattern is None:
+                system.pattern = SparsePattern(system)
+            pattern = system.pattern
+            data = np.zeros(shape=(pattern.indices.size,), dtype=complex)
+            np.add.at(data, pattern.positions, values)
+            if phase:
+                phase.note(nnz=data.size, estimated_bytes=data.nbytes)
+            return self.sparse.csc_matrix((data, pattern.indices, pattern.indptr), shape=pattern.shape)
+
+    def factorize(self, system: System, matrix) -> SparseFactorization:
+        with profiling.phase("factorize", size=system.size) as phase:
+            try:
+                if system.ordering is not None:
+                    factorization = SparseFactorization(self.linalg.splu(matrix, permc_spec="NATURAL"), system.ordering)
+                else:
+                    # The first factorization picks a fill-reducing column ordering for this
+                    # topology; later matrices are assembled already in that order.
+                    lu = self.linalg.splu(matrix, permc_spec="COLAMD")
+                    system.ordering = np.argsort(lu.perm_c)
+                    system.pattern = SparsePattern(system, lu.perm_c)
+                    factorization = SparseFactorization(lu, None)
+            except RuntimeError:
+                raise singular()
+            if phase:
+                # Fill is the nonzero count of L + U against the matrix's own
+                fill = factorization.lu.L.nnz + factorization.lu.U.nnz
+                phase.note(nnz=matrix.nnz, fill=fill, estimated_bytes=fill * (16 + 4))
+        if profiling.condition():
+            self.condition(system, matrix, factorization.lu)
+        return factorization
+
+    def condition(self, system: System, matrix, lu) -> None:
+        # Hager/Higham 1-norm estimate of ||A^-1|| from a few solves, outside "factorize"
+        with profiling.phase("condition", size=system.size) as phase:
+            inverse = self.linalg.LinearOperator(matrix.shape, matvec=lu.solve, rmatvec=lambda x: lu.solve(x, trans="H"),
+                                                 dtype=complex)
+            phase.note(condition=float(self.linalg.norm(matrix, 1) * self.linalg.onenormest(inverse)))
+
+def sparse_available() -> bool:
+    try:
+        import scipy.sparse.linalg
+    except ImportError:
+        return False
+    return True
+
+def select_backend(backend: str, size: int) -> typing.Union[DenseBackend, SparseBackend]:
+    # "auto" only picks sparse when scipy (the optional [sparse] extra) is installed;
+    # asking for "sparse" explicitly without it raises
+    assert backend in ["auto", "dense", "sparse"], f"Unknown backend '{backend}'"
+    if backend == "auto":
+        backend = "sparse" if size >= SPARSE_THRESHOLD and sparse_available() else "dense"
+    return SparseBackend() if backend == "sparse" else DenseBackend()
@@ -0,0 +1,66 @@
+import collections
+import hashlib
+import typing
+import numpy as np
+
+def fingerprint(revision: typing.Hashable, coefficients: np.ndarray, excitation: int = -1) -> str:
+    # Circuit state seen by a solve: the topology revision (with that of any subcircuits)
+    # and every parameter value, as a SHA-256 digest so distinct states cannot share a key.
+    # The excitation's own value never reaches the solution, so it is left out.
+    if excitation >= 0:
+        coefficients = coefficients.copy()
+        coefficients[excitation] = 0
+    digest = hashlib.sha256(repr(revision).encode())
+    digest.update(str((coefficients.dtype, coefficients.shape)).encode())
+    digest.update(np.ascontiguousarray(coefficients).tobytes())
+    return digest.hexdigest()
+
+class SolveCache:
+    # Bounded LRU of solution vectors keyed by (state, ground, s, ...)
+    def __init__(self, max_bytes: int = 2**26, max_entries: typing.Optional[int] = None) -> None:
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries: "collections.OrderedDict[typing.Hashable, np.ndarray]" = collections.OrderedDict()
+        self.bytes: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def get(self, key: typing.Hashable) -> typing.Optional[np.ndarray]:
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: typing.Hashable, value: np.ndarray) -> None:
+        if value.nbytes > self.max_bytes:
+            return
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key).nbytes
+        # Read-only so callers cannot edit a cached solution in place
+        value = value.copy()
+        value.flags.writeable = False
+        self.entries[key] = value
+        self.bytes += value.nbytes
+
+        while self.bytes > self.max_bytes or (self.max_entries is not None and len(self.entries) > self.max_entries):
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> typing.Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -3,100 +3,149 @@ import numpy as np
 import pandas as pd
 
 from . import components as Component
+from .assembly import AssemblyPlan
+from . import montecarlo, netlist, profiling, sensitivity, superposition, sweepfile
+from .cache import SolveCache, fingerprint
 from .graphical import ComplexFunction
+from .incremental import Incremental
+from .results import Solution
+from .sensitivity import Sensitivity
+from .store import Components, Store
+from .sweep import FrequencySweep, TransferFunction
+from .sweepfile import SweepFile
+from .transient import Transient
 
 class Circuit:
     def __init__(self) -> None:
-        self.n: int = 0
-        self.temp_n: int = 0
         self.matrix: np.ndarray = np.zeros(shape=(0, 0), dtype=complex)
         self.voltages: np.ndarray = np.zeros(shape=(0, 1), dtype=complex)
         self.currents: np.ndarray = np.zeros(shape=(0, 1), dtype=complex)
 
-        self.components: typing.Dict[str, Component.Component] = dict()
-        self.active_components: typing.List[Component.Component] = []
-        self.passive_components: typing.List[Component.Component] = []
-        self.terminals: typing.Dict[str, int] = dict()
-        self.real_terminals: typing.Dict[str, int] = dict()
-
-    def check_terminals(self, component: Component.Component):
-        for terminal in component.terminals:
-            if terminal not in self.terminals:
-                self.terminals[terminal] = self.temp_n
-                self.temp_n += 1
-                self.matrix = np.pad(self.matrix, ((0, 1), (0, 1)), "constant")
-                self.currents = np.pad(self.currents, ((0, 1), (0, 0)), "constant")
-                # Pad voltages to match dimensions
-                self.voltages = np.pad(self.voltages, ((0, 1), (0, 0)), "constant")
-
-            if terminal not in self.real_terminals:
-                self.real_terminals[terminal] = self.n
-                self.n += 1
+        # Components live as per-type columns; components and real_terminals are views of the store
+        self.store = Store()
+        self.components: typing.Mapping[str, Component.Component] = Components(self.store)
+        self.terminals: typing.Mapping[str, int] = dict()
+        self.real_terminals: typing.Mapping[str, int] = self.store.index
+        self.plan: typing.Optional[AssemblyPlan] = None
+        # "dense", "sparse", or "auto" to pick by system size (see backends.SPARSE_THRESHOLD)
+        self.backend: str = "auto"
+        # Bumped on every topology change; parameter values are fingerprinted per solve
+        self.revision: int = 0
+        self.cache: typing.Optional[SolveCache] = None
+        self.incremental: typing.Optional[Incremental] = None
+        # Component classes of Subcircuit instances wrapping this circuit, by port tuple
+        self.subcircuits: typing.Dict[typing.Tuple[str, ...], type] = dict()
+
+    @property
+    def n(self) -> int:
+        return self.store.size
+
+    @property
+    def active_components(self) -> typing.List[Component.Component]:
+        return self.compile().active
+
+    @property
+    def passive_components(self) -> typing.List[Component.Component]:
+        return self.compile().passive
 
     def add_component(self, component: Component.Component) -> None:
-        self.components[component.name] = component
-        self.check_terminals(component)
+        # The component is copied into the store and becomes a view of its row
+        self.store.add(component)
+        self.plan = None
+        self.revision += 1
+
+    def add_components(self, components: typing.Iterable[Component.Component]) -> None:
+        # Bulk registration: one pass over the components, one plan invalidation
+        for component in components:
+            self.store.add(component)
+        self.plan = None
+        self.revision += 1
+
+    @classmethod
+    def from_netlist(cls, path: str, title: bool = True) -> "Circuit":
+        # Cards go straight into the store's columns without building component objects.
+        # The first line is the SPICE title; title=False reads it as a card.
+        circuit = cls()
+        circuit.store.extend(netlist.load(path, title))
+        circuit.revision += 1
+        return circuit
+
+    def enable_cache(self, max_bytes: int = 2**26, max_entries: typing.Optional[int] = None) -> SolveCache:
+        # Opt-in: repeated solves at the same state, s and ground become lookups
+        self.cache = SolveCache(max_bytes, max_entries)
+        return self.cache
+
+    def disable_cache(self) -> None:
+        self.cache = None
+
+    def enable_incremental(self, max_updates: int = 16, max_rank: int = 32, tolerance: float = 1e-10) -> Incremental:
+        # Opt-in: solves after a few value edits update the last factorization instead of
+        # refactoring (Sherman-Morrison-Woodbury), refactoring after max_updates edits,
+        # past max_rank edited rows or when the residual exceeds tolerance
+        self.incremental = Incremental(max_updates, max_rank, tolerance)
+        return self.incremental
+
+    def disable_incremental(self) -> None:
+        self.incremental = None
+
+    def profile(self, hooks: typing.Optional[typing.Iterable[typing.Callable[[profiling.Event], None]]] = None,
+                condition: bool = False, trace: bool = True) -> profiling.Profiler:
+        # with circuit.profile() as profiler: every instrumented phase run inside the block
+        # is recorded (times, counts, sizes, fill, estimated bytes and, with condition=True,
+        # condition estimates) and passed to hooks
+        return profiling.Profiler(hooks, condition, trace)
+
+    def compile(self) -> AssemblyPlan:
+        # Node indices and stamp layout only change when components are added or reconnected
+        if self.plan is not None and self.plan.topology != self.store.topology:
+            self.plan = None
+            self.revision += 1
+        if self.plan is None:
+            with profiling.phase("compile", components=len(self.store.locations)):
+                self.plan = AssemblyPlan(self.store)
+        return self.plan
+
+    @profiling.instrument("solve")
+    def solve(self, ground: str, sweep: complex = None, grouped: bool = True) -> None:
+        plan = self.compile()
+        self.terminals = plan.index
+        profiling.note(ground=ground, s=sweep, unknowns=plan.n, terms=len(plan.terms))
 
-    def solve(self, ground: str, sweep: complex = None) -> None:
         # Reset voltages for superposition
         self.voltages = np.zeros(shape=(self.n, 1), dtype=complex)
+        coefficients = plan.coefficients()
+
+        # Terms sharing the same s are solved together with one factorization
+        groups: typing.Dict[complex, typing.List[int]] = dict()
+        for i, system in enumerate(plan.systems(ground)):
+            s = sweep if sweep else system.term.component.s
+            groups.setdefault(s, []).append(i)
+
+        key = ("solve", fingerprint((self.revision, plan.dependencies()), coefficients), ground, sweep or None)
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            profiling.note(cached=True)
+            self.voltages[:, 0] = cached
+        else:
+            # Superposition sum
+            for s, members in groups.items():
+                self.voltages[:, 0] += superposition.solve(plan, ground, s, members, coefficients, self.backend, grouped,
+                                                         incremental=self.incremental)
+            if self.cache is not None:
+                self.cache.put(key, self.voltages[:, 0])
 
-        self.active_components = []
-        self.passive_components = []
-
-        for name, component in self.components.items():
-            if component.active:
-                self.active_components.append(component)
-            else:
-                self.passive_components.append(component)
-
-        # Superposition Loop
-        for active_component in self.active_components:
-            self.temp_n = 0
-            self.matrix = np.zeros(shape=(0, 0), dtype=complex)
-            self.currents = np.zeros(shape=(0, 1), dtype=complex)
-            self.terminals = dict()
-
-            # Stamp active component
-            self.check_terminals(active_component)
-            active_component.stamp(self.matrix, self.currents, self.terminals)
-            
-            s = sweep if sweep else active_component.s
-
-            # Stamp passive components
-            for passive_component in self.passive_components:
-                self.check_terminals(passive_component)
-                passive_component.set_s(s)
-                passive_component.stamp(self.matrix, self.currents, self.terminals)
-
-            assert ground in self.terminals, f"Ground node '{ground}' not found in circuit."
-
-            # Remove ground row/col for calculation
-            g_idx = self.terminals[ground]
-            matrix_reduced = np.delete(np.delete(self.matrix, g_idx, axis=0), g_idx, axis=1)
-            current_reduced = np.delete(self.currents, g_idx, axis=0)
-
-            try:
-                voltages_solved = np.linalg.solve(matrix_reduced, current_reduced)
-            except np.linalg.LinAlgError:
-                raise ValueError("Singular matrix. Circuit may be unsolvable or nodes are floating.")
-
-            # Re-insert ground (0V)
-            voltages_solved = np.insert(voltages_solved, g_idx, 0).reshape(-1, 1)
+        if plan.terms:
+            self.store.set_passive_s(list(groups)[-1])
 
-            # Superposition sum
-            for key in self.terminals:
-                 if key in self.real_terminals:
-                    self.voltages[self.real_terminals[key]] += voltages_solved[self.terminals[key]]
+    def results(self, components: typing.Optional[typing.List[str]] = None) -> Solution:
+        # Voltage, current and power of every component from the last solve, as arrays
+        names = components or list(self.components.keys())
+        return Solution.gather(self.store, names, self.voltages)
 
+    @profiling.instrument("component_info")
     def component_info(self, name: str) -> pd.Series:
         assert name in self.components
-        info = pd.Series(index=["Name", "Voltage", "Current", "Power"], dtype=object)
-        info["Name"] = self.components[name].name
-        info["Voltage"] = self.components[name].voltage(self.terminals, self.voltages)
-        info["Current"] = self.components[name].current(self.terminals, self.voltages)
-        info["Power"] = info["Voltage"] * info["Current"]
-        return info
+        return self.results([name]).row(name)
 
     def transfer_function(self, earth: str,
                         input_node: typing.Tuple[str, str], 
@@ -108,54 +157,46 @@ class Circuit:
         assert input_node[1] in valid_types
         assert output_node[1] in valid_types
 
-        # Capture 'self' for the closure
-        circuit_instance = self
-
-        class TransferFunctionImpl(ComplexFunction):
-            @staticmethod
-            def f(s_values):
-                # Optimization: Handle scalar complex value directly
-                if isinstance(s_values, (complex, float, int)):
-                     s = s_values
-                     circuit_instance.components[input_node[0]].set_s(s)
-                     circuit_instance.solve(earth, s)
-                     
-                     in_val = circuit_instance.component_info(input_node[0])[input_node[1]]
-                     out_val = circuit_instance.component_info(output_node[0])[output_node[1]]
-                     return out_val / in_val
-
-                # Handle numpy array (meshgrids or linear arrays)
-                if isinstance(s_values, np.ndarray):
-                    input_comp = circuit_instance.components[input_node[0]]
-                    
-                    # We flatten the input array to iterate over it linearly
-                    flat_s = s_values.flatten()
-                    results = []
-                    
-                    for s in flat_s:
-                        input_comp.set_s(s)
-                        circuit_instance.solve(earth, s)
-                        
-                        in_val = circuit_instance.component_info(input_node[0])[input_node[1]]
-                        out_val = circuit_instance.component_info(output_node[0])[output_node[1]]
-                        
-                        # Avoid division by zero if input is 0 (though unlikely in AC analysis unless DC)
-                        if in_val == 0:
-                            results.append(0)
-                        else:
-                            results.append(out_val / in_val)
-                    
-                    # Reshape results back to original shape (e.g., for meshgrid)
-                    return np.array(results).reshape(s_values.shape)
-
-        return TransferFunctionImpl()
+        return TransferFunction(self, earth, input_node, output_node)
 
-    def table(self, components: typing.List[str] = None) -> pd.DataFrame:
-        series = []
-        if not components: 
-            components = list(self.components.keys())
+    def sweep(self, ground: str, s_values: np.ndarray, output: typing.Tuple[str, str]) -> np.ndarray:
+        assert output[0] in self.components, f"Output component {output[0]} not found"
+        return FrequencySweep(self, ground).evaluate(s_values, [output])[0]
+
+    def sweep_results(self, ground: str, s_values: np.ndarray,
+                      components: typing.Optional[typing.List[str]] = None) -> Solution:
+        return FrequencySweep(self, ground).results(s_values, components)
+
+    def sweep_chunks(self, ground: str, s_values: np.ndarray, nodes: typing.Optional[typing.List[str]] = None,
+                     chunk: typing.Optional[int] = None) -> typing.Iterator[typing.Tuple[int, np.ndarray]]:
+        # (offset, node voltages) per chunk of frequencies, for sweeps too large to hold at once
+        return FrequencySweep(self, ground).stream(s_values, nodes, chunk)
 
-        for component_name in components:
-            series.append(self.component_info(component_name))
+    def sweep_to_file(self, ground: str, s_values: np.ndarray, path: str,
+                      nodes: typing.Optional[typing.List[str]] = None, chunk: typing.Optional[int] = None) -> SweepFile:
+        # Node voltages written to a memory-mapped store under path; reruns resume where they stopped
+        return sweepfile.write(FrequencySweep(self, ground), path, s_values, nodes, chunk)
 
-        return pd.concat(series, axis=1).T
+    def sensitivity(self, ground: str, output: typing.Tuple[str, str], s_values,
+                    input_node: typing.Optional[typing.Tuple[str, str]] = None) -> Sensitivity:
+        # d(output)/d(parameter) for every resistance, capacitance, inductance, transconductance
+        # and transresistance at each s, by the adjoint method; with input_node, of output / input
+        assert output[0] in self.components, f"Output component {output[0]} not found"
+        assert output[1] in ["Voltage", "Current", "Power"]
+        return sensitivity.compute(self, ground, output, s_values, input_node)
+
+    def parameter_sweep(self, ground: str,
+                        values: typing.Dict[typing.Tuple[str, str], typing.Sequence[float]]) -> montecarlo.VariantSweep:
+        # One variant per combination of the given (component, parameter) values
+        return montecarlo.VariantSweep(self, ground, montecarlo.grid(values))
+
+    def monte_carlo(self, ground: str, distributions: typing.Dict[typing.Tuple[str, str], typing.Any],
+                    count: int, seed: typing.Optional[int] = None) -> montecarlo.VariantSweep:
+        return montecarlo.VariantSweep(self, ground, montecarlo.sample(self, distributions, count, seed))
+
+    def transient(self, ground: str, step: float, method: str = "trapezoidal") -> Transient:
+        # Fixed-step time-domain analysis; the step matrix is factored once here
+        return Transient(self, ground, step, method)
+
+    def table(self, components: typing.List[str] = None) -> pd.DataFrame:
+        return self.results(components).frame()
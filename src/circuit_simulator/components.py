@@ -2,20 +2,55 @@ import abc
 import typing
 import numpy as np
 
+from . import store
+
+class Stamp(typing.NamedTuple):
+    # One MNA contribution: sign * parameter * s**order at (row, col), or on the
+    # right-hand side of row when col is None. Gathered views give id arrays.
+    row: str
+    col: typing.Optional[str]
+    sign: float
+    parameter: typing.Optional[str] = None
+    order: int = 0
+
 class Component(abc.ABC):
-    def __init__(self, terminals: typing.List[str], name: str) -> None:
-        self.name = name
-        self.terminals: typing.List[str] = terminals
-        self.s: complex = 0
-        self.active: bool = False
+    # A view of one row of a store.ComponentTable. Standalone components keep a
+    # private one-row store until a circuit copies them into its own.
+    __slots__ = ("table", "row")
+    active: bool = False
+    # Parameters that are functions of s rather than stored values, see AssemblyPlan.at
+    dynamic: typing.FrozenSet[str] = frozenset()
+    s = store.Field(complex)
+
+    def __init__(self, name: str, nodes: typing.Dict[str, str], **values) -> None:
+        self.table, self.row = store.Store(standalone=True).append(type(self), name, nodes, values)
+
+    @property
+    def name(self) -> str:
+        return self.table.names[self.row]
+
+    @property
+    def terminals(self) -> typing.List[str]:
+        return [getattr(self, role) for role in store.layout(type(self)).roles]
 
     def set_s(self, s: complex) -> None:
         self.s = s
 
     @abc.abstractmethod
-    def stamp(self, matrix: np.ndarray, currents: np.ndarray, terminals: typing.Dict[str, int]) -> None:
+    def stamps(self) -> typing.List[Stamp]:
         pass
 
+    def coefficient(self, entry: Stamp) -> complex:
+        value = getattr(self, entry.parameter) if entry.parameter else 1
+        return entry.sign * value * self.s ** entry.order
+
+    def stamp(self, matrix: np.ndarray, currents: np.ndarray, terminals: typing.Dict[str, int]) -> None:
+        for entry in self.stamps():
+            if entry.col is None:
+                currents[terminals[entry.row]] += self.coefficient(entry)
+            else:
+                matrix[terminals[entry.row], terminals[entry.col]] += self.coefficient(entry)
+
     @abc.abstractmethod
     def voltage(self, terminals: typing.Dict[str, int], voltages: np.ndarray) -> complex:
         pass
@@ -25,20 +60,24 @@ class Component(abc.ABC):
         pass
 
 class Resistor(Component):
+    __slots__ = ()
+    positive = store.Node()
+    negative = store.Node()
+    # Deterministic internal node name
+    x = store.Internal()
+    resistance = store.Field()
+
     def __init__(self, name: str, positive: str, negative: str, resistance: float) -> None:
-        # Deterministic internal node name
-        self.x: str = f"{name}_internal_i"
-        super().__init__([positive, negative, self.x], name)
-        self.positive = positive
-        self.negative = negative
-        self.resistance = resistance
+        super().__init__(name, dict(positive=positive, negative=negative), resistance=resistance)
 
-    def stamp(self, matrix: np.ndarray, currents: np.ndarray, terminals: typing.Dict[str, int]) -> None:
-        matrix[terminals[self.positive], terminals[self.x]] += 1
-        matrix[terminals[self.negative], terminals[self.x]] -= 1
-        matrix[terminals[self.x], terminals[self.positive]] -= 1
-        matrix[terminals[self.x], terminals[self.negative]] += 1
-        matrix[terminals[self.x], terminals[self.x]] += self.resistance
+    def stamps(self) -> typing.List[Stamp]:
+        return [
+            Stamp(self.positive, self.x, 1),
+            Stamp(self.negative, self.x, -1),
+            Stamp(self.x, self.positive, -1),
+            Stamp(self.x, self.negative, 1),
+            Stamp(self.x, self.x, 1, "resistance"),
+        ]
 
     def voltage(self, terminals: typing.Dict[str, int], voltages: np.ndarray) -> complex:
         return voltages[terminals[self.positive]] - voltages[terminals[self.negative]]
@@ -47,16 +86,19 @@ class Resistor(Component):
         return self.voltage(terminals, voltages) / self.resistance
 
 class CurrentSource(Component):
+    __slots__ = ()
+    active = True
+    positive = store.Node()
+    negative = store.Node()
+
     def __init__(self, name: str, positive: str, negative: str, current_value: complex) -> None:
-        super().__init__([positive, negative], name)
-        self.positive = positive
-        self.negative = negative
-        self.s = current_value
-        self.active = True
+        super().__init__(name, dict(positive=positive, negative=negative), s=current_value)
 
-    def stamp(self, matrix: np.ndarray, currents: np.ndarray, terminals: typing.Dict[str, int]) -> None:
-        currents[terminals[self.positive]] -= self.s
-        currents[terminals[self.negative]] += self.s
+    def stamps(self) -> typing.List[Stamp]:
+        return [
+            Stamp(self.positive, None, -1, "s"),
+            Stamp(self.negative, None, 1, "s"),
+        ]
 
     def voltage(self, terminals: typing.Dict[str, int], voltages: np.ndarray) -> complex:
         return voltages[terminals[self.positive]] - voltages[terminals[self.negative]]
@@ -65,20 +107,23 @@ class CurrentSource(Component):
         return self.s
 
 class VoltageSource(Component):
+    __slots__ = ()
+    active = True
+    positive = store.Node()
+    negative = store.Node()
+    x = store.Internal()
+
     def __init__(self, name: str, positive: str, negative: str, voltage_value: complex) -> None:
-        self.x = f"{name}_internal_i"
-        super().__init__([positive, negative, self.x], name)
-        self.positive = positive
-        self.negative = negative
-        self.s = voltage_value
-        self.active = True
+        super().__init__(name, dict(positive=positive, negative=negative), s=voltage_value)
 
-    def stamp(self, matrix: np.ndarray, currents: np.ndarray, terminals: typing.Dict[str, int]) -> None:
-        matrix[terminals[self.positive], terminals[self.x]] += 1
-        matrix[terminals[self.negative], terminals[self.x]] -= 1
-        matrix[terminals[self.x], terminals[self.positive]] -= 1
-        matrix[terminals[self.x], terminals[self.negative]] += 1
-        currents[terminals[self.x]] -= self.s
+    def stamps(self) -> typing.List[Stamp]:
+        return [
+            Stamp(self.positive, self.x, 1),
+            Stamp(self.negative, self.x, -1),
+            Stamp(self.x, self.positive, -1),
+            Stamp(self.x, self.negative, 1),
+            Stamp(self.x, None, -1, "s"),
+        ]
 
     def voltage(self, terminals: typing.Dict[str, int], voltages: np.ndarray) -> complex:
         return self.s
@@ -87,22 +132,31 @@ class VoltageSource(Component):
         return voltages[terminals[self.x]]
 
 class Inductor(Component):
-    def __init__(self, name: str, positive: str, negative: str, inductance: float, initial_current: float = 0) -> None:
-        self.x = f"{name}_internal_i"
-        super().__init__([positive, negative, self.x], name)
-        self.positive = positive
-        self.negative = negative
-        self.inductance = inductance
-        self.initial_current = initial_current
-
-    def stamp(self, matrix: np.ndarray, currents: np.ndarray, terminals: typing.Dict[str, int]) -> None:
-        matrix[terminals[self.positive], terminals[self.x]] += 1
-        matrix[terminals[self.negative], terminals[self.x]] -= 1
-        matrix[terminals[self.x], terminals[self.positive]] -= 1
-        matrix[terminals[self.x], terminals[self.negative]] += 1
-        matrix[terminals[self.x], terminals[self.x]] += self.s * self.inductance
+    __slots__ = ()
+    positive = store.Node()
+    negative = store.Node()
+    x = store.Internal()
+    inductance = store.Field()
+    initial_current = store.Field()
 
-        currents[terminals[self.x]] += self.initial_current / self.s
+    def __init__(self, name: str, positive: str, negative: str, inductance: float, initial_current: float = 0) -> None:
+        super().__init__(name, dict(positive=positive, negative=negative), inductance=inductance, initial_current=initial_current)
+
+    @property
+    def initial_flux(self) -> float:
+        return self.inductance * self.initial_current
+
+    def stamps(self) -> typing.List[Stamp]:
+        return [
+            Stamp(self.positive, self.x, 1),
+            Stamp(self.negative, self.x, -1),
+            Stamp(self.x, self.positive, -1),
+            Stamp(self.x, self.negative, 1),
+            Stamp(self.x, self.x, 1, "inductance", 1),
+            # sL i - v = L i0, so i = v / (sL) + i0 / s as in current(). Before transient
+            # analysis this entry was i0 at order -1, which gave i0 / (s^2 L).
+            Stamp(self.x, None, 1, "initial_flux"),
+        ]
 
     def voltage(self, terminals: typing.Dict[str, int], voltages: np.ndarray) -> complex:
         return voltages[terminals[self.positive]] - voltages[terminals[self.negative]]
@@ -111,21 +165,28 @@ class Inductor(Component):
         return (self.initial_current / self.s) + (self.voltage(terminals, voltages) / (self.s * self.inductance))
 
 class Capacitor(Component):
-    def __init__(self, name: str, positive: str, negative: str, capacitance: float, initial_voltage: float = 0) -> None:
-        super().__init__([positive, negative], name)
-        self.positive = positive
-        self.negative = negative
-        self.capacitance = capacitance
-        self.initial_voltage = initial_voltage
-
-    def stamp(self, matrix: np.ndarray, currents: np.ndarray, terminals: typing.Dict[str, int]) -> None:
-        matrix[terminals[self.negative], terminals[self.negative]] += self.s * self.capacitance
-        matrix[terminals[self.positive], terminals[self.negative]] -= self.s * self.capacitance
-        matrix[terminals[self.negative], terminals[self.positive]] -= self.s * self.capacitance
-        matrix[terminals[self.positive], terminals[self.positive]] += self.s * self.capacitance
+    __slots__ = ()
+    positive = store.Node()
+    negative = store.Node()
+    capacitance = store.Field()
+    initial_voltage = store.Field()
 
-        currents[terminals[self.positive]] += self.capacitance * self.initial_voltage
-        currents[terminals[self.negative]] -= self.capacitance * self.initial_voltage
+    def __init__(self, name: str, positive: str, negative: str, capacitance: float, initial_voltage: float = 0) -> None:
+        super().__init__(name, dict(positive=positive, negative=negative), capacitance=capacitance, initial_voltage=initial_voltage)
+
+    @property
+    def initial_charge(self) -> float:
+        return self.capacitance * self.initial_voltage
+
+    def stamps(self) -> typing.List[Stamp]:
+        return [
+            Stamp(self.negative, self.negative, 1, "capacitance", 1),
+            Stamp(self.positive, self.negative, -1, "capacitance", 1),
+            Stamp(self.negative, self.positive, -1, "capacitance", 1),
+            Stamp(self.positive, self.positive, 1, "capacitance", 1),
+            Stamp(self.positive, None, 1, "initial_charge"),
+            Stamp(self.negative, None, -1, "initial_charge"),
+        ]
 
     def voltage(self, terminals: typing.Dict[str, int], voltages: np.ndarray) -> complex:
         return voltages[terminals[self.positive]] - voltages[terminals[self.negative]]
@@ -134,19 +195,24 @@ class Capacitor(Component):
         return self.s * self.capacitance * self.voltage(terminals, voltages) - self.capacitance * self.initial_voltage
 
 class VoltageControlledCurrentSource(Component):
+    __slots__ = ()
+    positive = store.Node()
+    negative = store.Node()
+    positive_control = store.Node()
+    negative_control = store.Node()
+    transconductance = store.Field(complex)
+
     def __init__(self, name: str, positive: str, negative: str, positive_control: str, negative_control: str, transconductance: complex) -> None:
-        super().__init__([positive, negative, positive_control, negative_control], name)
-        self.positive = positive
-        self.negative = negative
-        self.positive_control = positive_control
-        self.negative_control = negative_control
-        self.transconductance = transconductance
-
-    def stamp(self, matrix: np.ndarray, currents: np.ndarray, maping: typing.Dict[str, int]) -> None:
-        matrix[maping[self.positive], maping[self.positive_control]] += self.transconductance
-        matrix[maping[self.positive], maping[self.negative_control]] -= self.transconductance
-        matrix[maping[self.negative], maping[self.positive_control]] -= self.transconductance
-        matrix[maping[self.negative], maping[self.negative_control]] += self.transconductance
+        super().__init__(name, dict(positive=positive, negative=negative, positive_control=positive_control,
+                                    negative_control=negative_control), transconductance=transconductance)
+
+    def stamps(self) -> typing.List[Stamp]:
+        return [
+            Stamp(self.positive, self.positive_control, 1, "transconductance"),
+            Stamp(self.positive, self.negative_control, -1, "transconductance"),
+            Stamp(self.negative, self.positive_control, -1, "transconductance"),
+            Stamp(self.negative, self.negative_control, 1, "transconductance"),
+        ]
 
     def voltage(self, terminals: typing.Dict[str, int], voltages: np.ndarray) -> complex:
         return voltages[terminals[self.positive]] - voltages[terminals[self.negative]]
@@ -155,22 +221,27 @@ class VoltageControlledCurrentSource(Component):
         return self.transconductance * (voltages[terminals[self.positive_control]] - voltages[terminals[self.negative_control]])
 
 class CurrentControlledVoltageSource(Component):
-    def __init__(self, name: str, positive: str, negative: str, positive_control: str, negative_control: str, transresistance: complex):
-        self.x = f"{name}_internal_i"
-        super().__init__([positive, negative, positive_control, negative_control, self.x], name)
-        self.positive = positive
-        self.negative = negative
-        self.positive_control = positive_control
-        self.negative_control = negative_control
-        self.transresistance = transresistance
+    __slots__ = ()
+    positive = store.Node()
+    negative = store.Node()
+    positive_control = store.Node()
+    negative_control = store.Node()
+    x = store.Internal()
+    transresistance = store.Field(complex)
 
-    def stamp(self, matrix: np.ndarray, currents: np.ndarray, terminals: typing.Dict[str, int]) -> None:
-        matrix[terminals[self.positive], terminals[self.x]] += 1
-        matrix[terminals[self.negative], terminals[self.x]] -= 1
-        matrix[terminals[self.x], terminals[self.positive]] -= 1
-        matrix[terminals[self.x], terminals[self.negative]] += 1
-        matrix[terminals[self.x], terminals[self.positive_control]] += self.transresistance
-        matrix[terminals[self.x], terminals[self.negative_control]] -= self.transresistance
+    def __init__(self, name: str, positive: str, negative: str, positive_control: str, negative_control: str, transresistance: complex):
+        super().__init__(name, dict(positive=positive, negative=negative, positive_control=positive_control,
+                                    negative_control=negative_control), transresistance=transresistance)
+
+    def stamps(self) -> typing.List[Stamp]:
+        return [
+            Stamp(self.positive, self.x, 1),
+            Stamp(self.negative, self.x, -1),
+            Stamp(self.x, self.positive, -1),
+            Stamp(self.x, self.negative, 1),
+            Stamp(self.x, self.positive_control, 1, "transresistance"),
+            Stamp(self.x, self.negative_control, -1, "transresistance"),
+        ]
 
     def voltage(self, terminals: typing.Dict[str, int], voltages: np.ndarray) -> complex:
         return self.transresistance * (voltages[terminals[self.positive_control]] - voltages[terminals[self.negative_control]])
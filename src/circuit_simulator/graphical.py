@@ -1,8 +1,86 @@
+import typing
 import numpy as np
 import abc
 import matplotlib.pyplot as plt
 import matplotlib.colors as pltcolors
 
+class Samples(typing.NamedTuple):
+    # values[i, j] = f(real[j] + 1j*imag[i]); for Bode samples real has one entry.
+    # log marks log-spaced frequencies, which are plotted on a log axis
+    real: np.ndarray
+    imag: np.ndarray
+    values: np.ndarray
+    log: bool = False
+
+# Magnitudes below this fraction of the largest sample are treated as equal (zero for
+# plotting purposes), and intervals narrower than this fraction of the sampled range are
+# not split further
+MAGNITUDE_FLOOR: float = 1e-9
+MIN_INTERVAL: float = 1e-6
+
+def deviation(left: np.ndarray, right: np.ndarray, middle: np.ndarray, floor: float = 0.0) -> np.ndarray:
+    # How far a midpoint is from interpolating its neighbours, in decades of
+    # magnitude and fractions of pi in phase. Phase is only compared where all three
+    # magnitudes are above the floor; non-finite deviations (poles, 0/0) count as converged.
+    floor = max(floor, np.finfo(float).tiny)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        magnitudes = [np.maximum(np.abs(values), floor) for values in (left, middle, right)]
+        low, mid, high = [np.log10(magnitude) for magnitude in magnitudes]
+        module = np.abs(mid - (low + high) / 2)
+        step = np.angle(right / left) / 2
+        phase = np.abs(np.angle(middle / (left * np.exp(1j * step)))) / np.pi
+        visible = (np.abs(left) > floor) & (np.abs(middle) > floor) & (np.abs(right) > floor)
+        error = np.fmax(module, np.where(visible, phase, 0))
+    return np.where(np.isfinite(error), error, 0).max(axis=-1)
+
+def floor_of(values: np.ndarray) -> float:
+    finite = np.abs(values[np.isfinite(values)])
+    return MAGNITUDE_FLOOR * float(np.max(finite)) if finite.size else 0.0
+
+def midpoints(points: np.ndarray, active: np.ndarray, budget: int, log: bool,
+              min_width: float) -> typing.Tuple[np.ndarray, np.ndarray]:
+    # The points with a midpoint inserted into each active interval (at most budget of
+    # them, none narrower than min_width) and a mask of the inserted points
+    a, b = points[:-1], points[1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        width = np.log(b / a) if log else b - a
+    chosen = np.flatnonzero(active & (width > min_width))[:max(0, budget)]
+    middle = np.sqrt(a[chosen] * b[chosen]) if log else (a[chosen] + b[chosen]) / 2
+    refined = np.insert(points, chosen + 1, middle)
+    inserted = np.zeros(refined.size, dtype=bool)
+    inserted[chosen + np.arange(chosen.size) + 1] = True
+    return refined, inserted
+
+def inaccurate(values: np.ndarray, inserted: np.ndarray, tol: float, floor: float) -> np.ndarray:
+    # Both halves of every interval whose inserted midpoint was off the interpolation;
+    # values has one row per point and the neighbours of an inserted point are old points
+    new = np.flatnonzero(inserted)
+    bad = new[deviation(values[new - 1], values[new + 1], values[new], floor) > tol]
+    active = np.zeros(inserted.size - 1, dtype=bool)
+    active[bad - 1] = True
+    active[bad] = True
+    return active
+
+def refine(points: np.ndarray, values: np.ndarray, evaluate: typing.Callable[[np.ndarray], np.ndarray],
+           tol: float, max_points: int, log: bool = False, active: typing.Optional[np.ndarray] = None,
+           min_width: float = 0.0) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # One refinement level: evaluate the midpoints of the active intervals in a single
+    # call and mark the halves of the intervals that were still inaccurate.
+    # values has one row per point; evaluate returns rows for new points.
+    if active is None:
+        active = np.ones(points.size - 1, dtype=bool)
+    refined, inserted = midpoints(points, active, max_points - points.size, log, min_width)
+    if not inserted.any():
+        return points, values, np.zeros(points.size - 1, dtype=bool)
+    grown = np.empty(shape=(refined.size,) + values.shape[1:], dtype=complex)
+    grown[~inserted] = values
+    grown[inserted] = evaluate(refined[inserted])
+    return refined, grown, inaccurate(grown, inserted, tol, floor_of(grown))
+
+def span(points: np.ndarray, log: bool) -> float:
+    # The width below which intervals are no longer split
+    return MIN_INTERVAL * float(np.log(points[-1] / points[0]) if log else points[-1] - points[0])
+
 class ComplexFunction(abc.ABC):
     def __init__(self, resolution: int=500, real_range: tuple=(-1000, 1000), imag_range: tuple=(-1000, 1000)):
         self.resolution = resolution
@@ -22,32 +100,90 @@ class ComplexFunction(abc.ABC):
     def phase(s: complex) -> complex:
         return np.angle(s)
 
-    def plot_bode(self, cut: float=0.0) -> None:
-        freq = np.linspace(self.imag_range[0], self.imag_range[1], self.resolution)
-        full_domain = cut + 1j*freq
-
-        f_jw = self.f(full_domain)
+    def frequencies(self, count: int, log: bool = False, decades: int = 6) -> np.ndarray:
+        if not log:
+            return np.linspace(self.imag_range[0], self.imag_range[1], count)
+        # Log spacing covers positive frequencies only
+        high = self.imag_range[1]
+        low = self.imag_range[0] if self.imag_range[0] > 0 else high / 10**decades
+        return np.logspace(np.log10(low), np.log10(high), count)
+
+    def sample_bode(self, cut: float = 0.0, adaptive: bool = False, log: bool = False,
+                    tol: float = 1e-2, max_points: typing.Optional[int] = None) -> Samples:
+        if not adaptive:
+            freq = self.frequencies(self.resolution, log)
+            return Samples(np.array([cut]), freq, np.asarray(self.f(cut + 1j*freq)).reshape(-1, 1), log)
+
+        # Start coarse and only split intervals where module or phase bends
+        max_points = max_points or 10 * self.resolution
+        freq = self.frequencies(min(33, max_points), log)
+        values = np.asarray(self.f(cut + 1j*freq)).reshape(-1, 1)
+        min_width = span(freq, log)
+        active = None
+        while active is None or active.any():
+            freq, values, active = refine(freq, values, lambda w: np.asarray(self.f(cut + 1j*w)).reshape(-1, 1),
+                                          tol, max_points, log, active, min_width)
+        return Samples(np.array([cut]), freq, values, log)
+
+    def sample_laplace(self, adaptive: bool = False, tol: float = 1e-2,
+                       max_points: typing.Optional[int] = None) -> Samples:
+        if not adaptive:
+            count = min(self.resolution, 50)
+            real_domain = np.linspace(self.real_range[0], self.real_range[1], count)
+            freq = np.linspace(self.imag_range[0], self.imag_range[1], count)
+            real_part, imag_part = np.meshgrid(real_domain, freq)
+            return Samples(real_domain, freq, np.asarray(self.f(real_part + 1j*imag_part)))
+
+        # Non-uniform tensor grid: each axis is refined where any row/column bends
+        max_points = max_points or self.resolution
+        real_domain = np.linspace(self.real_range[0], self.real_range[1], min(17, max_points))
+        freq = np.linspace(self.imag_range[0], self.imag_range[1], min(17, max_points))
+        values = np.asarray(self.f(real_domain[None, :] + 1j*freq[:, None]))
+
+        # Each level splits both axes and evaluates every new grid point in one call
+        widths = span(real_domain, False), span(freq, False)
+        real_active = np.ones(real_domain.size - 1, dtype=bool)
+        imag_active = np.ones(freq.size - 1, dtype=bool)
+        while real_active.any() or imag_active.any():
+            real_refined, real_new = midpoints(real_domain, real_active, max_points - real_domain.size, False, widths[0])
+            imag_refined, imag_new = midpoints(freq, imag_active, max_points - freq.size, False, widths[1])
+            if not real_new.any() and not imag_new.any():
+                break
+            grid = np.empty(shape=(imag_refined.size, real_refined.size), dtype=complex)
+            grid[np.ix_(~imag_new, ~real_new)] = values
+            new = imag_new[:, None] | real_new[None, :]
+            grid[new] = np.asarray(self.f((real_refined[None, :] + 1j*imag_refined[:, None])[new]))
+
+            floor = floor_of(grid)
+            imag_active = inaccurate(grid, imag_new, tol, floor)
+            real_active = inaccurate(grid.T, real_new, tol, floor)
+            real_domain, freq, values = real_refined, imag_refined, grid
+        return Samples(real_domain, freq, values)
+
+    def plot_bode(self, cut: float=0.0, samples: typing.Optional[Samples] = None, **sampling) -> Samples:
+        samples = samples or self.sample_bode(cut, **sampling)
+        freq = samples.imag
+        f_jw = samples.values[:, 0]
+        plot = plt.semilogx if samples.log else plt.plot
 
         plt.figure(figsize=(9.6, 10))
 
         plt.subplot(2, 1, 1)
         plt.ylabel("Module")
-        plt.plot(freq, self.module(f_jw), color="black")
+        plot(freq, self.module(f_jw), color="black")
 
         plt.subplot(2, 1, 2)
         plt.ylabel("Phase")
         plt.xlabel("Frequency")
-        plt.plot(freq, self.phase(f_jw), color="black")
+        plot(freq, self.phase(f_jw), color="black")
 
         plt.show()
+        return samples
 
-    def plot_laplace(self) -> None:
-        real_domain = np.linspace(self.real_range[0], self.real_range[1], min(self.resolution, 50))
-        freq = np.linspace(self.imag_range[0], self.imag_range[1], min(self.resolution, 50))
-        real_part, imag_part = np.meshgrid(real_domain, freq)
-        full_domain = real_part + 1j*imag_part
-
-        f_s = self.f(full_domain)
+    def plot_laplace(self, samples: typing.Optional[Samples] = None, **sampling) -> Samples:
+        samples = samples or self.sample_laplace(**sampling)
+        real_part, imag_part = np.meshgrid(samples.real, samples.imag)
+        f_s = samples.values
 
         fig, ax = plt.subplots(subplot_kw={"projection": "3d"}, figsize=(9.6, 10))
 
@@ -69,6 +205,7 @@ class ComplexFunction(abc.ABC):
         ax.set_zlabel("Module")
 
         plt.show()
+        return samples
 
 if __name__ == "__main__":
     class F(ComplexFunction):
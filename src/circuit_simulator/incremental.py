@@ -0,0 +1,152 @@
+import collections
+import typing
+import numpy as np
+
+from . import profiling
+from .assembly import System
+
+class Base:
+    # A kept factorization, the matrix values it was computed from and, while the edits
+    # last, its solves for the unchanged right-hand side and for the edited rows' unit vectors
+    __slots__ = ("system", "factorization", "values", "current", "updates", "rhs", "solved", "columns")
+
+    def __init__(self, system: System, factorization, values: np.ndarray) -> None:
+        self.system = system
+        self.factorization = factorization
+        self.values = values
+        self.current = values
+        self.updates: int = 0
+        self.rhs: typing.Optional[np.ndarray] = None
+        self.solved: typing.Optional[np.ndarray] = None
+        self.columns: typing.Dict[int, np.ndarray] = dict()
+
+    def solve(self, rhs: np.ndarray) -> np.ndarray:
+        if self.rhs is None or self.rhs.shape != rhs.shape or not np.array_equal(self.rhs, rhs):
+            self.rhs = rhs.copy()
+            self.solved = self.factorization.solve(rhs).reshape(rhs.shape)
+        return self.solved
+
+    def inverse_columns(self, rows: np.ndarray) -> np.ndarray:
+        # A^-1 e_r for each edited row r, solved once per row
+        missing = [int(row) for row in rows if int(row) not in self.columns]
+        if missing:
+            unit = np.zeros(shape=(self.system.size, len(missing)), dtype=complex)
+            unit[missing, np.arange(len(missing))] = 1
+            solved = self.factorization.solve(unit).reshape(unit.shape)
+            for k, row in enumerate(missing):
+                self.columns[row] = solved[:, k]
+        return np.stack([self.columns[int(row)] for row in rows], axis=1)
+
+class Update:
+    # The kept factorization of A plus the edit A' - A = U W, where U selects the k edited
+    # rows and W holds their changes. Sherman-Morrison-Woodbury:
+    # A'^-1 b = z - Y (I + W Y)^-1 W z with z = A^-1 b and Y = A^-1 U. Both z and Y are
+    # kept on the base, so repeated edits cost a k x k solve and a few O(nnz) products.
+    def __init__(self, owner: "Incremental", key: typing.Tuple[int, complex], base: Base, values: np.ndarray,
+                 changed: np.ndarray, solver) -> None:
+        self.owner = owner
+        self.key = key
+        self.base = base
+        self.values = values
+        self.solver = solver
+        matrix = base.system.matrix
+
+        edited, self.positions = np.unique(matrix.rows[changed], return_inverse=True)
+        self.cols = matrix.cols[changed]
+        self.deltas = values[changed] - base.values[changed]
+        self.rank: int = edited.size
+        self.y = base.inverse_columns(edited)
+        self.capacitance = np.eye(self.rank, dtype=complex) + self.apply(self.y)
+
+    def apply(self, x: np.ndarray) -> np.ndarray:
+        # W x for x of shape (n, columns)
+        product = np.zeros(shape=(self.rank, x.shape[1]), dtype=complex)
+        np.add.at(product, self.positions, self.deltas[:, None] * x[self.cols])
+        return product
+
+    def solve(self, rhs: np.ndarray) -> np.ndarray:
+        rhs = np.asarray(rhs, dtype=complex)
+        columns = rhs.reshape(rhs.shape[0], -1)
+        with profiling.phase("woodbury", size=self.base.system.size, rank=self.rank):
+            z = self.base.solve(columns)
+            try:
+                solution = z - self.y @ np.linalg.solve(self.capacitance, self.apply(z))
+            except np.linalg.LinAlgError:
+                solution = None
+
+        # A residual check on the edited matrix guards against a badly conditioned update
+        if solution is None or self.residual(columns, solution) > self.owner.tolerance:
+            self.owner.fallbacks += 1
+            factorization = self.owner.refactor(self.key, self.base.system, self.values, self.solver)
+            solution = factorization.solve(columns).reshape(columns.shape)
+        return solution.reshape(rhs.shape)
+
+    def residual(self, rhs: np.ndarray, solution: np.ndarray) -> float:
+        # Relative residual of one random combination of the columns, a single O(nnz) product
+        if not np.all(np.isfinite(solution)):
+            return np.inf
+        weights = np.random.default_rng(0).standard_normal(solution.shape[1])
+        x, b = solution @ weights, rhs @ weights
+        matrix = self.base.system.matrix
+        terms = self.values * x[matrix.cols]
+        size = self.base.system.size
+        product = np.bincount(matrix.rows, terms.real, size) + 1j * np.bincount(matrix.rows, terms.imag, size)
+        scale = np.max(np.abs(self.values)) * np.max(np.abs(x)) + np.max(np.abs(b))
+        return float(np.max(np.abs(product - b)) / max(scale, np.finfo(float).tiny))
+
+class Incremental:
+    # Keeps the last factorization per (system, s), sparse or dense LU. Later solves whose
+    # matrix differs in a few rows (a handful of edited components) apply low-rank updates
+    # to it instead of refactoring, until max_updates edits or max_rank edited rows have
+    # piled up, or the residual exceeds tolerance.
+    def __init__(self, max_updates: int = 16, max_rank: int = 32, tolerance: float = 1e-10,
+                 max_entries: int = 16) -> None:
+        self.max_updates = max_updates
+        self.max_rank = max_rank
+        self.tolerance = tolerance
+        self.max_entries = max_entries
+        self.bases: "collections.OrderedDict[typing.Tuple[int, complex], Base]" = collections.OrderedDict()
+        self.factorizations: int = 0
+        self.reuses: int = 0
+        self.updates: int = 0
+        self.fallbacks: int = 0
+
+    def factorize(self, system: System, s: complex, values: np.ndarray, solver):
+        key = (id(system), complex(s))
+        base = self.bases.get(key)
+        if base is None or base.system is not system:
+            return self.refactor(key, system, values, solver)
+        self.bases.move_to_end(key)
+
+        changed = np.flatnonzero(values != base.values)
+        if not changed.size:
+            self.reuses += 1
+            return base.factorization
+        if np.any(values != base.current):
+            base.updates += 1
+            base.current = values
+        if base.updates > self.max_updates or np.unique(system.matrix.rows[changed]).size > self.max_rank:
+            return self.refactor(key, system, values, solver)
+        self.updates += 1
+        return Update(self, key, base, values, changed, solver)
+
+    def refactor(self, key: typing.Tuple[int, complex], system: System, values: np.ndarray, solver):
+        self.factorizations += 1
+        factorization = solver.factorize(system, solver.assemble(system, values))
+        self.bases[key] = Base(system, factorization, values)
+        self.bases.move_to_end(key)
+        while len(self.bases) > self.max_entries:
+            self.bases.popitem(last=False)
+        return factorization
+
+    def clear(self) -> None:
+        self.bases.clear()
+
+    def stats(self) -> typing.Dict[str, int]:
+        return {
+            "factorizations": self.factorizations,
+            "reuses": self.reuses,
+            "updates": self.updates,
+            "fallbacks": self.fallbacks,
+            "entries": len(self.bases),
+        }
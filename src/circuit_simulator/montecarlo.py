@@ -0,0 +1,189 @@
+import atexit
+import concurrent.futures
+import functools
+import itertools
+import os
+import typing
+import numpy as np
+
+from . import profiling
+from .assembly import Entries, System
+from .backends import select_backend, singular
+from .results import gather
+from .superposition import solve_direct
+from .sweep import MAX_BATCH_BYTES
+
+Parameter = typing.Tuple[str, str]
+# Below this many variant x frequency x size^2 units a solve stays in this process: starting
+# workers and pickling the systems costs more than it saves
+POOL_WORK: int = 10**8
+# Worker pools by size, started on first use and kept for later solves
+POOLS: typing.Dict[int, concurrent.futures.ProcessPoolExecutor] = dict()
+# Draws count values around the nominal one: f(rng, nominal, count)
+Distribution = typing.Callable[[np.random.Generator, float, int], np.ndarray]
+
+def uniform(tolerance: float) -> Distribution:
+    return lambda rng, nominal, count: nominal * (1 + rng.uniform(-tolerance, tolerance, count))
+
+def gaussian(tolerance: float, sigmas: float = 3.0) -> Distribution:
+    # tolerance is the relative deviation at `sigmas` standard deviations
+    return lambda rng, nominal, count: nominal * (1 + rng.normal(0, tolerance / sigmas, count))
+
+def grid(values: typing.Dict[Parameter, typing.Sequence[float]]) -> typing.Dict[Parameter, np.ndarray]:
+    # Cartesian product of per-parameter values, one variant per combination
+    combinations = np.array(list(itertools.product(*values.values())), dtype=float).reshape(-1, len(values))
+    return {parameter: combinations[:, i] for i, parameter in enumerate(values)}
+
+def stack(entries: Entries, coefficients: np.ndarray, shape: typing.Tuple[int, ...]) -> typing.Dict[int, np.ndarray]:
+    # System.split for many coefficient vectors at once: one (V, *shape) array per power of s
+    terms: typing.Dict[int, np.ndarray] = dict()
+    values = entries.signs * coefficients[:, entries.slots]
+    flat = entries.rows if entries.cols is None else entries.rows * shape[0] + entries.cols
+    for order in np.unique(entries.orders):
+        mask = entries.orders == order
+        term = np.zeros(shape=(int(np.prod(shape)), coefficients.shape[0]), dtype=complex)
+        np.add.at(term, flat[mask], values[:, mask].T)
+        terms[int(order)] = term.T.reshape(coefficients.shape[0], *shape)
+    return terms
+
+def solve_stacked(system: System, coefficients: np.ndarray, s_values: np.ndarray, excitation: int) -> np.ndarray:
+    # (V, N, size) solution of every variant at every s, solved as stacked dense systems
+    n = system.size
+    solution = np.zeros(shape=(coefficients.shape[0], s_values.size, n), dtype=complex)
+    chunk = max(1, MAX_BATCH_BYTES // (16 * max(1, n) ** 2 * max(1, s_values.size)))
+    for start in range(0, coefficients.shape[0], chunk):
+        block = coefficients[start:start + chunk]
+        matrix = stack(system.matrix, block, (n, n))
+        currents = stack(system.rhs.substitute(excitation), block, (n,))
+        a = sum((s_values ** order)[None, :, None, None] * m[:, None] for order, m in matrix.items())
+        b = sum((s_values ** order)[None, :, None] * c[:, None] for order, c in currents.items())
+        try:
+            solution[start:start + chunk] = np.linalg.solve(a, b[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            raise singular()
+    return solution
+
+def solve_chunk(coefficients: np.ndarray, systems: typing.List[System], frequencies: typing.List[np.ndarray],
+                excitation: int, backend: str, n: int) -> np.ndarray:
+    # Runs in the worker processes, so it only sees picklable arrays and systems
+    solution = np.zeros(shape=(coefficients.shape[0], frequencies[0].size if frequencies else 0, n), dtype=complex)
+    for system, s_values in zip(systems, frequencies):
+        if select_backend(backend, system.size).name == "dense":
+            part = solve_stacked(system, coefficients, s_values, excitation)
+        else:
+            # Large systems keep one sparse factorization per variant and s, reusing the ordering
+            part = np.array([[solve_direct(system, s, values, backend, excitation) for s in s_values]
+                             for values in coefficients]).reshape(coefficients.shape[0], s_values.size, system.size)
+        solution[:, :, system.keep] += part
+    return solution
+
+def executor(workers: int) -> concurrent.futures.ProcessPoolExecutor:
+    if workers not in POOLS:
+        if not POOLS:
+            atexit.register(shutdown)
+        POOLS[workers] = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    return POOLS[workers]
+
+def shutdown() -> None:
+    for pool in POOLS.values():
+        pool.shutdown()
+    POOLS.clear()
+
+class VariantSweep:
+    # Many value variants of one topology; the plan, node index and orderings are shared
+    def __init__(self, circuit, ground: str, variants: typing.Dict[Parameter, np.ndarray]) -> None:
+        self.circuit = circuit
+        self.plan = circuit.compile()
+        assert not self.plan.dynamic, "Variant sweeps need a polynomial pencil"
+        self.ground = ground
+        self.variants = {parameter: np.asarray(values, dtype=complex).reshape(-1) for parameter, values in variants.items()}
+        counts = {values.size for values in self.variants.values()}
+        assert len(counts) <= 1, "Every parameter needs one value per variant"
+        self.count: int = counts.pop() if counts else 1
+
+        for name, parameter in self.variants:
+            assert name in self.circuit.components, f"Component {name} not found"
+            assert hasattr(self.circuit.components[name], parameter), f"{name} has no parameter {parameter}"
+
+    def coefficients(self) -> np.ndarray:
+        # (V, slots): derived slots such as a capacitor's initial charge follow the perturbed values
+        return self.plan.coefficients(self.variants)
+
+    @profiling.instrument("variants")
+    def solve(self, s_values: typing.Optional[np.ndarray] = None, excitation: typing.Optional[str] = None,
+              workers: typing.Optional[int] = None) -> np.ndarray:
+        # Node voltages of every variant, (V, n) or (V, N_s, n) for a sweep.
+        # Without s_values each source is evaluated at its own s, as in Circuit.solve.
+        systems = self.plan.systems(self.ground)
+        excitation_slot = self.plan.find(excitation, "s")
+
+        sweep = np.asarray(s_values, dtype=complex).reshape(-1) if s_values is not None else None
+        frequencies = [sweep if sweep is not None else np.array([system.term.component.s], dtype=complex)
+                       for system in systems]
+
+        coefficients = self.coefficients()
+        # Workers only need the entries, not the components and store behind each term
+        systems = [System(None, system.keep, system.matrix, system.rhs) for system in systems]
+        task = functools.partial(solve_chunk, systems=systems, frequencies=frequencies, excitation=excitation_slot,
+                                 backend=self.circuit.backend, n=self.plan.n)
+        # Serial unless workers asks for a pool or the work is large enough to pay for one
+        if workers is None:
+            work = self.count * frequencies[0].size * sum(system.size ** 2 for system in systems) if systems else 0
+            workers = (os.cpu_count() or 1) if work >= POOL_WORK else 1
+        if workers == 1 or self.count == 1:
+            solution = task(coefficients)
+        else:
+            # Variants are drawn up front, so results do not depend on how they are split
+            chunks = np.array_split(coefficients, min(self.count, 4 * workers))
+            pool = executor(workers)
+            try:
+                solution = np.concatenate(list(pool.map(task, chunks)), axis=0)
+            except concurrent.futures.process.BrokenProcessPool:
+                # A dead worker breaks the pool for good; the next solve starts a fresh one
+                POOLS.pop(workers, None)
+                raise
+
+        if sweep is None or np.ndim(s_values) == 0:
+            return solution[:, 0]
+        return solution
+
+    def evaluate(self, s_values: np.ndarray, outputs: typing.List[typing.Tuple[str, str]],
+                 excitation: typing.Optional[str] = None, workers: typing.Optional[int] = None) -> typing.List[np.ndarray]:
+        # Component quantities of every variant, one (V, N_s) array per output
+        s_values = np.asarray(s_values, dtype=complex).reshape(-1)
+        solution = self.solve(s_values, excitation, workers)
+        voltages = np.moveaxis(solution, -1, 0)
+
+        # Passive components follow s and the variant values are overridden on the gathered views
+        overrides = {parameter: values.reshape(-1, 1) for parameter, values in self.variants.items()}
+        if excitation:
+            overrides[(excitation, "s")] = s_values[None, :]
+        names = list(dict.fromkeys(name for name, _ in outputs))
+        voltage, current = gather(self.circuit.store, names, voltages, {"s": s_values[None, :]}, overrides)
+
+        results = []
+        for name, kind in outputs:
+            assert kind in ["Voltage", "Current", "Power"]
+            i = names.index(name)
+            results.append({"Voltage": voltage[i], "Current": current[i], "Power": voltage[i] * current[i]}[kind])
+        return results
+
+    def transfer_function(self, s_values: np.ndarray, input_node: typing.Tuple[str, str],
+                          output_node: typing.Tuple[str, str], workers: typing.Optional[int] = None) -> np.ndarray:
+        # (V, N_s) values of output/input with the input component driven by s, as in Circuit.transfer_function
+        in_val, out_val = self.evaluate(s_values, [input_node, output_node], excitation=input_node[0], workers=workers)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(in_val == 0, 0, out_val / in_val)
+
+def sample(circuit, distributions: typing.Dict[Parameter, typing.Union[Distribution, np.ndarray]],
+           count: int, seed: typing.Optional[int] = None) -> typing.Dict[Parameter, np.ndarray]:
+    # Draws in a fixed parameter order from one generator, so a seed fixes every variant
+    rng = np.random.default_rng(seed)
+    variants = dict()
+    for (name, parameter), distribution in distributions.items():
+        if callable(distribution):
+            nominal = getattr(circuit.components[name], parameter)
+            variants[(name, parameter)] = np.asarray(distribution(rng, nominal, count))
+        else:
+            variants[(name, parameter)] = np.asarray(distribution).reshape(-1)[:count]
+    return variants
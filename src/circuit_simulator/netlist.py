@@ -0,0 +1,170 @@
+import re
+import typing
+
+from . import components as Component
+
+SUFFIXES: typing.Dict[str, float] = {
+    "t": 1e12, "g": 1e9, "meg": 1e6, "k": 1e3, "mil": 25.4e-6,
+    "m": 1e-3, "u": 1e-6, "n": 1e-9, "p": 1e-12, "f": 1e-15,
+}
+NUMBER = re.compile(r"^([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)(meg|mil|[tgkmunpf])?[a-z]*$", re.IGNORECASE)
+
+class Subcircuit(typing.NamedTuple):
+    name: str
+    ports: typing.List[str]
+    cards: typing.List[typing.List[str]]
+
+def value(token: str) -> float:
+    try:
+        return float(token)
+    except ValueError:
+        pass
+    match = NUMBER.match(token)
+    if not match:
+        raise ValueError(f"Invalid value '{token}'")
+    number, suffix = match.groups()
+    return float(number) * SUFFIXES.get((suffix or "").lower(), 1.0)
+
+def logical_lines(lines: typing.Iterable[str], title: bool = True) -> typing.Iterator[typing.Tuple[int, str]]:
+    # Joins '+' continuation lines and drops comments, one card at a time. As in SPICE, the
+    # first line is the title and never a card unless title is False.
+    pending, start = None, 0
+    for number, line in enumerate(lines, start=1):
+        if title and number == 1:
+            continue
+        line = line.split(";", 1)[0].strip()
+        if not line or line.startswith("*"):
+            continue
+        if line.startswith("+"):
+            if pending is None:
+                raise ValueError(f"Line {number}: continuation without a card")
+            pending += " " + line[1:]
+            continue
+        if pending is not None:
+            yield start, pending
+        pending, start = line, number
+    if pending is not None:
+        yield start, pending
+
+# One component as the store takes it: class, name, node names by role, values by field
+Record = typing.Tuple[type, str, typing.Dict[str, str], typing.Dict[str, typing.Any]]
+
+def component(tokens: typing.List[str], name: str, nodes: typing.List[str]) -> Record:
+    kind = tokens[0][0].upper()
+    args = tokens[len(nodes) + 1:]
+    options: typing.Dict[str, str] = dict()
+    if len(args) > 1:
+        options = {k.lower(): v for k, v in (arg.split("=", 1) for arg in args if "=" in arg)}
+        args = [arg for arg in args if "=" not in arg]
+    terminals = {"positive": nodes[0], "negative": nodes[1]}
+
+    if kind == "R":
+        return Component.Resistor, name, terminals, {"resistance": value(args[0])}
+    if kind == "L":
+        return Component.Inductor, name, terminals, {"inductance": value(args[0]), "initial_current": value(options.get("ic", "0"))}
+    if kind == "C":
+        return Component.Capacitor, name, terminals, {"capacitance": value(args[0]), "initial_voltage": value(options.get("ic", "0"))}
+    if kind in "VI":
+        # "DC 5", "AC 1" and a bare "5" all give the source value
+        args = [arg for arg in args if arg.upper() not in ("DC", "AC")]
+        source = Component.VoltageSource if kind == "V" else Component.CurrentSource
+        return source, name, terminals, {"s": value(args[0])}
+
+    terminals.update(positive_control=nodes[2], negative_control=nodes[3])
+    if kind == "G":
+        return Component.VoltageControlledCurrentSource, name, terminals, {"transconductance": value(args[0])}
+    if kind == "H":
+        return Component.CurrentControlledVoltageSource, name, terminals, {"transresistance": value(args[0])}
+    raise ValueError(f"Unsupported card '{tokens[0]}'")
+
+NODE_COUNT: typing.Dict[str, int] = {"R": 2, "L": 2, "C": 2, "V": 2, "I": 2, "G": 4, "H": 4}
+
+def expand(tokens: typing.List[str], subcircuits: typing.Dict[str, Subcircuit],
+           prefix: str = "", mapping: typing.Optional[typing.Dict[str, str]] = None) -> typing.Iterator[Record]:
+    # Flattens one card; subcircuit internals are named "<instance>.<name>"
+    kind = tokens[0][0].upper()
+    count = NODE_COUNT.get(kind, 0)
+    if not prefix and count:
+        # Top-level cards keep their node names as written
+        if len(tokens) < count + 2:
+            raise ValueError(f"Card '{tokens[0]}' needs {count} nodes and a value")
+        yield component(tokens, tokens[0], tokens[1:count + 1])
+        return
+
+    mapping = mapping or dict()
+
+    def node(name: str) -> str:
+        if name == "0" or name in mapping:
+            return mapping.get(name, name)
+        return prefix + name
+
+    if kind == "X":
+        if tokens[-1].lower() not in subcircuits:
+            raise ValueError(f"Unknown subcircuit '{tokens[-1]}'")
+        definition = subcircuits[tokens[-1].lower()]
+        ports = tokens[1:-1]
+        if len(ports) != len(definition.ports):
+            raise ValueError(f"'{tokens[0]}' connects {len(ports)} nodes to {definition.name} with {len(definition.ports)} ports")
+        inner = dict(zip(definition.ports, (node(p) for p in ports)))
+        for card in definition.cards:
+            yield from expand(card, subcircuits, f"{prefix}{tokens[0]}.", inner)
+        return
+
+    if not count:
+        raise ValueError(f"Unsupported card '{tokens[0]}'")
+    if len(tokens) < count + 2:
+        raise ValueError(f"Card '{tokens[0]}' needs {count} nodes and a value")
+    yield component(tokens, prefix + tokens[0], [node(n) for n in tokens[1:count + 1]])
+
+def defined(name: str, subcircuits: typing.Dict[str, Subcircuit], seen: typing.Tuple[str, ...] = ()) -> bool:
+    # True once name and every subcircuit instantiated inside it (at any depth) are defined
+    key = name.lower()
+    if key in seen:
+        raise ValueError(f"Subcircuit '{name}' instantiates itself")
+    if key not in subcircuits:
+        return False
+    return all(defined(card[-1], subcircuits, seen + (key,))
+               for card in subcircuits[key].cards if card[0][0].upper() == "X")
+
+def parse(lines: typing.Iterable[str], title: bool = True) -> typing.Iterator[Record]:
+    # Streams components from SPICE cards (R, L, C, V, I, G, H, X with .subckt).
+    # Instances of subcircuits defined later in the file, directly or through an X card
+    # inside a .subckt body, are expanded at the end.
+    subcircuits: typing.Dict[str, Subcircuit] = dict()
+    deferred: typing.List[typing.Tuple[int, typing.List[str]]] = []
+    current: typing.Optional[Subcircuit] = None
+
+    for number, line in logical_lines(lines, title):
+        tokens = line.split()
+        keyword = tokens[0].lower()
+        try:
+            if keyword == ".subckt":
+                current = Subcircuit(tokens[1], tokens[2:], [])
+            elif keyword == ".ends":
+                if current is None:
+                    raise ValueError(".ends without .subckt")
+                subcircuits[current.name.lower()] = current
+                current = None
+            elif keyword == ".end":
+                break
+            elif keyword.startswith("."):
+                continue
+            elif current is not None:
+                current.cards.append(tokens)
+            elif keyword[0] == "x" and not defined(tokens[-1], subcircuits):
+                deferred.append((number, tokens))
+            else:
+                yield from expand(tokens, subcircuits)
+        except (ValueError, IndexError) as error:
+            raise ValueError(f"Line {number}: {error}") from error
+
+    for number, tokens in deferred:
+        try:
+            defined(tokens[-1], subcircuits)
+            yield from expand(tokens, subcircuits)
+        except (ValueError, IndexError) as error:
+            raise ValueError(f"Line {number}: {error}") from error
+
+def load(path: str, title: bool = True) -> typing.Iterator[Record]:
+    with open(path) as file:
+        yield from parse(file, title)
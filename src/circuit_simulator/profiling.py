@@ -0,0 +1,208 @@
+import atexit
+import functools
+import json
+import multiprocessing
+import os
+import threading
+import time
+import typing
+import numpy as np
+
+class Event(typing.NamedTuple):
+    # One finished phase; start is in seconds since the profiler was created
+    name: str
+    start: float
+    duration: float
+    depth: int
+    thread: int
+    info: typing.Dict[str, typing.Any]
+
+class Phase:
+    __slots__ = ("profiler", "name", "info", "start", "depth")
+
+    def __init__(self, profiler: "Profiler", name: str, info: typing.Dict[str, typing.Any]) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.info = info
+
+    def __enter__(self) -> "Phase":
+        stack = self.profiler.stack()
+        self.depth = len(stack)
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        end = time.perf_counter()
+        stack = self.profiler.stack()
+        stack.pop()
+        # estimated_bytes is what this phase allocates itself, worked out by the call site from
+        # the array sizes (not measured); estimated_allocated includes nested phases
+        allocated = self.info.get("estimated_allocated", 0) + self.info.get("estimated_bytes", 0)
+        if allocated:
+            self.info["estimated_allocated"] = allocated
+            if stack:
+                stack[-1].info["estimated_allocated"] = stack[-1].info.get("estimated_allocated", 0) + allocated
+        self.profiler.record(Event(self.name, self.start - self.profiler.origin, end - self.start,
+                                   self.depth, threading.get_ident(), self.info))
+
+    def note(self, **info) -> None:
+        self.info.update(info)
+
+    def __bool__(self) -> bool:
+        return True
+
+class Disabled:
+    # Stand-in returned while nothing is profiled: a no-op context that is falsy, so
+    # call sites can skip computing their metadata with `if phase:`
+    __slots__ = ()
+
+    def __enter__(self) -> "Disabled":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+    def note(self, **info) -> None:
+        pass
+
+    def __bool__(self) -> bool:
+        return False
+
+DISABLED = Disabled()
+
+class Profiler:
+    # Per-phase wall time, call counts and the metadata noted by the instrumented code:
+    # size, nnz and fill of matrices, estimated allocation volume and, with condition=True,
+    # condition estimates (extra solves, timed in their own "condition" phase).
+    # hooks are called with every Event as it finishes.
+    def __init__(self, hooks: typing.Optional[typing.Iterable[typing.Callable[[Event], None]]] = None,
+                 condition: bool = False, trace: bool = True, max_events: int = 10**6) -> None:
+        self.hooks = list(hooks or [])
+        self.condition = condition
+        self.trace_events = trace
+        self.max_events = max_events
+        self.events: typing.List[Event] = []
+        self.phases: typing.Dict[str, typing.Dict[str, float]] = dict()
+        self.origin = time.perf_counter()
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.previous: typing.List[typing.Optional[Profiler]] = []
+
+    def stack(self) -> typing.List[Phase]:
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    def record(self, event: Event) -> None:
+        with self.lock:
+            stats = self.phases.setdefault(event.name, {"calls": 0, "time": 0.0, "estimated_bytes": 0,
+                                                        "estimated_allocated": 0})
+            stats["calls"] += 1
+            stats["time"] += event.duration
+            stats["estimated_bytes"] += event.info.get("estimated_bytes", 0)
+            stats["estimated_allocated"] += event.info.get("estimated_allocated", 0)
+            for key in ["size", "nnz", "fill", "condition"]:
+                if key in event.info:
+                    stats[f"max_{key}"] = max(stats.get(f"max_{key}", 0), event.info[key])
+            if self.trace_events and len(self.events) < self.max_events:
+                self.events.append(event)
+        for hook in self.hooks:
+            hook(event)
+
+    def __enter__(self) -> "Profiler":
+        global active
+        self.previous.append(active)
+        active = self
+        return self
+
+    def __exit__(self, *exc) -> None:
+        global active
+        active = self.previous.pop()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.events.clear()
+            self.phases.clear()
+            self.origin = time.perf_counter()
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "phases": {name: dict(stats) for name, stats in self.phases.items()},
+            "events": [event._asdict() for event in self.events],
+        }
+
+    def trace(self) -> typing.Dict[str, typing.Any]:
+        # Chrome trace event format, for chrome://tracing or Perfetto
+        return {"traceEvents": [{
+            "name": event.name,
+            "ph": "X",
+            "ts": event.start * 1e6,
+            "dur": event.duration * 1e6,
+            "pid": os.getpid(),
+            "tid": event.thread,
+            "args": {key: plain(value) for key, value in event.info.items()},
+        } for event in self.events]}
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump(self.trace(), file)
+
+    def report(self) -> str:
+        lines = [f"{'phase':<20}{'calls':>8}{'total ms':>12}{'mean us':>12}{'est. alloc':>14}"]
+        for name, stats in sorted(self.phases.items(), key=lambda item: -item[1]["time"]):
+            lines.append(f"{name:<20}{stats['calls']:>8}{stats['time'] * 1e3:>12.3f}"
+                         f"{stats['time'] / stats['calls'] * 1e6:>12.1f}{int(stats['estimated_allocated']):>14}")
+        return "\n".join(lines)
+
+def plain(value: typing.Any) -> typing.Any:
+    if isinstance(value, (complex, np.complexfloating)):
+        return str(complex(value))
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+# The profiler phases report to; None keeps every instrumented call site a no-op
+active: typing.Optional[Profiler] = None
+
+def phase(name: str, **info) -> typing.Union[Phase, Disabled]:
+    if active is None:
+        return DISABLED
+    return Phase(active, name, info)
+
+def instrument(name: str) -> typing.Callable[[typing.Callable], typing.Callable]:
+    # Decorator form of phase() for whole functions
+    def decorate(function: typing.Callable) -> typing.Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if active is None:
+                return function(*args, **kwargs)
+            with Phase(active, name, dict()):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def note(**info) -> None:
+    # Adds metadata to the innermost running phase of this thread
+    if active is not None and active.stack():
+        active.stack()[-1].note(**info)
+
+def condition() -> bool:
+    return active is not None and active.condition
+
+def enable(profiler: typing.Optional[Profiler] = None) -> Profiler:
+    # Process-wide profiling, e.g. for a production run
+    global active
+    active = profiler or Profiler()
+    return active
+
+def disable() -> typing.Optional[Profiler]:
+    global active
+    profiler, active = active, None
+    return profiler
+
+# CIRCUIT_SIMULATOR_PROFILE=trace.json profiles the whole process and writes a
+# Chrome trace at exit, without touching the code being run. Worker processes
+# (e.g. Monte Carlo pools) inherit the variable but leave the file to their parent.
+if os.environ.get("CIRCUIT_SIMULATOR_PROFILE") and multiprocessing.parent_process() is None:
+    atexit.register(enable(Profiler(condition=False)).save, os.environ["CIRCUIT_SIMULATOR_PROFILE"])
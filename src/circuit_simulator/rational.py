@@ -0,0 +1,284 @@
+import typing
+import numpy as np
+
+from .graphical import ComplexFunction
+
+class RationalFunction(ComplexFunction):
+    # H(s) = sum_j w_j f_j / (s - z_j) / sum_j w_j / (s - z_j), the stable form for
+    # evaluation. Poles and zeros are given (see fit) or derived from it once; gain matches it.
+    def __init__(self, support: np.ndarray, values: np.ndarray, weights: np.ndarray,
+                 poles: typing.Optional[np.ndarray] = None, zeros: typing.Optional[np.ndarray] = None, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.support = np.asarray(support, dtype=complex)
+        self.values = np.asarray(values, dtype=complex)
+        self.weights = np.asarray(weights, dtype=complex)
+        self.error: float = 0.0
+
+        # Without given poles and zeros they come from the barycentric form itself, see cleanup()
+        if poles is None or zeros is None:
+            poles, zeros = cleanup(self.support, self.values, self.weights)
+        self.poles, self.zeros = np.asarray(poles, dtype=complex), np.asarray(zeros, dtype=complex)
+        # Gain of the pole/zero form, matched at the support points
+        reference = self.support * (1 + 1e-3j)
+        with np.errstate(over="ignore", invalid="ignore"):
+            shape = np.prod(reference[:, None] - self.zeros, axis=1) / np.prod(reference[:, None] - self.poles, axis=1)
+            ratio = self.f(reference) / shape
+        ratio = ratio[np.isfinite(ratio)]
+        self.gain: complex = complex(np.median(ratio.real) + 1j * np.median(ratio.imag)) if ratio.size else 0j
+
+    def f(self, s_values):
+        s = np.asarray(s_values, dtype=complex)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cauchy = 1 / (s[..., None] - self.support)
+            result = (cauchy @ (self.weights * self.values)) / (cauchy @ self.weights)
+
+        # Exactly on a support point the barycentric form is 0/0
+        hits = s[..., None] == self.support
+        if np.any(hits):
+            result = np.where(np.any(hits, axis=-1), self.values[np.argmax(hits, axis=-1)], result)
+
+        if np.ndim(s_values) == 0:
+            return complex(result)
+        return result
+
+    @property
+    def numerator(self) -> np.ndarray:
+        return self.gain * np.poly(self.zeros)
+
+    @property
+    def denominator(self) -> np.ndarray:
+        return np.poly(self.poles)
+
+    def is_stable(self, margin: float = 0.0) -> bool:
+        return bool(np.all(self.poles.real < -margin))
+
+def barycentric_roots(support: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    # Roots of sum_j weights_j / (s - support_j), the finite eigenvalues of the
+    # arrowhead pencil (E, B). B is singular, so solve the shifted problem instead.
+    m = support.size
+    e = np.zeros(shape=(m + 1, m + 1), dtype=complex)
+    e[0, 1:] = weights
+    e[1:, 0] = 1
+    e[1:, 1:] = np.diag(support)
+    b = np.eye(m + 1, dtype=complex)
+    b[0, 0] = 0
+
+    shift = np.mean(support) + (0.5 + 0.7j) * (np.max(np.abs(support - np.mean(support))) + 1)
+    mu = np.linalg.eigvals(np.linalg.solve(e - shift * b, b))
+    mu = mu[np.abs(mu) > 1e-12 * np.max(np.abs(mu))]
+    return shift + 1 / mu
+
+def aaa(z: np.ndarray, f: np.ndarray, tol: float = 1e-12, max_degree: int = 100) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Adaptive Antoulas-Anderson rational approximation in barycentric form
+    mask = np.ones(z.size, dtype=bool)
+    approximation = np.full(z.size, np.mean(f), dtype=complex)
+    scale = np.max(np.abs(f))
+    support: typing.List[int] = []
+
+    for _ in range(min(max_degree + 1, z.size // 2)):
+        j = int(np.argmax(np.where(mask, np.abs(f - approximation), -1)))
+        support.append(j)
+        mask[j] = False
+
+        cauchy = 1 / (z[mask, None] - z[None, support])
+        loewner = (f[mask, None] - f[None, support]) * cauchy
+        weights = np.linalg.svd(loewner, full_matrices=False)[2][-1].conj()
+
+        approximation = f.copy()
+        approximation[mask] = (cauchy @ (weights * f[support])) / (cauchy @ weights)
+        if np.max(np.abs(f - approximation)) <= tol * scale:
+            break
+
+    return z[support], f[support], weights
+
+def residues(support: np.ndarray, values: np.ndarray, weights: np.ndarray, poles: np.ndarray) -> np.ndarray:
+    # Residue N(p) / D'(p) of the barycentric form at each pole
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        cauchy = 1 / (poles[:, None] - support)
+        return (cauchy @ (weights * values)) / -(cauchy ** 2 @ weights)
+
+def cleanup(support: np.ndarray, values: np.ndarray, weights: np.ndarray,
+            tol: float = 1e-8) -> typing.Tuple[np.ndarray, np.ndarray]:
+    # Poles whose term r / (s - p) stays below tol * max|H| over the fitted points are
+    # Froissart doublets or modes the data cannot see, and are dropped with the zero that
+    # shadows them (nearer to the pole than the pole is to the data). Roots pushed far out by
+    # a numerator or denominator of lower degree are dropped too.
+    radius = np.max(np.abs(support))
+    poles = barycentric_roots(support, weights)
+    zeros = barycentric_roots(support, weights * values)
+    poles = poles[np.abs(poles) < 100 * radius]
+    zeros = zeros[np.abs(zeros) < 100 * radius]
+
+    distance = np.min(np.abs(poles[:, None] - support), axis=1, initial=np.inf)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        influence = np.abs(residues(support, values, weights, poles)) / distance
+    negligible = ~(influence >= tol * np.max(np.abs(values)))
+    keep_zeros = np.ones(zeros.size, dtype=bool)
+    for p, reach in zip(poles[negligible], distance[negligible]):
+        gap = np.where(keep_zeros, np.abs(zeros - p), np.inf)
+        if gap.size and np.min(gap) < reach:
+            keep_zeros[int(np.argmin(gap))] = False
+    return cancel(poles[~negligible], zeros[keep_zeros])
+
+def cancel(poles: np.ndarray, zeros: np.ndarray, tol: float = 1e-6) -> typing.Tuple[np.ndarray, np.ndarray]:
+    # Drop pole/zero pairs that coincide to tol relative to their magnitude
+    keep_poles = np.ones(poles.size, dtype=bool)
+    keep_zeros = np.ones(zeros.size, dtype=bool)
+    for i, p in enumerate(poles):
+        distance = np.where(keep_zeros, np.abs(zeros - p), np.inf)
+        if distance.size and np.min(distance) <= tol * max(abs(p), abs(zeros[int(np.argmin(distance))])):
+            keep_poles[i] = False
+            keep_zeros[int(np.argmin(distance))] = False
+    return poles[keep_poles], zeros[keep_zeros]
+
+def numerator_zeros(s_values: np.ndarray, h_values: np.ndarray, poles: np.ndarray,
+                    tol: float) -> typing.Optional[np.ndarray]:
+    # Zeros of the lowest-degree polynomial N with N / prod(s - p) within tol * max|H| of the
+    # samples (least squares in s scaled to the samples), or None when no degree gets there.
+    # Unlike the barycentric numerator this stays put where |H| falls to rounding level.
+    scale = np.max(np.abs(s_values))
+    u = s_values / scale
+    # 1 / prod(u - p) through logarithms, so many poles neither overflow nor underflow early
+    with np.errstate(divide="ignore", over="ignore", under="ignore"):
+        inverse = np.exp(-np.sum(np.log(u[:, None] - poles / scale), axis=1))
+    if not np.all(np.isfinite(inverse)):
+        return None
+    target = tol * np.max(np.abs(h_values))
+    for degree in range(poles.size + 1):
+        basis = u[:, None] ** np.arange(degree + 1) * inverse[:, None]
+        norms = np.max(np.abs(basis), axis=0)
+        coefficients = np.linalg.lstsq(basis / norms, h_values, rcond=None)[0] / norms
+        if np.max(np.abs(basis @ coefficients - h_values)) <= target:
+            return np.roots(coefficients[::-1]) * scale
+    return None
+
+def fit(s_values: np.ndarray, h_values: np.ndarray, tol: float = 1e-12, max_degree: int = 100,
+        poles: typing.Optional[np.ndarray] = None, real: bool = False, **kwargs) -> RationalFunction:
+    # With real=True the samples come from a real system, H(conj s) = conj H(s), and are
+    # mirrored into the lower half-plane so conjugate poles are fitted as well as their pairs.
+    # Known poles (e.g. the circuit's natural frequencies) are used for the pole/zero form
+    # when a numerator over them reproduces the samples.
+    s_values = np.asarray(s_values, dtype=complex).reshape(-1)
+    h_values = np.asarray(h_values, dtype=complex).reshape(-1)
+    finite = np.isfinite(h_values)
+    s_values, h_values = s_values[finite], h_values[finite]
+
+    # Every fourth sample is held out of the fit; error is the largest deviation on those,
+    # relative to the largest sample, so it measures the fit between the training points
+    # (below eight samples none are spared and this falls back to the training error)
+    held = np.zeros(s_values.size, dtype=bool)
+    if s_values.size >= 8:
+        held[2::4] = True
+    if real:
+        mirrored = s_values.imag != 0
+        s_values = np.concatenate([s_values, s_values[mirrored].conj()])
+        h_values = np.concatenate([h_values, h_values[mirrored].conj()])
+        held = np.concatenate([held, held[mirrored]])
+    support, values, weights = aaa(s_values[~held], h_values[~held], tol, max_degree)
+    function = RationalFunction(support, values, weights, **kwargs)
+    check = held if np.any(held) else ~held
+    function.error = float(np.max(np.abs(function.f(s_values[check]) - h_values[check])) / np.max(np.abs(h_values)))
+
+    # The barycentric numerator loses its zeros where |H| is at rounding level, so zeros are
+    # refitted over the known poles, or failing that over the fit's significant poles
+    accuracy = max(100 * function.error, 1e-9)
+    for candidates in ([] if poles is None else [np.asarray(poles, dtype=complex)]) + [function.poles]:
+        zeros = numerator_zeros(s_values, h_values, candidates, accuracy)
+        if zeros is not None:
+            fitted = RationalFunction(support, values, weights, *cancel(candidates, zeros), **kwargs)
+            fitted.error = function.error
+            return fitted
+    return function
+
+# Largest system whose natural frequencies natural_band computes exactly (dense eigensolve)
+EIGEN_LIMIT: int = 1500
+# Largest system whose natural frequencies are computed as poles for rational fits (QZ)
+POLE_LIMIT: int = 400
+
+def natural_band(plan, ground: str) -> typing.Tuple[float, float]:
+    # Smallest and largest magnitude of the circuit's nonzero natural frequencies, from the
+    # eigenvalues of the G + sC pencil; subcircuits contribute their own bands
+    bands = [kind.band() for kind in dict.fromkeys(kind for kind, _, _, _ in plan.dynamic)]
+    coefficients = plan.coefficients()
+    for _, _, start, count in plan.dynamic:
+        coefficients[start:start + count] = 0
+    for system in plan.systems(ground):
+        band = pencil_band(system, coefficients)
+        if band is not None:
+            bands.append(band)
+    if not bands:
+        return 1.0, 1.0
+    return float(min(low for low, _ in bands)), float(max(high for _, high in bands))
+
+def time_constants(system, coefficients: np.ndarray) -> typing.Optional[np.ndarray]:
+    # Per-unknown rates G_ii / C_ii, which locate the band without solving anything;
+    # None for a system without dynamic elements
+    matrix = system.matrix
+    values = matrix.signs * coefficients[matrix.slots]
+    if not np.any(values[matrix.orders == 1]):
+        return None
+    diagonal = matrix.rows == matrix.cols
+    g = np.bincount(matrix.rows[diagonal & (matrix.orders == 0)], np.abs(values[diagonal & (matrix.orders == 0)]),
+                    system.size)
+    c = np.bincount(matrix.rows[diagonal & (matrix.orders == 1)], np.abs(values[diagonal & (matrix.orders == 1)]),
+                    system.size)
+    local = g[(g > 0) & (c > 0)] / c[(g > 0) & (c > 0)]
+    if not local.size:
+        local = np.array([np.linalg.norm(values[matrix.orders == 0]) / np.linalg.norm(values[matrix.orders == 1]) or 1.0])
+    return local
+
+def shift_invert(pencil: typing.Dict[int, np.ndarray], local: np.ndarray) -> typing.Optional[np.ndarray]:
+    # Finite eigenvalues of G + sC by shift-invert about a complex sigma off the real axis,
+    # mu = 1 / (sigma - lambda); cheap, but accurate only relative to the largest ones
+    sigma = np.sqrt(np.min(local) * np.max(local)) * (0.5 + 0.7j)
+    try:
+        mu = np.linalg.eigvals(np.linalg.solve(pencil.get(0, 0) + sigma * pencil[1], pencil[1]))
+    except np.linalg.LinAlgError:
+        return None
+    mu = mu[np.abs(mu) > 1e-12 * np.max(np.abs(mu), initial=0)]
+    return sigma - 1 / mu
+
+def natural_frequencies(system, coefficients: np.ndarray) -> typing.Optional[np.ndarray]:
+    # The finite s where G + sC is singular, accurate enough to serve as poles; None when the
+    # system is larger than POLE_LIMIT or not a G + sC pencil. With scipy this is a QZ
+    # eigensolve of the pencil itself, otherwise shift-invert.
+    local = time_constants(system, coefficients)
+    if local is None:
+        return np.zeros(0, dtype=complex)
+    if system.size > POLE_LIMIT or not set(np.unique(system.matrix.orders)) <= {0, 1}:
+        return None
+    pencil, _ = system.expand(coefficients)
+    g, c = pencil.get(0, np.zeros_like(pencil[1])), pencil[1]
+    try:
+        import scipy.linalg
+    except ImportError:
+        return shift_invert(pencil, local)
+    if not np.any(g.imag) and not np.any(c.imag):
+        g, c = g.real, c.real
+    alpha, beta = scipy.linalg.eigvals(g, -c, homogeneous_eigvals=True, check_finite=False)
+    # Infinite eigenvalues (algebraic unknowns) come back with beta at rounding level
+    finite = np.abs(beta) * np.linalg.norm(g, 1) > 1e-10 * np.abs(alpha) * np.linalg.norm(c, 1)
+    return alpha[finite] / beta[finite]
+
+def pencil_band(system, coefficients: np.ndarray) -> typing.Optional[typing.Tuple[float, float]]:
+    local = time_constants(system, coefficients)
+    if local is None:
+        return None
+    if system.size <= EIGEN_LIMIT and set(np.unique(system.matrix.orders)) <= {0, 1}:
+        frequencies = shift_invert(system.expand(coefficients)[0], local)
+        magnitudes = np.abs(frequencies) if frequencies is not None else np.zeros(0)
+        magnitudes = magnitudes[magnitudes > 1e-9 * np.sqrt(np.min(local) * np.max(local))]
+        if magnitudes.size:
+            return float(np.min(magnitudes)), float(np.max(magnitudes))
+
+    # Too large for a dense eigensolve: diffusion through n unknowns slows the slowest
+    # mode by up to n^2 against the fastest local time constant
+    return float(np.min(local)) / system.size ** 2, 4 * float(np.max(local))
+
+def default_samples(band: typing.Tuple[float, float], count: int = 200) -> np.ndarray:
+    # Log-spaced points over the natural-frequency band (and a decade or two past it) on
+    # the upper imaginary axis and on a ray into the left half-plane, plus a few points on
+    # the positive real axis below the band that pin down the DC value
+    low, high = band
+    w = np.logspace(np.log10(low) - 2, np.log10(high) + 1, count // 2)
+    return np.concatenate([1j * w, w * np.exp(0.75j * np.pi), low * np.logspace(-4, -1, 4)])
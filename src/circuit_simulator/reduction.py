@@ -0,0 +1,146 @@
+import typing
+import numpy as np
+
+from . import components as Component
+from . import profiling
+from .assembly import Entries, System
+from .backends import select_backend
+from .sweep import FrequencySweep, solve_pencil
+
+# Components whose stamps make the MNA pencil non-symmetric
+CONTROLLED = (Component.VoltageControlledCurrentSource, Component.CurrentControlledVoltageSource)
+
+def multiply(entries: Entries, values: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    # Sparse product straight from the COO stamps, without forming the matrix
+    product = np.zeros(shape=vectors.shape, dtype=complex)
+    np.add.at(product, entries.rows, values[:, None] * vectors[entries.cols])
+    return product
+
+def orthonormalize(block: np.ndarray, basis: typing.List[np.ndarray], tol: float = 1e-10) -> np.ndarray:
+    # Block modified Gram-Schmidt against the basis, dropping deflated columns
+    columns = []
+    for column in block.T:
+        norm = np.linalg.norm(column)
+        for vector in basis + columns:
+            column = column - (vector.conj() @ column) * vector
+        # Second pass for numerical orthogonality
+        for vector in basis + columns:
+            column = column - (vector.conj() @ column) * vector
+        if np.linalg.norm(column) > tol * max(norm, 1e-300):
+            columns.append(column / np.linalg.norm(column))
+    return np.array(columns).T.reshape(block.shape[0], len(columns))
+
+def real_basis(vectors: np.ndarray, tol: float = 1e-10) -> np.ndarray:
+    # Real orthonormal basis of span{Re V, Im V}; a real congruence keeps passivity
+    stacked = np.hstack([vectors.real, vectors.imag])
+    u, sigma, _ = np.linalg.svd(stacked, full_matrices=False)
+    return u[:, sigma > tol * sigma[0]] if sigma.size else u
+
+def krylov(system: System, coefficients: np.ndarray, excitation: int, expansion_point: complex,
+           count: int, backend: str) -> np.ndarray:
+    # Block Arnoldi on (G + s0 C)^-1 C started from (G + s0 C)^-1 B (PRIMA)
+    assert set(np.unique(system.matrix.orders)) <= {0, 1}, "Reduction needs a G + sC pencil"
+    solver = select_backend(backend, system.size)
+    factorization = solver.factorize(system, solver.assemble(system, system.matrix.values(coefficients, expansion_point)))
+
+    c_entries = system.matrix.select(system.matrix.orders == 1)
+    c_values = c_entries.signs * coefficients[c_entries.slots]
+
+    currents = system.expand_rhs(coefficients, excitation)
+    inputs = np.array([b for b in currents.values() if np.any(b)]).T.reshape(system.size, -1)
+
+    basis: typing.List[np.ndarray] = []
+    block = factorization.solve(inputs)
+    while len(basis) < count:
+        block = orthonormalize(block, basis)
+        if not block.shape[1]:
+            break
+        basis.extend(block.T[:count - len(basis)])
+        block = factorization.solve(multiply(c_entries, c_values, block))
+
+    return np.array(basis).T.reshape(system.size, len(basis))
+
+class ReducedModel(FrequencySweep):
+    @profiling.instrument("reduction")
+    def __init__(self, circuit, ground: str, order: int = 20,
+                 expansion_points: typing.Optional[typing.List[complex]] = None,
+                 excitation: typing.Optional[str] = None,
+                 band: typing.Optional[typing.Tuple[float, float]] = None) -> None:
+        super().__init__(circuit, ground, excitation)
+        assert not self.plan.dynamic, "Reduction needs a polynomial pencil"
+        if expansion_points is None:
+            # The low end of the band (by default of the natural-frequency band): moments about
+            # it match the slow, dominant modes, where a fixed-order model is expected to be accurate
+            from .rational import natural_band
+            expansion_points = [band[0] if band else natural_band(self.plan, ground)[0]]
+        self.order = order
+        self.expansion_points = list(expansion_points)
+        # The angular frequencies the model is meant for, where estimate_error measures it;
+        # by default from two decades below the expansion points up to them
+        magnitudes = [abs(s0) for s0 in self.expansion_points if s0] or [1.0]
+        self.band: typing.Tuple[float, float] = band or (min(magnitudes) / 100, max(magnitudes))
+
+        coefficients = self.plan.coefficients()
+        excitation_slot = self.plan.find(self.excitation.name if self.excitation else None, "s")
+        # Controlled sources make the MNA pencil non-symmetric, where V^T (G + s0 C) V can be
+        # singular even though the solution at s0 lies in span V. Those circuits are projected
+        # from the left with W = (G + s0 C) V instead: W^T (G + s0 C) V is then nonsingular,
+        # and the Krylov moments still match. RLC networks keep the passive V^T projection.
+        self.controlled = any(isinstance(component, CONTROLLED) for component in self.plan.passive)
+
+        # One projected pencil per superposition term: W^T (G + sC) V, W^T b
+        self.bases: typing.List[np.ndarray] = []
+        self.reduced: typing.List[typing.Tuple[typing.Dict[int, np.ndarray], typing.Dict[int, np.ndarray]]] = []
+        for system in self.plan.systems(ground):
+            per_point = max(1, -(-order // len(self.expansion_points)))
+            vectors = np.hstack([krylov(system, coefficients, excitation_slot, s0, per_point, circuit.backend)
+                                 for s0 in self.expansion_points])
+            # The whole span over every expansion point, real and imaginary parts of complex
+            # ones alike; only numerically dependent directions are dropped
+            basis = real_basis(vectors)
+            left = basis
+            if self.controlled:
+                s0 = abs(self.expansion_points[0])
+                left = np.linalg.qr(multiply(system.matrix, system.matrix.values(coefficients, s0), basis).real)[0]
+
+            matrix = {}
+            for k in np.unique(system.matrix.orders):
+                entries = system.matrix.select(system.matrix.orders == k)
+                projected = multiply(entries, entries.signs * coefficients[entries.slots], basis)
+                matrix[int(k)] = left.T @ projected
+            currents = system.expand_rhs(coefficients, excitation_slot)
+            self.bases.append(basis)
+            self.reduced.append((matrix, {k: left.T @ b for k, b in currents.items()}))
+
+    @property
+    def size(self) -> int:
+        return max((basis.shape[1] for basis in self.bases), default=0)
+
+    def solve(self, s_values: np.ndarray) -> np.ndarray:
+        s_values = np.asarray(s_values, dtype=complex).reshape(-1)
+        solution = np.zeros(shape=(s_values.size, self.plan.n), dtype=complex)
+        for system, basis, (matrix, currents) in zip(self.plan.systems(self.ground), self.bases, self.reduced):
+            solution[:, system.keep] += solve_pencil(matrix, currents, s_values) @ basis.T
+        return solution
+
+    def estimate_error(self, s_values: typing.Optional[np.ndarray] = None,
+                       outputs: typing.Optional[typing.List[typing.Tuple[str, str]]] = None) -> float:
+        # Worst relative deviation from the full solve over s_values, by default the imaginary
+        # axis across the model's band. Each output (or each unknown without outputs) is
+        # compared against its own largest magnitude over the band.
+        if s_values is None:
+            low, high = self.band
+            s_values = 1j * np.logspace(np.log10(low), np.log10(high), 50)
+        s_values = np.asarray(s_values, dtype=complex).reshape(-1)
+
+        if outputs is None:
+            full, reduced = FrequencySweep.solve(self, s_values).T, self.solve(s_values).T
+        else:
+            sweep = FrequencySweep(self.circuit, self.ground, self.excitation.name if self.excitation else None)
+            full, reduced = sweep.evaluate(s_values, outputs), self.evaluate(s_values, outputs)
+        if self.excitation is not None:
+            # The excitation's value is s itself; compare responses per unit excitation
+            unit = np.where(s_values == 0, 1, s_values)
+            full, reduced = [a / unit for a in full], [b / unit for b in reduced]
+        errors = [np.max(np.abs(a - b)) / np.max(np.abs(a)) for a, b in zip(full, reduced) if np.any(a)]
+        return float(max(errors, default=0.0))
@@ -0,0 +1,90 @@
+import typing
+import numpy as np
+import pandas as pd
+
+from . import profiling
+from .store import ComponentTable, Store
+
+class Positions(dict):
+    # Stands in for the node index once node attributes already hold index arrays
+    def __getitem__(self, key):
+        return key
+
+@profiling.instrument("gather")
+def gather(components: Store, names: typing.List[str], voltages: np.ndarray,
+           fill: typing.Optional[typing.Dict[str, np.ndarray]] = None,
+           overrides: typing.Optional[typing.Dict[typing.Tuple[str, str], np.ndarray]] = None) -> typing.Tuple[np.ndarray, np.ndarray]:
+    # Voltage and current of the named components for every column of voltages (n, ...),
+    # evaluated once per component type with the classes' own formulas on gathered views.
+    # fill sets a field on every passive component (e.g. s for a sweep), overrides single ones.
+    shape = voltages.shape[1:]
+    voltage = np.zeros(shape=(len(names),) + shape, dtype=complex)
+    current = np.zeros(shape=(len(names),) + shape, dtype=complex)
+
+    groups: typing.Dict[type, typing.Tuple[ComponentTable, typing.List[int], typing.List[int]]] = dict()
+    for i, name in enumerate(names):
+        table, row = components.locate(name)
+        groups.setdefault(table.kind, (table, [], []))
+        groups[table.kind][1].append(i)
+        groups[table.kind][2].append(row)
+
+    per_table: typing.Dict[type, typing.Dict[str, typing.Dict[int, np.ndarray]]] = dict()
+    for (name, field), value in (overrides or dict()).items():
+        table, row = components.locate(name)
+        per_table.setdefault(table.kind, dict()).setdefault(field, dict())[row] = value
+
+    positions = Positions()
+    for kind, (table, members, rows) in groups.items():
+        columns = table.gather(np.array(rows), len(shape), None if kind.active else fill, per_table.get(kind))
+        voltage[members] = np.broadcast_to(columns.voltage(positions, voltages), (len(members),) + shape)
+        current[members] = np.broadcast_to(columns.current(positions, voltages), (len(members),) + shape)
+
+    profiling.note(components=len(names), estimated_bytes=voltage.nbytes + current.nbytes)
+    return voltage, current
+
+class Solution:
+    # Struct-of-arrays results: voltage, current and power are (N_c,) for one
+    # solve or (N_s, N_c) for a sweep, in the order of names
+    def __init__(self, names: typing.List[str], voltage: np.ndarray, current: np.ndarray,
+                 s_values: typing.Optional[np.ndarray] = None) -> None:
+        self.names = list(names)
+        self.voltage = voltage
+        self.current = current
+        self.power = voltage * current
+        self.s_values = s_values
+        self.positions: typing.Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def gather(cls, components: Store, names: typing.List[str], voltages: np.ndarray,
+               s_values: typing.Optional[np.ndarray] = None,
+               overrides: typing.Optional[typing.Dict[typing.Tuple[str, str], np.ndarray]] = None) -> "Solution":
+        # With s_values the passive components (and any overrides) follow the sweep
+        if s_values is None:
+            voltage, current = gather(components, names, voltages.reshape(voltages.shape[0], -1))
+            return cls(names, voltage[:, 0], current[:, 0])
+        voltage, current = gather(components, names, voltages, {"s": s_values}, overrides)
+        return cls(names, voltage.T, current.T, s_values)
+
+    def quantity(self, kind: str) -> np.ndarray:
+        assert kind in ["Voltage", "Current", "Power"]
+        return {"Voltage": self.voltage, "Current": self.current, "Power": self.power}[kind]
+
+    def __getitem__(self, key: typing.Tuple[str, str]) -> np.ndarray:
+        name, kind = key
+        return self.quantity(kind)[..., self.positions[name]]
+
+    def row(self, name: str) -> pd.Series:
+        assert self.s_values is None, "Rows are for single solves, use frame(kind) for sweeps"
+        info = pd.Series(index=["Name", "Voltage", "Current", "Power"], dtype=object)
+        info["Name"] = name
+        for kind in ["Voltage", "Current", "Power"]:
+            info[kind] = self[name, kind]
+        return info
+
+    @profiling.instrument("dataframe")
+    def frame(self, kind: typing.Optional[str] = None) -> pd.DataFrame:
+        # One solve: a Name/Voltage/Current/Power table. Sweeps: one quantity, indexed by s
+        if self.s_values is None:
+            return pd.DataFrame({"Name": self.names, "Voltage": self.voltage, "Current": self.current, "Power": self.power})
+        assert kind is not None, "Pick a quantity for sweep results"
+        return pd.DataFrame(self.quantity(kind), index=pd.Index(self.s_values, name="s"), columns=self.names)
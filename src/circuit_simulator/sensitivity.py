@@ -0,0 +1,238 @@
+import typing
+import numpy as np
+import pandas as pd
+
+from . import profiling
+from .assembly import AssemblyPlan, Entries, System
+from .backends import select_backend, singular
+from .results import Positions
+from .sweep import MAX_BATCH_BYTES
+
+# Component values the sensitivities are taken with respect to
+PARAMETERS: typing.Tuple[str, ...] = ("resistance", "capacitance", "inductance", "transconductance", "transresistance")
+
+class Block(typing.NamedTuple):
+    # Stamp slots start..start+count belong to parameters offset..offset+count, with
+    # weights = d(slot value)/d(parameter), e.g. 1 for a capacitance, v0 for its initial charge
+    start: int
+    count: int
+    offset: int
+    weights: np.ndarray
+
+class Sensitivity:
+    # d(quantity)/d(parameter) for every (component, parameter): values is (P,) for one s
+    # or (N_s, P) for a sweep, quantity the differentiated output itself
+    def __init__(self, parameters: typing.List[typing.Tuple[str, str]], point: np.ndarray, values: np.ndarray,
+                 quantity: np.ndarray, s_values: typing.Optional[np.ndarray] = None) -> None:
+        self.parameters = parameters
+        self.point = point
+        self.values = values
+        self.quantity = quantity
+        self.s_values = s_values
+        self.positions: typing.Dict[typing.Tuple[str, str], int] = {parameter: i for i, parameter in enumerate(parameters)}
+
+    def __getitem__(self, key: typing.Tuple[str, str]) -> np.ndarray:
+        return self.values[..., self.positions[key]]
+
+    def relative(self) -> np.ndarray:
+        # (p / y) dy/dp, comparable across parameters of different units
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.values * self.point / np.asarray(self.quantity)[..., None]
+
+    def frame(self) -> pd.DataFrame:
+        columns = pd.MultiIndex.from_tuples(self.parameters, names=["component", "parameter"])
+        if self.s_values is None:
+            return pd.DataFrame(self.values[None, :], columns=columns)
+        return pd.DataFrame(self.values, index=pd.Index(self.s_values, name="s"), columns=columns)
+
+def parameters(plan: AssemblyPlan) -> typing.Tuple[typing.List[typing.Tuple[str, str]], np.ndarray, typing.List[Block]]:
+    # Every differentiable parameter of the plan's components and the stamp slots it feeds.
+    # Derived slots (initial charge, initial flux) get their derivative by central differences
+    # of the class's own property over all rows at once; they are linear in the parameter.
+    names: typing.List[typing.Tuple[str, str]] = []
+    point: typing.List[np.ndarray] = []
+    blocks: typing.List[Block] = []
+    for table in plan.store.tables.values():
+        rows = table.rows()
+        fields = [field for field in PARAMETERS if field in table.layout.fields]
+        if not rows.size or not fields:
+            continue
+        for field in fields:
+            values = table.columns[field][rows]
+            offset = len(names)
+            names.extend((table.names[row], field) for row in rows)
+            point.append(values)
+            for owner, parameter, _, start in plan.blocks:
+                if owner is not table:
+                    continue
+                if parameter == field:
+                    blocks.append(Block(start, rows.size, offset, np.ones(rows.size)))
+                    continue
+                step = 1e-6 * np.where(values != 0, np.abs(values), 1)
+                view = table.gather(rows)
+                view.table.columns[field] = values + step
+                upper = np.broadcast_to(getattr(view, parameter), rows.shape)
+                view.table.columns[field] = values - step
+                lower = np.broadcast_to(getattr(view, parameter), rows.shape)
+                weights = (upper - lower) / (2 * step)
+                if np.any(weights):
+                    blocks.append(Block(start, rows.size, offset, weights))
+    return names, np.concatenate(point) if point else np.zeros(0), blocks
+
+def select(entries: Entries, blocks: typing.List[Block]) -> typing.List[typing.Tuple[Entries, np.ndarray, np.ndarray]]:
+    # Per block: its entries, their parameter indices and weights
+    selected = []
+    for block in blocks:
+        mask = (entries.slots >= block.start) & (entries.slots < block.start + block.count)
+        if np.any(mask):
+            position = entries.slots[mask] - block.start
+            selected.append((entries.select(mask), block.offset + position, block.weights[position]))
+    return selected
+
+def probe(plan: AssemblyPlan, name: str, quantity: str, s_values: np.ndarray, excitation: typing.Optional[str],
+          voltages: np.ndarray, positions: typing.Dict[typing.Tuple[str, str], int]) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray, typing.Dict[int, np.ndarray]]:
+    # The output quantity y = g . v + h over the component's terminal unknowns v, from the
+    # component's own formula: ids, g (N_s, k), y (N_s,) and the explicit dy/dp of its own
+    # parameters (e.g. V / R for a resistor's current), by central differences at fixed v
+    if quantity == "Power":
+        ids, g_v, v, explicit_v = probe(plan, name, "Voltage", s_values, excitation, voltages, positions)
+        _, g_i, i, explicit_i = probe(plan, name, "Current", s_values, excitation, voltages, positions)
+        explicit = {key: i * explicit_v.get(key, 0) + v * explicit_i.get(key, 0) for key in {**explicit_v, **explicit_i}}
+        return ids, i[:, None] * g_v + v[:, None] * g_i, v * i, explicit
+
+    table, row = plan.store.locate(name)
+    roles = table.layout.roles
+    ids = np.array([table.nodes[role][row] for role in roles], dtype=np.int64)
+    k, count = ids.size, s_values.size
+    # Columns: all zero, each unit vector, the actual solution
+    local = np.zeros(shape=(k, count, k + 2), dtype=complex)
+    local[np.arange(k), :, np.arange(k) + 1] = 1
+    local[:, :, -1] = voltages[:, ids].T
+
+    def evaluate(field: typing.Optional[str] = None, value: typing.Any = None) -> np.ndarray:
+        view = table.gather(np.array([row]))
+        view.table.nodes = {role: np.array([j]) for j, role in enumerate(roles)}
+        if not table.kind.active or name == excitation:
+            view.table.columns["s"] = s_values.reshape(1, -1, 1)
+        if field is not None:
+            view.table.columns[field] = np.array([value])
+        method = view.voltage if quantity == "Voltage" else view.current
+        return np.broadcast_to(method(Positions(), local), (1, count, k + 2))[0]
+
+    y = evaluate()
+    explicit: typing.Dict[int, np.ndarray] = dict()
+    for field in PARAMETERS:
+        if field in table.layout.fields:
+            value = table.columns[field][row]
+            step = 1e-6 * (abs(value) or 1)
+            difference = (evaluate(field, value + step)[:, -1] - evaluate(field, value - step)[:, -1]) / (2 * step)
+            if np.any(difference):
+                explicit[positions[(name, field)]] = difference
+    return ids, y[:, 1:k + 1] - y[:, :1], y[:, -1], explicit
+
+def accumulate(gradient: np.ndarray, s_values: np.ndarray, x: np.ndarray, adjoint: np.ndarray,
+               matrix: typing.List[typing.Tuple[Entries, np.ndarray, np.ndarray]],
+               rhs: typing.List[typing.Tuple[Entries, np.ndarray, np.ndarray]]) -> None:
+    # dy/dp += -lambda^T (dA/dp x - db/dp), entry by entry of the stamps p feeds
+    for entries, index, weights in matrix:
+        values = entries.signs * weights * np.power(s_values[:, None], entries.orders)
+        np.add.at(gradient, (slice(None), index), -(values * x[:, entries.cols])[..., None] * adjoint[:, entries.rows])
+    for entries, index, weights in rhs:
+        values = entries.signs * weights * np.power(s_values[:, None], entries.orders)
+        np.add.at(gradient, (slice(None), index), values[..., None] * adjoint[:, entries.rows])
+
+@profiling.instrument("sensitivity")
+def compute(circuit, ground: str, output: typing.Tuple[str, str], s_values,
+            input_node: typing.Optional[typing.Tuple[str, str]] = None) -> Sensitivity:
+    # Adjoint sensitivities of a component quantity, or of output / input as in a transfer
+    # function (the input component's value then follows s). Per frequency and superposition
+    # term: one forward solve, one transposed solve for all outputs with the same factors,
+    # then every parameter's derivative from the stamps it feeds.
+    plan = circuit.compile()
+    points = np.asarray(s_values, dtype=complex).reshape(-1)
+    excitation = input_node[0] if input_node else None
+    slot = plan.find(excitation, "s")
+    outputs = [output] + ([input_node] if input_node else [])
+    profiling.note(points=points.size, outputs=len(outputs))
+
+    names, point, blocks = parameters(plan)
+    positions = {parameter: i for i, parameter in enumerate(names)}
+    coefficients = plan.coefficients()
+    systems = plan.systems(ground)
+    selections = [(select(system.matrix, blocks), select(system.rhs.substitute(slot), blocks)) for system in systems]
+
+    # Small polynomial systems are solved as stacked batches over the frequencies, the others per s
+    batched = not plan.dynamic and all(select_backend(circuit.backend, system.size).name == "dense" for system in systems)
+    chunk = max(1, MAX_BATCH_BYTES // (16 * max(1, sum(system.size ** 2 for system in systems)))) if batched else 1
+    expanded = [system.expand(coefficients, slot) for system in systems] if batched else []
+
+    gradient = np.zeros(shape=(points.size, len(names), len(outputs)), dtype=complex)
+    quantity = np.zeros(shape=(points.size, len(outputs)), dtype=complex)
+    for start in range(0, points.size, chunk):
+        s = points[start:start + chunk]
+        voltages = np.zeros(shape=(s.size, plan.n), dtype=complex)
+        solvers: typing.List[typing.Callable[[np.ndarray], np.ndarray]] = []
+        forward: typing.List[np.ndarray] = []
+        for i, system in enumerate(systems):
+            if batched:
+                x, transposed = solve_stacked(expanded[i], s)
+            else:
+                x, transposed = solve_factored(system, plan, coefficients, s[0], slot, circuit.backend)
+            forward.append(x)
+            solvers.append(transposed)
+            voltages[:, system.keep] += x
+
+        targets = np.zeros(shape=(s.size, plan.n, len(outputs)), dtype=complex)
+        for j, (name, kind) in enumerate(outputs):
+            ids, g, value, explicit = probe(plan, name, kind, s, excitation, voltages, positions)
+            for k, node in enumerate(ids):
+                targets[:, node, j] += g[:, k]
+            quantity[start:start + s.size, j] = value
+            for index, derivative in explicit.items():
+                gradient[start:start + s.size, index, j] += derivative
+
+        for system, x, transposed, (matrix, rhs) in zip(systems, forward, solvers, selections):
+            adjoint = transposed(targets[:, system.keep])
+            accumulate(gradient[start:start + s.size], s, x, adjoint, matrix, rhs)
+
+    values, result = gradient[..., 0], quantity[:, 0]
+    if input_node:
+        # Quotient rule for output / input, zero where the input is, as in TransferFunction.f
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(quantity[:, 1] == 0, 0, quantity[:, 0] / quantity[:, 1])
+            values = np.where(quantity[:, 1:2] == 0, 0,
+                              (gradient[..., 0] - ratio[:, None] * gradient[..., 1]) / quantity[:, 1:2])
+        result = ratio
+
+    if np.ndim(s_values) == 0:
+        return Sensitivity(names, point, values[0], result[0])
+    return Sensitivity(names, point, values, result, points)
+
+def solve_stacked(expanded: typing.Tuple[typing.Dict[int, np.ndarray], typing.Dict[int, np.ndarray]],
+                  s: np.ndarray) -> typing.Tuple[np.ndarray, typing.Callable[[np.ndarray], np.ndarray]]:
+    matrix, currents = expanded
+    a = sum((s ** order)[:, None, None] * m for order, m in matrix.items())
+    b = sum((s ** order)[:, None] * c for order, c in currents.items())
+    # One LU per s serves the forward and the transposed (adjoint) solve. lu_factor takes
+    # stacks from scipy 1.15; otherwise one batched inverse is the shared factorization.
+    try:
+        import scipy.linalg
+        factors = scipy.linalg.lu_factor(a, check_finite=False)
+    except (ImportError, ValueError):
+        try:
+            inverse = np.linalg.inv(a)
+        except np.linalg.LinAlgError:
+            raise singular()
+        return (inverse @ b[..., None])[..., 0], lambda targets: np.swapaxes(inverse, 1, 2) @ targets
+    if np.any(np.diagonal(factors[0], axis1=-2, axis2=-1) == 0):
+        raise singular()
+    x = scipy.linalg.lu_solve(factors, b[..., None], check_finite=False)[..., 0]
+    return x, lambda targets: scipy.linalg.lu_solve(factors, targets, trans=1, check_finite=False)
+
+def solve_factored(system: System, plan: AssemblyPlan, coefficients: np.ndarray, s: complex, excitation: int,
+                   backend: str) -> typing.Tuple[np.ndarray, typing.Callable[[np.ndarray], np.ndarray]]:
+    coefficients = plan.at(coefficients, s)
+    solver = select_backend(backend, system.size)
+    factorization = solver.factorize(system, solver.assemble(system, system.matrix.values(coefficients, s)))
+    x = factorization.solve(system.currents(coefficients, s, excitation))
+    return x[None], lambda targets: factorization.solve_transposed(targets[0]).reshape(targets.shape)
@@ -0,0 +1,353 @@
+import gc
+import typing
+import weakref
+import numpy as np
+
+# Suffix of the branch-current unknown a component owns, e.g. "R1_internal_i"
+INTERNAL: str = "_internal_i"
+
+class Field:
+    # A per-type value column; a component view reads and writes its own row
+    def __init__(self, dtype: type = float) -> None:
+        self.dtype = dtype
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, obj, owner: typing.Optional[type] = None):
+        if obj is None:
+            return self
+        value = obj.table.columns[self.name][obj.row]
+        # A single row reads as a plain Python number, as the attribute it replaces
+        return value.item() if isinstance(value, np.generic) else value
+
+    def __set__(self, obj, value) -> None:
+        obj.table.columns[self.name][obj.row] = value
+
+class Node:
+    # A per-type column of interned node ids. Views see node names, gathered views the ids.
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, obj, owner: typing.Optional[type] = None):
+        if obj is None:
+            return self
+        ids = obj.table.nodes[self.name][obj.row]
+        return ids if obj.table.gathered else obj.table.store.labels[ids]
+
+    def __set__(self, obj, value: str) -> None:
+        # Moves the component to another node, interned like any other; its circuit
+        # recompiles on the next solve
+        assert not obj.table.gathered, "Gathered views cannot be reconnected"
+        store = obj.table.store
+        obj.table.nodes[self.name][obj.row] = store.intern(value)
+        store.topology += 1
+
+class Internal(Node):
+    # A branch-current unknown owned by the component; its name is only built on request
+    def __get__(self, obj, owner: typing.Optional[type] = None):
+        if obj is None:
+            return self
+        ids = obj.table.nodes[self.name][obj.row]
+        return ids if obj.table.gathered else f"{obj.name}{INTERNAL}"
+
+    def __set__(self, obj, value: str) -> None:
+        raise AttributeError(f"{self.name} is the component's own branch unknown and cannot be reconnected")
+
+class Layout(typing.NamedTuple):
+    roles: typing.Tuple[str, ...]
+    internal: typing.Tuple[str, ...]
+    fields: typing.Dict[str, type]
+
+# Weak, so generated component classes (see Subcircuit) are not kept alive by their layout
+LAYOUTS: "weakref.WeakKeyDictionary[type, Layout]" = weakref.WeakKeyDictionary()
+
+def layout(kind: type) -> Layout:
+    # Node roles in terminal order and value fields, read once from the class descriptors
+    if kind not in LAYOUTS:
+        roles, internal, fields = [], [], dict()
+        for cls in reversed(kind.__mro__):
+            for name, attribute in vars(cls).items():
+                if isinstance(attribute, Node) and name not in roles:
+                    roles.append(name)
+                    if isinstance(attribute, Internal):
+                        internal.append(name)
+                elif isinstance(attribute, Field):
+                    fields[name] = attribute.dtype
+        LAYOUTS[kind] = Layout(tuple(roles), tuple(internal), fields)
+    return LAYOUTS[kind]
+
+class Gathered:
+    # Columns of many rows of one table, possibly widened by sweep or variant axes
+    gathered = True
+
+    def __init__(self, names: typing.List[str], nodes: typing.Dict[str, np.ndarray], columns: typing.Dict[str, np.ndarray]) -> None:
+        self.names = names
+        self.nodes = nodes
+        self.columns = columns
+
+class ComponentTable:
+    gathered = False
+
+    def __init__(self, store: "Store", kind: type) -> None:
+        self.store = store
+        self.kind = kind
+        self.layout = layout(kind)
+        # (role, is internal) in terminal order, the order unknowns are numbered in
+        self.spec: typing.List[typing.Tuple[str, bool]] = [(role, role in self.layout.internal) for role in self.layout.roles]
+        self.count: int = 0
+        self.names: typing.List[str] = []
+        self.nodes: typing.Dict[str, np.ndarray] = {role: np.zeros(0, dtype=np.int64) for role in self.layout.roles}
+        self.columns: typing.Dict[str, np.ndarray] = {field: np.zeros(0, dtype=dtype) for field, dtype in self.layout.fields.items()}
+        # Position in the circuit's insertion order, and rows replaced by another type
+        self.order = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+
+    def reserve(self, count: int) -> None:
+        # Capacity doubles, so appending one row at a time stays amortized O(1)
+        capacity = self.order.size
+        if count <= capacity:
+            return
+        capacity = max(count, 2 * capacity, 16)
+
+        def grow(array: np.ndarray) -> np.ndarray:
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:array.size] = array
+            return grown
+
+        self.nodes = {role: grow(ids) for role, ids in self.nodes.items()}
+        self.columns = {field: grow(values) for field, values in self.columns.items()}
+        self.order = grow(self.order)
+        self.alive = grow(self.alive)
+
+    def append(self, name: str, ids: typing.Sequence[int], values: typing.Dict[str, typing.Any], order: int) -> int:
+        self.reserve(self.count + 1)
+        row = self.count
+        self.write(row, ids, values)
+        self.names.append(name)
+        self.order[row] = order
+        self.alive[row] = True
+        self.count += 1
+        return row
+
+    def write(self, row: int, ids: typing.Sequence[int], values: typing.Dict[str, typing.Any]) -> None:
+        for role, node in zip(self.layout.roles, ids):
+            self.nodes[role][row] = node
+        for field in self.layout.fields:
+            self.columns[field][row] = values.get(field, 0)
+
+    def rows(self) -> np.ndarray:
+        return np.flatnonzero(self.alive[:self.count])
+
+    def view(self, row: int):
+        component = object.__new__(self.kind)
+        component.table, component.row = self, row
+        return component
+
+    def gather(self, rows: typing.Optional[np.ndarray] = None, extra: int = 0,
+               fill: typing.Optional[typing.Dict[str, np.ndarray]] = None,
+               overrides: typing.Optional[typing.Dict[str, typing.Dict[int, np.ndarray]]] = None):
+        # One object of the table's class whose attributes are whole columns, so the
+        # class's own stamps, formulas and properties run vectorized over the rows.
+        # Values get `extra` trailing axes; fill replaces a field on every row and
+        # overrides replace it on single rows, both broadcasting along those axes.
+        rows = self.rows() if rows is None else np.asarray(rows, dtype=np.int64)
+        fill = fill or dict()
+        overrides = overrides or dict()
+        columns = dict()
+        for field, values in self.columns.items():
+            column = values[rows].reshape((rows.size,) + (1,) * extra)
+            if field in fill:
+                value = np.asarray(fill[field])
+                column = np.broadcast_to(value, (rows.size,) + value.shape)
+            for row, value in overrides.get(field, dict()).items():
+                value = np.asarray(value)
+                column = np.array(np.broadcast_to(column, np.broadcast_shapes(column.shape, (1,) + value.shape)),
+                                  dtype=np.result_type(column, value))
+                column[rows == row] = value
+            columns[field] = column
+
+        component = object.__new__(self.kind)
+        component.table = Gathered([self.names[row] for row in rows] if rows.size < self.count else self.names,
+                                   {role: ids[rows] for role, ids in self.nodes.items()}, columns)
+        component.row = slice(None)
+        return component
+
+class NodeIndex(typing.Mapping[str, int]):
+    # Node name -> unknown index. Internal branch unknowns are resolved through
+    # their component instead of storing one name per component.
+    def __init__(self, store: "Store") -> None:
+        self.store = store
+
+    def __getitem__(self, key: str) -> int:
+        if key in self.store.nodes:
+            return self.store.nodes[key]
+        if isinstance(key, str) and key.endswith(INTERNAL) and key[:-len(INTERNAL)] in self.store.locations:
+            table, row = self.store.locations[key[:-len(INTERNAL)]]
+            for role in table.layout.internal:
+                return int(table.nodes[role][row])
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> typing.Iterator[str]:
+        yield from self.store.nodes
+        for name, (table, _) in self.store.locations.items():
+            if table.layout.internal:
+                yield f"{name}{INTERNAL}"
+
+    def __len__(self) -> int:
+        # Unknowns of replaced components stay allocated but are no longer named
+        return len(self.store.nodes) + sum(int(np.count_nonzero(table.alive[:table.count])) * len(table.layout.internal)
+                                           for table in self.store.tables.values())
+
+class Store:
+    # Components as per-type columns with interned node ids; the component classes are views.
+    # A standalone store holds one component created outside any circuit.
+    def __init__(self, standalone: bool = False) -> None:
+        self.standalone = standalone
+        # Bumped whenever a view moves a component to other nodes
+        self.topology: int = 0
+        self.nodes: typing.Dict[str, int] = dict()
+        self.labels: typing.List[typing.Optional[str]] = []
+        self.tables: typing.Dict[type, ComponentTable] = dict()
+        self.locations: typing.Dict[str, typing.Tuple[ComponentTable, int]] = dict()
+        self.sequence: int = 0
+        self.index = NodeIndex(self)
+
+    @property
+    def size(self) -> int:
+        return len(self.labels)
+
+    def intern(self, name: str) -> int:
+        node = self.nodes.get(name)
+        if node is None:
+            node = self.nodes[name] = len(self.labels)
+            self.labels.append(name)
+        return node
+
+    def allocate(self) -> int:
+        self.labels.append(None)
+        return len(self.labels) - 1
+
+    def table(self, kind: type) -> ComponentTable:
+        if kind not in self.tables:
+            self.tables[kind] = ComponentTable(self, kind)
+        return self.tables[kind]
+
+    def append(self, kind: type, name: str, nodes: typing.Dict[str, str],
+               values: typing.Dict[str, typing.Any]) -> typing.Tuple[ComponentTable, int]:
+        # Unknowns are numbered in terminal order as components arrive; a name that is
+        # already taken is overwritten in place, or moved when its type changes
+        table = self.table(kind)
+        previous = self.locations.get(name)
+        if previous is not None and previous[0] is table:
+            row = previous[1]
+            ids = [table.nodes[role][row] if role in table.layout.internal else self.intern(nodes[role])
+                   for role in table.layout.roles]
+            table.write(row, ids, values)
+            return table, row
+        if previous is not None:
+            previous[0].alive[previous[1]] = False
+
+        ids = [self.allocate() if internal else self.intern(nodes[role]) for role, internal in table.spec]
+        row = table.append(name, ids, values, self.sequence)
+        self.sequence += 1
+        self.locations[name] = (table, row)
+        return table, row
+
+    def extend(self, records: typing.Iterable[typing.Tuple[type, str, typing.Dict[str, str], typing.Dict[str, typing.Any]]],
+               block: int = 1 << 16) -> None:
+        # Bulk append: rows are numbered as they arrive but written to the columns a block at a time.
+        # Nothing here forms reference cycles, so the cyclic collector is paused meanwhile.
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self.stage(records, block)
+        finally:
+            if enabled:
+                gc.enable()
+
+    def stage(self, records: typing.Iterable[typing.Tuple[type, str, typing.Dict[str, str], typing.Dict[str, typing.Any]]],
+              block: int) -> None:
+        staged: typing.Dict[ComponentTable, typing.List[typing.Tuple[typing.List[int], typing.Dict[str, typing.Any], int]]] = dict()
+        pending = 0
+        for kind, name, nodes, values in records:
+            if name in self.locations:
+                self.flush(staged)
+                pending = 0
+                self.append(kind, name, nodes, values)
+                continue
+            table = self.table(kind)
+            rows = staged.setdefault(table, [])
+            ids = [self.allocate() if internal else self.intern(nodes[role]) for role, internal in table.spec]
+            rows.append((ids, values, self.sequence))
+            self.sequence += 1
+            table.names.append(name)
+            self.locations[name] = (table, table.count + len(rows) - 1)
+            pending += 1
+            if pending >= block:
+                self.flush(staged)
+                pending = 0
+        self.flush(staged)
+
+    def flush(self, staged: typing.Dict[ComponentTable, typing.List[typing.Tuple[typing.List[int], typing.Dict[str, typing.Any], int]]]) -> None:
+        for table, rows in staged.items():
+            if not rows:
+                continue
+            start, stop = table.count, table.count + len(rows)
+            table.reserve(stop)
+            ids = np.array([row[0] for row in rows], dtype=np.int64).reshape(len(rows), -1)
+            for i, role in enumerate(table.layout.roles):
+                table.nodes[role][start:stop] = ids[:, i]
+            for field in table.layout.fields:
+                table.columns[field][start:stop] = [row[1].get(field, 0) for row in rows]
+            table.order[start:stop] = [row[2] for row in rows]
+            table.alive[start:stop] = True
+            table.count = stop
+            rows.clear()
+
+    def add(self, component) -> None:
+        # Copies a component into this store. A standalone component becomes a view of its
+        # new row; one that already belongs to another circuit stays a view there, so each
+        # circuit holds its own copy and edits through one never reach the other.
+        table = component.table
+        nodes = {role: getattr(component, role) for role in table.layout.roles if role not in table.layout.internal}
+        values = {field: table.columns[field][component.row] for field in table.layout.fields}
+        location = self.append(type(component), component.name, nodes, values)
+        if table.store.standalone or table.store is self:
+            component.table, component.row = location
+
+    def locate(self, name: str) -> typing.Tuple[ComponentTable, int]:
+        return self.locations[name]
+
+    def view(self, name: str):
+        table, row = self.locations[name]
+        return table.view(row)
+
+    def set_passive_s(self, s: complex) -> None:
+        for table in self.tables.values():
+            if not table.kind.active:
+                table.columns["s"][:table.count] = s
+
+class Components(typing.Mapping[str, typing.Any]):
+    # Name -> component view, in insertion order; views are made on access
+    def __init__(self, store: Store) -> None:
+        self.store = store
+
+    def __getitem__(self, name: str):
+        return self.store.view(name)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.store.locations
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self.store.locations)
+
+    def __len__(self) -> int:
+        return len(self.store.locations)
@@ -0,0 +1,187 @@
+import collections
+import itertools
+import typing
+import numpy as np
+
+from . import components as Component
+from . import profiling, store
+from .assembly import AssemblyPlan, System
+from .backends import select_backend
+from .cache import fingerprint
+
+class Definition:
+    # A wrapped circuit seen through its ports. Its other unknowns are eliminated once per s
+    # (Schur complement) into the port admittance block Y and the Norton currents J of its
+    # initial conditions, I_ports = Y V_ports - J, which every instance then stamps.
+    def __init__(self, circuit, ports: typing.Tuple[str, ...], max_entries: int = 1024) -> None:
+        assert len(ports) >= 2, "A subcircuit needs at least two ports"
+        assert len(set(ports)) == len(ports), "Ports must be distinct nodes"
+        for port in ports:
+            assert port in circuit.real_terminals, f"Port node '{port}' not found in subcircuit"
+        self.circuit = circuit
+        self.ports = ports
+        self.max_entries = max_entries
+        self.blocks: "collections.OrderedDict[complex, typing.Tuple[np.ndarray, np.ndarray]]" = collections.OrderedDict()
+        self.state: typing.Optional[str] = None
+        self.hits: int = 0
+        self.misses: int = 0
+
+        # Partition of the wrapped circuit's unknowns, rebuilt when its plan is
+        self.plan: typing.Optional[AssemblyPlan] = None
+        self.system: typing.Optional[System] = None
+
+    def refresh(self) -> AssemblyPlan:
+        # Blocks stay valid while the wrapped circuit keeps its topology and values
+        plan = self.circuit.compile()
+        state = fingerprint((self.circuit.revision, plan.dependencies()), plan.coefficients())
+        if state != self.state:
+            self.blocks.clear()
+            self.state = state
+        if plan is not self.plan:
+            assert not plan.terms, "Subcircuits cannot contain sources"
+            self.plan = plan
+            # The last port is the reference; every other unknown that is not a port is eliminated
+            ports = np.array([plan.index[port] for port in self.ports], dtype=np.int64)
+            inner = np.setdiff1d(plan.passive_live, ports)
+            self.outer = np.full(plan.n, -1, dtype=int)
+            self.outer[ports[:-1]] = np.arange(ports.size - 1)
+            self.inner = np.full(plan.n, -1, dtype=int)
+            self.inner[inner] = np.arange(inner.size)
+            matrix, rhs = plan.passive_matrix, plan.passive_rhs
+            self.system = System(None, inner, matrix.restrict(self.inner), rhs.restrict(self.inner))
+            self.entries = (matrix.restrict(self.outer), matrix.restrict(self.outer, self.inner),
+                            matrix.restrict(self.inner, self.outer), rhs.restrict(self.outer))
+        return plan
+
+    def block(self, s: complex) -> typing.Tuple[np.ndarray, np.ndarray]:
+        self.refresh()
+        return self.lookup(complex(s))
+
+    def sample(self, s_values: np.ndarray) -> typing.Tuple[np.ndarray, np.ndarray]:
+        # Stacked (..., ports, ports) blocks and (..., ports) currents, one reduction per distinct s
+        self.refresh()
+        s_values = np.asarray(s_values, dtype=complex)
+        unique, inverse = np.unique(s_values.reshape(-1), return_inverse=True)
+        blocks = [self.lookup(s) for s in unique.tolist()]
+        size = len(self.ports)
+        y = np.array([b[0] for b in blocks]).reshape(-1, size, size)[inverse]
+        j = np.array([b[1] for b in blocks]).reshape(-1, size)[inverse]
+        return y.reshape(s_values.shape + (size, size)), j.reshape(s_values.shape + (size,))
+
+    def lookup(self, s: complex) -> typing.Tuple[np.ndarray, np.ndarray]:
+        if s in self.blocks:
+            self.blocks.move_to_end(s)
+            self.hits += 1
+            return self.blocks[s]
+        self.misses += 1
+        self.blocks[s] = self.reduce(s)
+        while len(self.blocks) > self.max_entries:
+            self.blocks.popitem(last=False)
+        return self.blocks[s]
+
+    @profiling.instrument("port_reduction")
+    def reduce(self, s: complex) -> typing.Tuple[np.ndarray, np.ndarray]:
+        plan, system = self.plan, self.system
+        coefficients = plan.at(plan.coefficients(), s)
+        ports, coupling, constraint, rhs = self.entries
+        k, m = len(self.ports) - 1, system.size
+        profiling.note(size=m, ports=k + 1)
+
+        reduced = np.zeros(shape=(k, k), dtype=complex)
+        np.add.at(reduced, (ports.rows, ports.cols), ports.values(coefficients, s))
+        currents = np.zeros(shape=(k,), dtype=complex)
+        np.add.at(currents, rhs.rows, rhs.values(coefficients, s))
+
+        if m:
+            # Y = A_pp - A_pi A_ii^-1 A_ip and J = b_p - A_pi A_ii^-1 b_i, one factorization
+            # of A_ii with the port columns and the inner currents as right-hand sides
+            solver = select_backend(self.circuit.backend, m)
+            factorization = solver.factorize(system, solver.assemble(system, system.matrix.values(coefficients, s)))
+            columns = np.zeros(shape=(m, k + 1), dtype=complex)
+            np.add.at(columns, (constraint.rows, constraint.cols), constraint.values(coefficients, s))
+            columns[:, k] = system.currents(coefficients, s)
+            solved = factorization.solve(columns).reshape(m, k + 1)
+
+            values = coupling.values(coefficients, s)
+            np.add.at(reduced, coupling.rows, -values[:, None] * solved[coupling.cols, :k])
+            np.add.at(currents, coupling.rows, -values * solved[coupling.cols, k])
+
+        # The reference port's row and column make every row and column sum to zero
+        y = np.zeros(shape=(k + 1, k + 1), dtype=complex)
+        y[:k, :k] = reduced
+        y[:k, k] = -reduced.sum(axis=1)
+        y[k, :k] = -reduced.sum(axis=0)
+        y[k, k] = reduced.sum()
+        return y, np.append(currents, -currents.sum())
+
+# Suffixes of the generated class names
+KINDS = itertools.count()
+
+class Subcircuit(Component.Component):
+    # An instance of a wrapped circuit, Subcircuit(name, circuit, {port node: parent node}).
+    # Instances of one (circuit, ports) pair share a generated subclass, hence one table and
+    # one Definition; the parent sees only the ports, stamped with the shared block.
+    # The subclasses hang off the wrapped circuit (circuit.subcircuits), a reference cycle
+    # through the Definition, so both are collected once nothing else holds either.
+    __slots__ = ()
+    definition: Definition
+
+    def __new__(cls, name: str, circuit, ports: typing.Dict[str, str]):
+        key = tuple(ports)
+        if key not in circuit.subcircuits:
+            definition = Definition(circuit, key)
+            size = len(definition.ports)
+            namespace: typing.Dict[str, typing.Any] = {f"port{i}": store.Node() for i in range(size)}
+            namespace.update(__slots__=(), definition=definition, dynamic=frozenset(
+                [f"y{i}_{j}" for i in range(size) for j in range(size)] + [f"j{i}" for i in range(size)]))
+            circuit.subcircuits[key] = type(f"{cls.__name__}{next(KINDS)}", (cls,), namespace)
+        return object.__new__(circuit.subcircuits[key])
+
+    def __init__(self, name: str, circuit, ports: typing.Dict[str, str]) -> None:
+        super().__init__(name, {f"port{i}": node for i, node in enumerate(ports.values())})
+
+    def __getattr__(self, name: str):
+        # Block entries at the component's own s, for coefficient() and stamp()
+        if name in type(self).dynamic:
+            return type(self).values(self.s)[name]
+        raise AttributeError(name)
+
+    @classmethod
+    def values(cls, s: complex) -> typing.Dict[str, complex]:
+        y, j = cls.definition.block(s)
+        values = {f"y{i}_{k}": y[i, k] for i in range(y.shape[0]) for k in range(y.shape[1])}
+        values.update({f"j{i}": j[i] for i in range(j.size)})
+        return values
+
+    @classmethod
+    def state(cls) -> str:
+        cls.definition.refresh()
+        return cls.definition.state
+
+    @classmethod
+    def band(cls) -> typing.Tuple[float, float]:
+        from .rational import natural_band
+        return natural_band(cls.definition.circuit.compile(), cls.definition.ports[-1])
+
+    @property
+    def ports(self) -> typing.List[str]:
+        return [getattr(self, f"port{i}") for i in range(len(self.definition.ports))]
+
+    def stamps(self) -> typing.List[Component.Stamp]:
+        ports = self.ports
+        entries = []
+        for i, row in enumerate(ports):
+            entries.extend(Component.Stamp(row, col, 1, f"y{i}_{j}") for j, col in enumerate(ports))
+            entries.append(Component.Stamp(row, None, 1, f"j{i}"))
+        return entries
+
+    def voltage(self, terminals: typing.Dict[str, int], voltages: np.ndarray) -> complex:
+        # First port against the reference (last) port
+        ports = self.ports
+        return voltages[terminals[ports[0]]] - voltages[terminals[ports[-1]]]
+
+    def current(self, terminals: typing.Dict[str, int], voltages: np.ndarray) -> complex:
+        # Into the first port: Y[0] . V - J[0] at the s each instance sees
+        y, j = self.definition.sample(self.s)
+        current = sum(y[..., 0, i] * voltages[terminals[port]] for i, port in enumerate(self.ports)) - j[..., 0]
+        return current if np.ndim(current) else complex(current)
@@ -0,0 +1,98 @@
+import typing
+import numpy as np
+
+from . import profiling
+from .assembly import AssemblyPlan, Border, Entries, System
+from .backends import select_backend, singular
+from .incremental import Incremental
+
+def scatter(entries: Entries, values: np.ndarray, shape: typing.Tuple[int, ...]) -> np.ndarray:
+    array = np.zeros(shape=shape, dtype=complex)
+    np.add.at(array, entries.rows if entries.cols is None else (entries.rows, entries.cols), values)
+    return array
+
+def factorize(system: System, s: complex, coefficients: np.ndarray, backend: str,
+              incremental: typing.Optional[Incremental] = None):
+    solver = select_backend(backend, system.size)
+    values = system.matrix.values(coefficients, s)
+    if incremental is not None:
+        return incremental.factorize(system, s, values, solver)
+    return solver.factorize(system, solver.assemble(system, values))
+
+def solve_direct(system: System, s: complex, coefficients: np.ndarray, backend: str, excitation: int = -1,
+                 incremental: typing.Optional[Incremental] = None) -> np.ndarray:
+    return factorize(system, s, coefficients, backend, incremental).solve(system.currents(coefficients, s, excitation))
+
+def solve_bordered(passive: System, borders: typing.List[Border], s: complex, coefficients: np.ndarray,
+                   backend: str, excitation: int = -1,
+                   incremental: typing.Optional[Incremental] = None) -> typing.Optional[typing.List[typing.Tuple[np.ndarray, np.ndarray]]]:
+    n = passive.size
+
+    # One factorization of the passive system serves every term: the right-hand
+    # sides are the passive currents, each term's currents and each term's coupling columns
+    columns = [passive.currents(coefficients, s, excitation)[:, None]]
+    for border in borders:
+        rhs = border.rhs.substitute(excitation)
+        columns.append(scatter(rhs, rhs.values(coefficients, s), (n,))[:, None])
+        columns.append(scatter(border.coupling, border.coupling.values(coefficients, s), (n, border.extra.size)))
+
+    try:
+        solved = factorize(passive, s, coefficients, backend, incremental).solve(np.hstack(columns))
+    except ValueError:
+        return None
+    if not np.all(np.isfinite(solved)):
+        return None
+
+    contributions = []
+    column = 1
+    for border in borders:
+        m = border.extra.size
+        passive_part = solved[:, 0] + solved[:, column]
+        coupled = solved[:, column + 1:column + 1 + m]
+        column += 1 + m
+
+        if m:
+            # Schur complement of the passive block: (D - C P^-1 B) x_extra = r_extra - C P^-1 r
+            with profiling.phase("schur", size=m):
+                constraint = border.constraint.values(coefficients, s)
+                extra_rhs = border.extra_rhs.substitute(excitation)
+                schur = scatter(border.block, border.block.values(coefficients, s), (m, m))
+                np.add.at(schur, border.constraint.rows, -constraint[:, None] * coupled[border.constraint.cols])
+                reduced = scatter(extra_rhs, extra_rhs.values(coefficients, s), (m,))
+                np.add.at(reduced, border.constraint.rows, -constraint * passive_part[border.constraint.cols])
+                try:
+                    extra = np.linalg.solve(schur, reduced)
+                except np.linalg.LinAlgError:
+                    raise singular()
+                passive_part = passive_part - coupled @ extra
+        else:
+            extra = np.zeros(shape=(0,), dtype=complex)
+        contributions.append((passive_part, extra))
+
+    return contributions
+
+@profiling.instrument("superposition")
+def solve(plan: AssemblyPlan, ground: str, s: complex, members: typing.List[int], coefficients: np.ndarray,
+          backend: str, grouped: bool = True, excitation: int = -1,
+          incremental: typing.Optional[Incremental] = None) -> np.ndarray:
+    # Sum of the superposition terms in members, all evaluated at the same s
+    voltages = np.zeros(shape=(plan.n,), dtype=complex)
+    systems = plan.systems(ground)
+    coefficients = plan.at(coefficients, s)
+
+    direct = list(members)
+    if grouped and len(members) > 1:
+        passive, borders = plan.borders(ground)
+        bordered = [i for i in members if borders[i] is not None]
+        contributions = solve_bordered(passive, [borders[i] for i in bordered], s, coefficients, backend, excitation,
+                                       incremental)
+        if contributions is not None:
+            for i, (passive_part, extra) in zip(bordered, contributions):
+                voltages[passive.keep] += passive_part
+                voltages[borders[i].extra] += extra
+            direct = [i for i in members if borders[i] is None]
+
+    for i in direct:
+        voltages[systems[i].keep] += solve_direct(systems[i], s, coefficients, backend, excitation, incremental)
+
+    return voltages
@@ -0,0 +1,208 @@
+import typing
+import numpy as np
+
+from . import components as Component
+from .assembly import System
+from . import profiling, rational, superposition
+from .backends import select_backend, singular
+from .cache import fingerprint
+from .graphical import ComplexFunction
+from .results import Solution
+
+if typing.TYPE_CHECKING:
+    from .sensitivity import Sensitivity
+
+# Upper bound for one stacked (N_s, n, n) system; larger sweeps are solved in chunks
+MAX_BATCH_BYTES: int = 2**27
+# Upper bound for the (N_s, n) solutions held at once by streamed sweeps and evaluate()
+MAX_CHUNK_BYTES: int = 2**27
+
+def chunk_size(n: int) -> int:
+    return max(1, MAX_CHUNK_BYTES // (16 * max(1, n)))
+
+@profiling.instrument("pencil")
+def solve_pencil(matrix: typing.Dict[int, np.ndarray], currents: typing.Dict[int, np.ndarray], s_values: np.ndarray) -> np.ndarray:
+    size = next(iter(matrix.values())).shape[0] if matrix else 0
+    solution = np.zeros(shape=(s_values.size, size), dtype=complex)
+
+    chunk = max(1, MAX_BATCH_BYTES // (16 * max(1, size) ** 2))
+    for start in range(0, s_values.size, chunk):
+        s = s_values[start:start + chunk]
+        # Stacked A(s) = sum_k s**k * M_k and b(s) = sum_k s**k * b_k
+        a = sum((s ** order)[:, None, None] * m for order, m in matrix.items())
+        b = sum((s ** order)[:, None] * c for order, c in currents.items())
+        try:
+            solution[start:start + chunk] = np.linalg.solve(a, b[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            raise singular()
+
+    profiling.note(size=size, points=s_values.size, estimated_bytes=16 * size * (size + 1) * s_values.size)
+    return solution
+
+class FrequencySweep:
+    def __init__(self, circuit, ground: str, excitation: typing.Optional[str] = None) -> None:
+        self.circuit = circuit
+        self.plan = circuit.compile()
+        self.ground = ground
+        # The excitation component's value follows s, as in transfer functions
+        self.excitation: typing.Optional[Component.Component] = circuit.components[excitation] if excitation else None
+
+    def solve(self, s_values: np.ndarray) -> np.ndarray:
+        s_values = np.asarray(s_values, dtype=complex).reshape(-1)
+        cache = self.circuit.cache
+        if cache is None:
+            return self.compute(s_values)
+
+        # Only the frequencies missing from the cache are solved, still as one batch
+        excitation = self.plan.find(self.excitation.name if self.excitation else None, "s")
+        state = fingerprint((self.circuit.revision, self.plan.dependencies()), self.plan.coefficients(), excitation)
+        keys = [("sweep", state, self.ground, excitation, s) for s in s_values.tolist()]
+        solution = np.zeros(shape=(s_values.size, self.plan.n), dtype=complex)
+        missing = []
+        for i, key in enumerate(keys):
+            cached = cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                solution[i] = cached
+        if missing:
+            solution[missing] = self.compute(s_values[missing])
+            for i in missing:
+                cache.put(keys[i], solution[i])
+        return solution
+
+    @profiling.instrument("sweep")
+    def compute(self, s_values: np.ndarray) -> np.ndarray:
+        profiling.note(ground=self.ground, points=s_values.size, unknowns=self.plan.n)
+        solution = np.zeros(shape=(s_values.size, self.plan.n), dtype=complex)
+        coefficients = self.plan.coefficients()
+        excitation = self.plan.find(self.excitation.name if self.excitation else None, "s")
+
+        systems = self.plan.systems(self.ground)
+        # Dynamic parameters (subcircuit blocks) are not polynomial in s, so those plans are solved per s too
+        dense = [i for i, system in enumerate(systems)
+                 if not self.plan.dynamic and select_backend(self.circuit.backend, system.size).name == "dense"]
+        for i in dense:
+            solution[:, systems[i].keep] += self.solve_batched(systems[i], s_values, coefficients, excitation)
+
+        # Other systems are factored per frequency, reusing the topology's ordering
+        members = [i for i in range(len(systems)) if i not in dense]
+        if members:
+            for i, s in enumerate(s_values):
+                solution[i] += superposition.solve(self.plan, self.ground, s, members, coefficients,
+                                                   self.circuit.backend, excitation=excitation)
+
+        return solution
+
+    @staticmethod
+    def solve_batched(system: System, s_values: np.ndarray, coefficients: np.ndarray, excitation: int) -> np.ndarray:
+        matrix, currents = system.expand(coefficients, excitation)
+        return solve_pencil(matrix, currents, s_values)
+
+    def results(self, s_values: np.ndarray, components: typing.Optional[typing.List[str]] = None) -> Solution:
+        # (N_s, N_c) voltage, current and power for the whole sweep
+        s_values = np.asarray(s_values, dtype=complex).reshape(-1)
+        names = components or list(self.circuit.components.keys())
+        solution = self.solve(s_values)
+
+        # Components evaluate their own voltage/current, so they see the whole sweep at once
+        overrides = {(self.excitation.name, "s"): s_values} if self.excitation is not None else None
+        results = Solution.gather(self.circuit.store, names, solution.T, s_values, overrides)
+
+        # Like a solve, the passive components and the excitation are left at the last s
+        last = s_values[-1] if s_values.size else 0
+        self.circuit.store.set_passive_s(last)
+        if self.excitation is not None:
+            self.excitation.set_s(last)
+        return results
+
+    def stream(self, s_values: np.ndarray, nodes: typing.Optional[typing.List[str]] = None,
+               chunk: typing.Optional[int] = None, start: int = 0) -> typing.Iterator[typing.Tuple[int, np.ndarray]]:
+        # Yields (offset, solution) per chunk of frequencies from start on: solution is
+        # (chunk, len(nodes)) for the named nodes, every unknown by default. Only one chunk
+        # of solutions is held at a time.
+        s_values = np.asarray(s_values, dtype=complex).reshape(-1)
+        chunk = chunk or chunk_size(self.plan.n)
+        columns = None if nodes is None else [self.plan.index[node] for node in nodes]
+        for offset in range(start, s_values.size, chunk):
+            solution = self.solve(s_values[offset:offset + chunk])
+            yield offset, solution if columns is None else solution[:, columns]
+
+    def evaluate(self, s_values: np.ndarray, outputs: typing.List[typing.Tuple[str, str]]) -> typing.List[np.ndarray]:
+        # Solved a chunk at a time, so memory grows with the outputs rather than the whole solution
+        shape = np.shape(s_values)
+        s_values = np.asarray(s_values, dtype=complex).reshape(-1)
+        names = list(dict.fromkeys(name for name, _ in outputs))
+        values = [np.zeros(shape=(s_values.size,), dtype=complex) for _ in outputs]
+        chunk = chunk_size(self.plan.n)
+        for offset in range(0, max(s_values.size, 1), chunk):
+            results = self.results(s_values[offset:offset + chunk], names)
+            for value, (name, kind) in zip(values, outputs):
+                value[offset:offset + chunk] = results[name, kind]
+        return [value.reshape(shape) for value in values]
+
+class TransferFunction(ComplexFunction):
+    def __init__(self, circuit, earth: str,
+                 input_node: typing.Tuple[str, str],
+                 output_node: typing.Tuple[str, str]) -> None:
+        super().__init__()
+        self.circuit = circuit
+        self.earth = earth
+        self.input_node = input_node
+        self.output_node = output_node
+        # Reduced models stand in for the full sweep, see reduce()
+        self.model: typing.Optional[FrequencySweep] = None
+
+    @profiling.instrument("transfer_function")
+    def f(self, s_values):
+        sweep = self.model or FrequencySweep(self.circuit, self.earth, excitation=self.input_node[0])
+        in_val, out_val = sweep.evaluate(s_values, [self.input_node, self.output_node])
+
+        # Avoid division by zero if input is 0 (though unlikely in AC analysis unless DC)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = np.where(in_val == 0, 0, out_val / in_val)
+
+        if np.ndim(s_values) == 0:
+            return complex(result)
+        return result
+
+    def reduce(self, order: int = 20, expansion_points: typing.Optional[typing.List[complex]] = None,
+               band: typing.Optional[typing.Tuple[float, float]] = None) -> "TransferFunction":
+        # band: the angular frequencies the reduced model is meant for (see ReducedModel)
+        from .reduction import ReducedModel
+        reduced = TransferFunction(self.circuit, self.earth, self.input_node, self.output_node)
+        reduced.resolution, reduced.real_range, reduced.imag_range = self.resolution, self.real_range, self.imag_range
+        reduced.model = ReducedModel(self.circuit, self.earth, order, expansion_points, excitation=self.input_node[0],
+                                     band=band)
+        return reduced
+
+    def sensitivity(self, s_values) -> "Sensitivity":
+        # Adjoint derivatives of H(s) with respect to every component value
+        from .sensitivity import compute
+        return compute(self.circuit, self.earth, self.output_node, s_values, self.input_node)
+
+    def rational(self, samples: typing.Optional[np.ndarray] = None, tol: float = 1e-12, max_degree: int = 100) -> rational.RationalFunction:
+        # One batched sweep, then poles/zeros/gain for cheap re-evaluation
+        plan = self.circuit.compile()
+        if samples is None:
+            samples = rational.default_samples(rational.natural_band(plan, self.earth))
+        coefficients = plan.coefficients()
+        return rational.fit(samples, self.f(np.asarray(samples)), tol, max_degree, poles=self.natural_frequencies(),
+                            real=not np.any(np.imag(coefficients)), resolution=self.resolution,
+                            real_range=self.real_range, imag_range=self.imag_range)
+
+    def natural_frequencies(self) -> typing.Optional[np.ndarray]:
+        # The poles of H when the input is a source's own value: the natural frequencies of
+        # the source's superposition term (None when they cannot be computed exactly)
+        plan = self.circuit.compile()
+        source = self.circuit.components[self.input_node[0]]
+        kind = {Component.VoltageSource: "Voltage", Component.CurrentSource: "Current"}.get(type(source))
+        if plan.dynamic or kind != self.input_node[1]:
+            return None
+        coefficients = plan.coefficients()
+        systems = [system for system in plan.systems(self.earth)
+                   if system.term is not None and system.term.component.name == source.name]
+        frequencies = [rational.natural_frequencies(system, coefficients) for system in systems]
+        if not frequencies or any(f is None for f in frequencies):
+            return None
+        return np.concatenate(frequencies)
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import typing
+import numpy as np
+
+from . import profiling
+
+# A sweep on disk is a directory: s.npy (N_s,), values.npy (N_s, nodes) and meta.json with the
+# node names, the chunk size, how many chunks are complete and a signature of the inputs
+S_FILE, VALUES_FILE, META_FILE = "s.npy", "values.npy", "meta.json"
+
+def signature(sweep, s_values: np.ndarray, nodes: typing.List[str], chunk: int) -> str:
+    # Content hash of everything the stored values depend on, stable across processes (the
+    # in-memory fingerprints include the per-process revision counter). Changing the circuit,
+    # ground, excitation, frequencies, nodes or chunk starts a new file instead of resuming.
+    plan = sweep.plan
+    coefficients = plan.coefficients()
+    if plan.dynamic and s_values.size:
+        coefficients = plan.at(coefficients, s_values[0])
+    digest = hashlib.sha256()
+    digest.update(json.dumps([sweep.ground, sweep.excitation.name if sweep.excitation else None, nodes, chunk,
+                              list(plan.index)]).encode())
+    for system in plan.systems(sweep.ground):
+        for entries in (system.matrix, system.rhs):
+            for array in entries:
+                if array is not None:
+                    digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update(coefficients.tobytes())
+    digest.update(s_values.tobytes())
+    return digest.hexdigest()
+
+class SweepFile:
+    # Read side of a stored sweep. values is a read-only memory map, so slicing by frequency
+    # (values[i:j]) or by node (sweep_file["n1"]) only reads those parts of the file.
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as file:
+            self.meta: typing.Dict[str, typing.Any] = json.load(file)
+        self.s: np.ndarray = np.load(os.path.join(path, S_FILE), mmap_mode="r")
+        self.values: np.ndarray = np.load(os.path.join(path, VALUES_FILE), mmap_mode="r")
+        self.nodes: typing.List[str] = self.meta["nodes"]
+        self.positions: typing.Dict[str, int] = {node: i for i, node in enumerate(self.nodes)}
+
+    @property
+    def completed(self) -> int:
+        # Frequencies written so far, in order
+        return min(self.meta["completed"] * self.meta["chunk"], self.s.size)
+
+    @property
+    def complete(self) -> bool:
+        return self.completed == self.s.size
+
+    def __getitem__(self, node: str) -> np.ndarray:
+        return self.values[:, self.positions[node]]
+
+def write_meta(path: str, meta: typing.Dict[str, typing.Any]) -> None:
+    # Replaced atomically, so an interrupted run never leaves a torn progress record
+    temporary = os.path.join(path, META_FILE + ".tmp")
+    with open(temporary, "w") as file:
+        json.dump(meta, file)
+    os.replace(temporary, os.path.join(path, META_FILE))
+
+@profiling.instrument("sweep_file")
+def write(sweep, path: str, s_values: np.ndarray, nodes: typing.Optional[typing.List[str]] = None,
+          chunk: typing.Optional[int] = None) -> SweepFile:
+    # Solves the sweep chunk by chunk straight into a memory-mapped .npy. A chunk counts as
+    # complete once its values are flushed, so a rerun with the same inputs resumes after
+    # the last complete chunk (and a finished file is returned as is).
+    from .sweep import chunk_size
+    s_values = np.asarray(s_values, dtype=complex).reshape(-1)
+    nodes = list(nodes or sweep.plan.index)
+    chunk = chunk or chunk_size(sweep.plan.n)
+    key = signature(sweep, s_values, nodes, chunk)
+    os.makedirs(path, exist_ok=True)
+
+    meta = None
+    if os.path.exists(os.path.join(path, META_FILE)):
+        with open(os.path.join(path, META_FILE)) as file:
+            meta = json.load(file)
+    if meta is not None and meta.get("signature") == key:
+        values = np.lib.format.open_memmap(os.path.join(path, VALUES_FILE), mode="r+")
+    else:
+        meta = {"signature": key, "nodes": nodes, "chunk": chunk, "completed": 0}
+        np.save(os.path.join(path, S_FILE), s_values)
+        values = np.lib.format.open_memmap(os.path.join(path, VALUES_FILE), mode="w+", dtype=complex,
+                                           shape=(s_values.size, len(nodes)))
+        write_meta(path, meta)
+
+    profiling.note(points=s_values.size, nodes=len(nodes), resumed=meta["completed"])
+    for offset, solution in sweep.stream(s_values, nodes, chunk, meta["completed"] * chunk):
+        values[offset:offset + solution.shape[0]] = solution
+        values.flush()
+        meta["completed"] += 1
+        write_meta(path, meta)
+    del values
+    return SweepFile(path)
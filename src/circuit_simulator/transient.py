@@ -0,0 +1,174 @@
+import typing
+import numpy as np
+
+from . import profiling
+from .assembly import Entries
+from .backends import select_backend, singular
+
+# A source waveform: a constant, samples at every grid point t_0..t_N, or a callable of an array of times
+Waveform = typing.Union[float, typing.Sequence[float], np.ndarray, typing.Callable[[np.ndarray], typing.Any]]
+
+# Both integrators step with the s-domain matrix G + s*C at s = factor / step
+METHODS: typing.Dict[str, float] = {"backward_euler": 1.0, "trapezoidal": 2.0}
+
+def scatter(entries: Entries, values: np.ndarray, size: int, sparse: typing.Any):
+    if sparse is not None:
+        return sparse.csr_matrix((values, (entries.rows, entries.cols)), shape=(size, size))
+    matrix = np.zeros(shape=(size, size), dtype=values.dtype)
+    np.add.at(matrix, (entries.rows, entries.cols), values)
+    return matrix
+
+def factorize(backend, matrix) -> typing.Callable[[np.ndarray], np.ndarray]:
+    # LU factors computed once; every step afterwards is back-substitution only
+    if backend.name == "sparse":
+        try:
+            return backend.linalg.splu(matrix.tocsc(), permc_spec="COLAMD").solve
+        except RuntimeError:
+            raise singular()
+    try:
+        import scipy.linalg
+    except ImportError:
+        try:
+            return np.linalg.inv(matrix).dot
+        except np.linalg.LinAlgError:
+            raise singular()
+    factors = scipy.linalg.lu_factor(matrix, check_finite=False)
+    if np.any(np.diag(factors[0]) == 0):
+        raise singular()
+    return lambda rhs: scipy.linalg.lu_solve(factors, rhs, check_finite=False)
+
+class Transient:
+    # Fixed-step time integration of C x' + G x = b(t), with G and C the order 0 and
+    # order 1 stamps of every component. Order 0 initial-condition stamps (C*v0, L*i0)
+    # give the state at t = 0+, source values become input waveforms.
+    @profiling.instrument("transient")
+    def __init__(self, circuit, ground: str, step: float, method: str = "trapezoidal") -> None:
+        assert method in METHODS, f"Unknown method '{method}'"
+        assert step > 0, "Step must be positive"
+        self.circuit = circuit
+        self.plan = circuit.compile()
+        self.ground = ground
+        self.step = step
+        self.method = method
+        self.s = METHODS[method] / step
+
+        assert not self.plan.dynamic, "Transient analysis needs a G + sC pencil"
+        system = self.plan.whole(ground)
+        assert set(np.unique(system.matrix.orders)) <= {0, 1}, "Transient analysis needs a G + sC pencil"
+        self.system = system
+        self.sources = [term.component.name for term in self.plan.terms]
+
+        coefficients = self.plan.coefficients()
+        self.dtype = complex if np.any(coefficients.imag) else float
+        coefficients = coefficients.astype(self.dtype) if self.dtype is complex else coefficients.real
+
+        backend = select_backend(circuit.backend, system.size)
+        sparse = backend.sparse if backend.name == "sparse" else None
+        n = system.size
+        values = system.matrix.signs * coefficients[system.matrix.slots]
+        dynamic = system.matrix.orders == 1
+        g = scatter(system.matrix.select(~dynamic), values[~dynamic], n, sparse)
+        c = scatter(system.matrix.select(dynamic), values[dynamic], n, sparse)
+        self.solve = factorize(backend, g + self.s * c)
+
+        # Trapezoidal steps carry (sC - G) x_n + b_n, backward Euler sC x_n
+        self.history = self.s * c - g if method == "trapezoidal" else self.s * c
+        if sparse is None:
+            # Small dense systems fold the solve into one propagator matrix
+            self.propagator: typing.Optional[np.ndarray] = self.solve(self.history)
+        else:
+            self.propagator = None
+        self.charge = self.s * c
+
+        # Right-hand side: one unit column per source, plus constant (order -1) forcing and
+        # the order 0 initial conditions, which act as impulses
+        rhs = system.rhs
+        slots = np.array([self.plan.find(name, "s") for name in self.sources], dtype=np.int64)
+        column = np.full(self.plan.slot_count, -1, dtype=np.int64)
+        column[slots] = np.arange(slots.size)
+        driven = column[rhs.slots] >= 0
+        assert np.all(rhs.orders[driven] == 0), "Source stamps must be of order 0"
+        assert set(np.unique(rhs.orders[~driven])) <= {-1, 0}, "Transient analysis needs rhs stamps of order -1 or 0"
+
+        inputs = np.zeros(shape=(n, slots.size + 1), dtype=self.dtype)
+        np.add.at(inputs, (rhs.rows[driven], column[rhs.slots[driven]]), rhs.signs[driven])
+        constant = ~driven & (rhs.orders == -1)
+        np.add.at(inputs[:, -1], rhs.rows[constant], rhs.signs[constant] * coefficients[rhs.slots[constant]])
+        # Response of one step to each input column
+        self.responses = self.solve(inputs).reshape(n, -1)
+
+        self.initial = np.zeros(shape=(n,), dtype=self.dtype)
+        impulse = ~driven & (rhs.orders == 0)
+        np.add.at(self.initial, rhs.rows[impulse], rhs.signs[impulse] * coefficients[rhs.slots[impulse]])
+
+    def inputs(self, waveforms: typing.Dict[str, Waveform], points: np.ndarray) -> np.ndarray:
+        # (len(points), sources + 1) input values at grid points; sources without a
+        # waveform hold their own value from t = 0
+        times = points * self.step
+        values = np.ones(shape=(points.size, len(self.sources) + 1), dtype=self.dtype)
+        for k, name in enumerate(self.sources):
+            waveform = waveforms.get(name, self.circuit.components[name].s)
+            if callable(waveform):
+                sampled = waveform(times)
+            elif np.ndim(waveform):
+                sampled = np.asarray(waveform)[points]
+            else:
+                sampled = waveform
+            values[:, k] = np.broadcast_to(sampled if self.dtype is complex else np.real(sampled), points.shape)
+        return values
+
+    def advance(self, x: np.ndarray) -> np.ndarray:
+        if self.propagator is not None:
+            return self.propagator.dot(x)
+        return self.solve(self.history.dot(x))
+
+    def stream(self, steps: int, waveforms: typing.Optional[typing.Dict[str, Waveform]] = None,
+               outputs: typing.Optional[typing.List[str]] = None,
+               chunk: int = 4096) -> typing.Iterator[typing.Tuple[np.ndarray, np.ndarray]]:
+        # Yields (times, values) per chunk of steps: values is (len(times), len(outputs)) for
+        # the named nodes (or internal branch currents), every node by default.
+        # Times run t_1..t_steps; array waveforms need samples at t_0..t_steps.
+        waveforms = waveforms or dict()
+        for name in waveforms:
+            assert name in self.sources, f"Source {name} not found"
+        outputs = outputs or [node for node in self.plan.index]
+        positions = np.full(self.plan.n, self.system.size, dtype=np.int64)
+        positions[self.system.keep] = np.arange(self.system.size)
+        columns = positions[[self.plan.index[node] for node in outputs]]
+
+        # Column size is the ground node, always 0
+        states = np.zeros(shape=(min(chunk, max(steps, 1)), self.system.size + 1), dtype=self.dtype)
+        trapezoidal = self.method == "trapezoidal"
+        x = None
+        for start in range(0, steps, chunk):
+            count = min(chunk, steps - start)
+            points = np.arange(start, start + count + 1)
+            u = self.inputs(waveforms, points)
+            # Forcing of every step in the chunk at once
+            forcing = (u[1:] + u[:-1] if trapezoidal else u[1:]).dot(self.responses.T)
+
+            first = 0
+            if x is None:
+                # From the initial charges; the trapezoidal rule needs a consistent state,
+                # so its first step is two backward-Euler half steps (same matrix)
+                x = self.solve(self.s * self.initial)
+                if trapezoidal:
+                    x = x + 0.5 * (u[0] + u[1]).dot(self.responses.T)
+                    x = self.solve(self.charge.dot(x)) + u[1].dot(self.responses.T)
+                else:
+                    x = x + forcing[0]
+                states[0, :-1] = x
+                first = 1
+            with profiling.phase("time_steps", steps=count - first, size=self.system.size):
+                for i in range(first, count):
+                    np.add(self.advance(x), forcing[i], out=states[i, :-1])
+                    x = states[i, :-1]
+            x = x.copy()
+            yield (points[1:] * self.step, states[:count, columns].copy())
+
+    def run(self, steps: int, waveforms: typing.Optional[typing.Dict[str, Waveform]] = None,
+            outputs: typing.Optional[typing.List[str]] = None) -> typing.Tuple[np.ndarray, np.ndarray]:
+        chunks = list(self.stream(steps, waveforms, outputs))
+        if not chunks:
+            return np.zeros(0), np.zeros(shape=(0, len(outputs or self.plan.index)), dtype=self.dtype)
+        return np.concatenate([t for t, _ in chunks]), np.concatenate([v for _, v in chunks])
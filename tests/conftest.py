@@ -0,0 +1,50 @@
+import os
+import sys
+import typing
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The package lives under src/ and the benchmark circuits under benchmarks/
+sys.path[:0] = [os.path.join(ROOT, "src"), ROOT]
+
+from circuit_simulator import Circuit  # noqa: E402
+from circuit_simulator.components import (Capacitor, CurrentControlledVoltageSource, CurrentSource, Inductor,  # noqa: E402
+                                          Resistor, VoltageControlledCurrentSource, VoltageSource)
+
+def multi() -> Circuit:
+    # Every component kind, two independent sources at different s and a CCVS sensing a resistor
+    circuit = Circuit()
+    circuit.add_components([
+        CurrentSource("I1", "a", "g", 1.0),
+        VoltageSource("V2", "b", "g", 2.0),
+        Resistor("R1", "a", "b", 3),
+        Resistor("R2", "b", "g", 4),
+        Capacitor("C1", "a", "g", 0.5, 0.2),
+        VoltageControlledCurrentSource("G1", "b", "g", "a", "g", 0.1),
+        CurrentControlledVoltageSource("H1", "c", "g", "a", "b", 2.0),
+        Resistor("R3", "c", "g", 5),
+        Inductor("L1", "a", "g", 1.0, 0.3),
+        Resistor("R4", "a", "g", 7),
+    ])
+    return circuit
+
+def close(actual, expected, rtol: float = 1e-9) -> bool:
+    actual, expected = np.asarray(actual), np.asarray(expected)
+    return bool(np.max(np.abs(actual - expected), initial=0) <= rtol * max(1.0, np.max(np.abs(expected), initial=0)))
+
+@pytest.fixture(params=["dense", "sparse"])
+def backend(request) -> str:
+    if request.param == "sparse":
+        pytest.importorskip("scipy")
+    return request.param
+
+@pytest.fixture
+def circuit(backend: str) -> Circuit:
+    circuit = multi()
+    circuit.backend = backend
+    return circuit
+
+def node_voltages(circuit: Circuit, nodes: typing.Iterable[str]) -> np.ndarray:
+    return np.array([circuit.voltages[circuit.terminals[node], 0] for node in nodes])
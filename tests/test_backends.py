@@ -0,0 +1,61 @@
+import sys
+
+import numpy as np
+import pytest
+
+from benchmarks.circuits import GENERATORS
+from circuit_simulator import backends
+from conftest import close, multi
+
+@pytest.fixture
+def scipy():
+    return pytest.importorskip("scipy")
+
+@pytest.fixture
+def without_scipy(monkeypatch):
+    # A None entry in sys.modules makes the import raise ImportError
+    for name in ["scipy", "scipy.linalg", "scipy.sparse", "scipy.sparse.linalg"]:
+        monkeypatch.setitem(sys.modules, name, None)
+
+def solved(circuit, backend: str, ground: str, s) -> np.ndarray:
+    circuit.backend = backend
+    circuit.solve(ground, s)
+    return circuit.voltages[:, 0].copy()
+
+@pytest.mark.parametrize("s", [None, 2j, 0.5 + 3j])
+def test_dense_and_sparse_solves_agree(scipy, s):
+    circuit = multi()
+    assert close(solved(circuit, "sparse", "g", s), solved(circuit, "dense", "g", s))
+
+@pytest.mark.parametrize("name", sorted(GENERATORS))
+def test_dense_and_sparse_agree_on_benchmarks(scipy, name):
+    benchmark = GENERATORS[name](200)
+    circuit, ground = benchmark.circuit, benchmark.ground
+    assert close(solved(circuit, "sparse", ground, benchmark.s), solved(circuit, "dense", ground, benchmark.s))
+
+    sweeps = []
+    for backend in ["dense", "sparse"]:
+        circuit.backend = backend
+        sweeps.append(circuit.sweep(ground, benchmark.frequencies, benchmark.output))
+    assert close(sweeps[1], sweeps[0])
+
+def test_sparse_solves_follow_value_edits(scipy):
+    circuit = multi()
+    first = solved(circuit, "sparse", "g", 2j)
+    circuit.components["R1"].resistance = 30
+    second = solved(circuit, "sparse", "g", 2j)
+    assert close(second, solved(circuit, "dense", "g", 2j))
+    assert not close(first, second)
+
+def test_auto_picks_by_size(scipy):
+    assert backends.select_backend("auto", backends.SPARSE_THRESHOLD - 1).name == "dense"
+    assert backends.select_backend("auto", backends.SPARSE_THRESHOLD).name == "sparse"
+
+def test_auto_falls_back_to_dense_without_scipy(without_scipy):
+    assert backends.select_backend("auto", 10 * backends.SPARSE_THRESHOLD).name == "dense"
+    with pytest.raises(ImportError):
+        backends.select_backend("sparse", 10)
+
+    circuit = multi()
+    expected = solved(circuit, "dense", "g", 2j)
+    assert close(solved(circuit, "auto", "g", 2j), expected)
@@ -0,0 +1,46 @@
+import copy
+
+import numpy as np
+import pytest
+
+from benchmarks import GENERATORS
+from benchmarks.run import PHASES, accuracy, compare, run
+from conftest import close
+
+@pytest.mark.parametrize("name", ["rc_ladder", "rlc_ladder", "amplifier"])
+def test_sweep_matches_analytic_response(name, backend):
+    benchmark = GENERATORS[name](60)
+    benchmark.circuit.backend = backend
+    transfer = benchmark.circuit.transfer_function(benchmark.ground, benchmark.input, benchmark.output)
+    assert close(transfer.f(benchmark.frequencies), benchmark.reference(benchmark.frequencies), 1e-8)
+
+@pytest.mark.parametrize("name", list(GENERATORS))
+def test_generators_pass_accuracy_checks(name):
+    benchmark = GENERATORS[name](30, frequencies=8)
+    assert benchmark.frequencies.size == 8
+    checks = accuracy(benchmark)
+    assert checks["passed"], checks
+    assert ("transfer_function" in checks) == (benchmark.reference is not None)
+
+def test_reference_magnitude_stays_measurable():
+    # The sweep bands are scaled with size so the references neither vanish nor stay flat
+    for name in ["rc_ladder", "rlc_ladder", "amplifier"]:
+        for nodes in [10, 200]:
+            benchmark = GENERATORS[name](nodes)
+            magnitude = np.abs(benchmark.reference(benchmark.frequencies))
+            assert magnitude.min() > 1e-6 and magnitude.max() / magnitude.min() > 1.25
+
+def test_run_report_and_compare():
+    report = run(["rc_ladder", "mesh"], [9, 16], repeat=1, frequencies=4)
+    assert [(result["generator"], result["nodes"]) for result in report["results"]] == \
+        [("rc_ladder", 9), ("rc_ladder", 16), ("mesh", 9), ("mesh", 16)]
+    assert all(result["accuracy"]["passed"] for result in report["results"])
+    assert set(report["scaling"]) == {"rc_ladder", "mesh"} and set(report["scaling"]["mesh"]) == set(PHASES)
+
+    slower = copy.deepcopy(report)
+    for result in slower["results"]:
+        for phase in PHASES:
+            result["phases"][phase]["median"] = 2 * report["results"][0]["phases"][phase]["median"] + 1
+    rows = compare(slower, report, floor=0)
+    assert len(rows) == 4 * len(PHASES) and all(row["regression"] for row in rows)
+    assert not any(row["regression"] for row in compare(report, report, floor=0))
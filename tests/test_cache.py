@@ -0,0 +1,74 @@
+import numpy as np
+
+from circuit_simulator import Circuit
+from circuit_simulator.cache import SolveCache
+from conftest import Resistor, close, multi, node_voltages
+
+NODES = ["a", "b", "c"]
+
+def solved(circuit: Circuit) -> np.ndarray:
+    circuit.solve("g")
+    return node_voltages(circuit, NODES)
+
+def test_repeated_solve_hits(circuit):
+    cache = circuit.enable_cache()
+    first = solved(circuit)
+    second = solved(circuit)
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 1
+    assert np.array_equal(first, second)
+
+def test_value_edit_invalidates(circuit):
+    cache = circuit.enable_cache()
+    solved(circuit)
+    circuit.components["R2"].resistance = 8
+    edited = solved(circuit)
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 2
+
+    reference = multi()
+    reference.backend = circuit.backend
+    reference.components["R2"].resistance = 8
+    assert close(edited, solved(reference))
+
+    # Restoring the value finds the first solution again
+    circuit.components["R2"].resistance = 4
+    solved(circuit)
+    assert cache.stats()["hits"] == 1
+
+def test_topology_change_invalidates(circuit):
+    cache = circuit.enable_cache()
+    solved(circuit)
+    circuit.components["R4"].negative = "b"
+    reconnected = solved(circuit)
+    circuit.add_component(Resistor("R5", "c", "b", 6))
+    extended = solved(circuit)
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 3
+    assert not close(reconnected, extended)
+
+def test_sweep_solves_only_missing_frequencies(circuit):
+    cache = circuit.enable_cache()
+    s_values = 1j * np.logspace(-1, 1, 5)
+    first = circuit.sweep("g", s_values, ("R1", "Current"))
+    assert cache.stats()["misses"] == 5
+    more = np.concatenate([s_values, 1j * np.array([20.0, 30.0])])
+    second = circuit.sweep("g", more, ("R1", "Current"))
+    assert cache.stats()["hits"] == 5 and cache.stats()["misses"] == 7
+    assert close(second[:5], first)
+
+    circuit.disable_cache()
+    assert close(second, circuit.sweep("g", more, ("R1", "Current")))
+
+def test_lru_bounds():
+    cache = SolveCache(max_entries=2)
+    for key in "abc":
+        cache.put(key, np.full(4, ord(key), dtype=complex))
+    assert cache.get("a") is None and cache.stats()["evictions"] == 1
+    value = cache.get("b")
+    assert not value.flags.writeable
+
+    small = SolveCache(max_bytes=64)
+    small.put("a", np.zeros(4, dtype=complex))
+    small.put("b", np.zeros(4, dtype=complex))
+    assert list(small.entries) == ["b"] and small.bytes == 64
+    # Values larger than the whole budget are never stored
+    small.put("c", np.zeros(5, dtype=complex))
+    assert "c" not in small.entries
@@ -0,0 +1,73 @@
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+from circuit_simulator.graphical import ComplexFunction, deviation
+
+class Counted(ComplexFunction):
+    def __init__(self, function, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.function = function
+        self.calls = 0
+        self.points = 0
+
+    def f(self, s):
+        self.calls += 1
+        self.points += np.size(s)
+        return self.function(np.asarray(s))
+
+def first_order(s):
+    return s / (s + 10)
+
+def resonance(s, w0: float = 100.0, q: float = 50.0):
+    return w0 ** 2 / (s ** 2 + s * w0 / q + w0 ** 2)
+
+@pytest.fixture(autouse=True)
+def no_windows(monkeypatch):
+    monkeypatch.setattr(plt, "show", lambda: None)
+    yield
+    plt.close("all")
+
+def test_adaptive_bode_is_batched_and_sparse():
+    function = Counted(first_order, imag_range=(0, 1e4))
+    samples = function.sample_bode(adaptive=True, log=True)
+    assert samples.log
+    assert function.calls <= 20
+    assert samples.imag.size == function.points <= 200
+    assert np.all(np.diff(samples.imag) > 0)
+    # Every interval is within tolerance of interpolating its midpoint
+    middle = np.sqrt(samples.imag[:-1] * samples.imag[1:])
+    error = deviation(samples.values[:-1, 0], samples.values[1:, 0], first_order(1j * middle))
+    assert np.max(error) < 2e-2
+
+def test_adaptive_bode_refines_near_a_resonance():
+    function = Counted(resonance, imag_range=(0, 1e4))
+    samples = function.sample_bode(adaptive=True, log=True)
+    # The tenth of a decade around the peak holds more points than a whole flat decade below it
+    near = np.abs(np.log10(samples.imag / 100)) < 0.05
+    flat = (samples.imag > 1) & (samples.imag < 10)
+    assert near.sum() > 2 * flat.sum()
+    assert np.max(np.abs(samples.values)) == pytest.approx(50, rel=1e-2)
+
+def test_fixed_log_sampling():
+    function = Counted(first_order, resolution=50, imag_range=(0, 1e3))
+    samples = function.sample_bode(log=True)
+    assert function.calls == 1
+    assert samples.imag.size == 50
+    assert np.allclose(np.diff(np.log10(samples.imag)), np.log10(samples.imag[1] / samples.imag[0]))
+
+def test_adaptive_laplace_evaluates_once_per_level():
+    function = Counted(lambda s: 1 / (s ** 2 + 2 * s + 5), resolution=200, real_range=(-5, 5), imag_range=(-5, 5))
+    samples = function.sample_laplace(adaptive=True)
+    assert samples.values.shape == (samples.imag.size, samples.real.size)
+    assert function.calls <= 20
+    assert function.points == samples.values.size
+
+@pytest.mark.parametrize("log, scale", [(True, "log"), (False, "linear")])
+def test_plot_bode_axis_follows_the_samples(log, scale):
+    function = Counted(first_order, imag_range=(0, 1e3))
+    samples = function.sample_bode(log=log)
+    function.plot_bode(samples=samples)
+    assert plt.gcf().axes[0].get_xscale() == scale
@@ -0,0 +1,58 @@
+import pytest
+
+from benchmarks.circuits import GENERATORS
+from circuit_simulator.components import Resistor
+from conftest import close, multi
+
+@pytest.fixture
+def pair(backend):
+    circuits = []
+    for _ in range(2):
+        benchmark = GENERATORS["multi_source"](300)
+        benchmark.circuit.backend = backend
+        circuits.append(benchmark.circuit)
+    return circuits[0], circuits[1], benchmark.s
+
+def edit(circuits, name: str, field: str, value: float) -> None:
+    for circuit in circuits:
+        setattr(circuit.components[name], field, value)
+
+def assert_same(incremental, full, s, ground: str = "0") -> None:
+    incremental.solve(ground, s)
+    full.solve(ground, s)
+    assert close(incremental.voltages, full.voltages)
+
+def test_value_edits_match_full_solves(pair):
+    circuit, full, s = pair
+    updates = circuit.enable_incremental(max_updates=3, max_rank=4)
+    assert_same(circuit, full, s)
+    for name in ["R5", "R10", "R11", "R12"]:
+        edit((circuit, full), name, "resistance", 9.)
+        assert_same(circuit, full, s)
+    edit((circuit, full), "C3", "capacitance", 2e-9)
+    assert_same(circuit, full, s)
+    # Both the sparse and the dense LU take low-rank updates instead of refactoring
+    stats = updates.stats()
+    assert stats["updates"] > 0
+    assert stats["factorizations"] < 7
+
+def test_topology_and_s_changes_refactor(pair):
+    circuit, full, s = pair
+    circuit.enable_incremental()
+    assert_same(circuit, full, s)
+    for each in (circuit, full):
+        each.add_component(Resistor("Rx", "n3", "0", 50.))
+    assert_same(circuit, full, s)
+    # Without a sweep every source term is solved at its own s
+    assert_same(circuit, full, None)
+    edit((circuit, full), "R7", "resistance", 3e3)
+    assert_same(circuit, full, 2 * s)
+
+def test_small_circuits_under_auto_take_updates():
+    # Below the sparse threshold "auto" picks the dense LU, which is updated too
+    circuit, full = multi(), multi()
+    updates = circuit.enable_incremental()
+    assert_same(circuit, full, 1j, "g")
+    edit((circuit, full), "R2", "resistance", 6.)
+    assert_same(circuit, full, 1j, "g")
+    assert updates.stats()["updates"] == 1 and updates.stats()["factorizations"] == 1
@@ -0,0 +1,56 @@
+import numpy as np
+
+from circuit_simulator import montecarlo
+from conftest import close, multi, node_voltages
+
+NODES = ["a", "b", "c"]
+DISTRIBUTIONS = {("R1", "resistance"): montecarlo.uniform(0.05), ("C1", "capacitance"): montecarlo.gaussian(0.1)}
+
+def test_seed_fixes_variants():
+    circuit = multi()
+    first = circuit.monte_carlo("g", DISTRIBUTIONS, 16, seed=7)
+    second = circuit.monte_carlo("g", DISTRIBUTIONS, 16, seed=7)
+    other = circuit.monte_carlo("g", DISTRIBUTIONS, 16, seed=8)
+    for parameter in DISTRIBUTIONS:
+        assert np.array_equal(first.variants[parameter], second.variants[parameter])
+        assert not np.array_equal(first.variants[parameter], other.variants[parameter])
+    assert np.all(np.abs(first.variants[("R1", "resistance")] / 3 - 1) <= 0.05)
+    assert np.array_equal(first.solve(), second.solve())
+
+def test_variants_match_individual_solves(circuit):
+    sweep = circuit.monte_carlo("g", DISTRIBUTIONS, 5, seed=1)
+    solution = sweep.solve()
+    assert solution.shape == (5, circuit.n)
+    variants = [sweep.variants[parameter].real for parameter in DISTRIBUTIONS]
+    for i, (resistance, capacitance) in enumerate(zip(*variants)):
+        circuit.components["R1"].resistance = resistance
+        circuit.components["C1"].capacitance = capacitance
+        circuit.solve("g")
+        assert close([solution[i, circuit.terminals[node]] for node in NODES], node_voltages(circuit, NODES))
+
+def test_serial_and_workers_agree(backend):
+    circuit = multi()
+    circuit.backend = backend
+    sweep = circuit.monte_carlo("g", DISTRIBUTIONS, 12, seed=3)
+    s_values = 1j * np.logspace(-1, 1, 4)
+    serial = sweep.solve(s_values, excitation="I1", workers=1)
+    pooled = sweep.solve(s_values, excitation="I1", workers=2)
+    assert serial.shape == (12, 4, circuit.n)
+    assert close(pooled, serial, 1e-12)
+
+def test_parameter_sweep_grid():
+    circuit = multi()
+    sweep = circuit.parameter_sweep("g", {("R1", "resistance"): [1, 2, 3], ("R2", "resistance"): [4, 8]})
+    assert sweep.count == 6
+    assert np.array_equal(sweep.variants[("R2", "resistance")].real, [4, 8, 4, 8, 4, 8])
+
+def test_transfer_function_per_variant():
+    circuit = multi()
+    sweep = circuit.parameter_sweep("g", {("R3", "resistance"): [5, 10]})
+    s_values = 1j * np.logspace(-1, 1, 3)
+    ratio = sweep.transfer_function(s_values, ("I1", "Current"), ("R3", "Voltage"))
+    assert ratio.shape == (2, 3)
+    # The CCVS drives R3 directly, so its voltage does not depend on R3
+    assert close(ratio[0], ratio[1])
+    voltages = sweep.evaluate(s_values, [("R3", "Voltage"), ("R3", "Current")], excitation="I1")
+    assert close(voltages[1], voltages[0] / np.array([[5], [10]]))
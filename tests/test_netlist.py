@@ -0,0 +1,100 @@
+import pytest
+
+from circuit_simulator import Circuit, netlist
+from conftest import Capacitor, Inductor, Resistor, close
+
+def records(text: str, title: bool = True):
+    return {name: (kind, nodes, values) for kind, name, nodes, values in netlist.parse(text.splitlines(), title)}
+
+@pytest.mark.parametrize("token, expected", [
+    ("10", 10.0), ("4.7k", 4.7e3), ("2meg", 2e6), ("1M", 1e-3), ("3u", 3e-6),
+    ("10nF", 10e-9), ("5pF", 5e-12), ("1e3", 1e3), (".5", 0.5), ("2mil", 50.8e-6),
+])
+def test_value_suffixes(token: str, expected: float):
+    assert close(netlist.value(token), expected, 1e-12)
+
+def test_invalid_value():
+    with pytest.raises(ValueError, match="Invalid value"):
+        netlist.value("k10")
+
+def test_title_line():
+    text = "R1 a 0 10\nR2 a 0 20\n"
+    assert list(records(text)) == ["R2"]
+    assert list(records(text, title=False)) == ["R1", "R2"]
+
+def test_continuation_and_comments():
+    parsed = records("title\n* comment\nR1 a ; trailing\n+ 0 1k\n")
+    assert parsed["R1"] == (Resistor, {"positive": "a", "negative": "0"}, {"resistance": 1e3})
+
+def test_initial_conditions():
+    parsed = records("title\nC1 a 0 1u IC=2.5\nL1 a b 1m ic=-0.1\nC2 b 0 1n\n")
+    assert parsed["C1"][0] is Capacitor and parsed["C1"][2] == {"capacitance": 1e-6, "initial_voltage": 2.5}
+    assert parsed["L1"][0] is Inductor and parsed["L1"][2] == {"inductance": 1e-3, "initial_current": -0.1}
+    assert parsed["C2"][2]["initial_voltage"] == 0.0
+
+SUBCIRCUITS = """divider
+.subckt half in out
+R1 in out 1k
+R2 out 0 1k
+.ends
+V1 a 0 DC 8
+X1 a b half
+X2 b c half
+.end
+"""
+
+def test_subcircuit_expansion():
+    parsed = records(SUBCIRCUITS)
+    assert sorted(parsed) == ["V1", "X1.R1", "X1.R2", "X2.R1", "X2.R2"]
+    assert parsed["X1.R1"][1] == {"positive": "a", "negative": "b"}
+    assert parsed["X2.R2"][1] == {"positive": "c", "negative": "0"}
+
+def test_subcircuit_solve(tmp_path):
+    path = tmp_path / "divider.cir"
+    path.write_text(SUBCIRCUITS)
+    circuit = Circuit.from_netlist(str(path))
+    circuit.solve("0")
+    # X2 loads X1's output: b = 8 * (1k || 2k) / (1k + 1k || 2k), c = b / 2
+    b = 8 * (2e3 / 3) / (1e3 + 2e3 / 3)
+    assert close(circuit.voltages[circuit.terminals["b"], 0], b)
+    assert close(circuit.voltages[circuit.terminals["c"], 0], b / 2)
+
+def test_forward_references():
+    # The top-level instance and the instance inside the .subckt body both refer to
+    # subcircuits defined further down the file
+    parsed = records("""title
+X1 a 0 outer
+.subckt outer p n
+X9 p mid inner
+R1 mid n 2
+.ends
+.subckt inner p n
+R1 p n 1
+.ends
+""")
+    assert sorted(parsed) == ["X1.R1", "X1.X9.R1"]
+    assert parsed["X1.X9.R1"][1] == {"positive": "a", "negative": "X1.mid"}
+
+def test_nested_forward_reference_after_defined_outer():
+    # outer is already defined when X1 is read, but its body uses inner from later on
+    parsed = records("""title
+.subckt outer p n
+X9 p n inner
+.ends
+X1 a 0 outer
+.subckt inner p n
+R1 p n 1
+.ends
+""")
+    assert list(parsed) == ["X1.X9.R1"]
+
+@pytest.mark.parametrize("text, message", [
+    ("title\nX1 a 0 missing\n", "Line 2: Unknown subcircuit 'missing'"),
+    ("title\n.subckt loop p n\nX1 p n loop\n.ends\nX1 a 0 loop\n", "Line 5: .*instantiates itself"),
+    ("title\n.subckt one p n\nR1 p n 1\n.ends\nX1 a b c one\n", "connects 3 nodes"),
+    ("title\n.ends\n", ".ends without .subckt"),
+    ("title\nQ1 a b c model\n", "Unsupported card"),
+])
+def test_errors(text: str, message: str):
+    with pytest.raises(ValueError, match=message):
+        records(text)
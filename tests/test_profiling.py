@@ -0,0 +1,88 @@
+import json
+
+import numpy as np
+
+from circuit_simulator import profiling
+from conftest import close, multi, node_voltages
+
+def test_phases_and_events(circuit):
+    events = []
+    with circuit.profile(hooks=[events.append]) as profiler:
+        circuit.solve("g")
+        circuit.table()
+    assert profiling.active is None
+    assert events == profiler.events
+
+    phases = profiler.phases
+    for name in ["compile", "solve", "assemble", "factorize", "back_substitute", "gather", "dataframe"]:
+        assert phases[name]["calls"] >= 1, name
+    assert phases["solve"]["calls"] == 1
+    assert "condition" not in phases
+    assert phases["factorize"]["max_size"] > 0
+
+    solve = next(event for event in events if event.name == "solve")
+    assert solve.depth == 0 and solve.info["ground"] == "g"
+    assert solve.info["unknowns"] == circuit.n
+    # Nested phases finish first and sit one level deeper
+    nested = [event for event in events if event.name == "factorize"]
+    assert all(event.depth > solve.depth and solve.start <= event.start for event in nested)
+    assert solve.info["estimated_allocated"] >= sum(event.info.get("estimated_bytes", 0) for event in nested)
+
+def test_condition_estimates(circuit):
+    with circuit.profile(condition=True) as profiler:
+        circuit.solve("g")
+    assert profiler.phases["condition"]["calls"] >= 1
+    assert profiler.phases["condition"]["max_condition"] >= 1
+
+def test_trace_export(tmp_path):
+    circuit = multi()
+    with circuit.profile(trace=False) as untraced:
+        circuit.solve("g")
+    assert untraced.events == [] and untraced.phases["solve"]["calls"] == 1
+
+    with circuit.profile() as profiler:
+        circuit.solve("g", 2j)
+    path = tmp_path / "trace.json"
+    profiler.save(str(path))
+    trace = json.loads(path.read_text())["traceEvents"]
+    assert len(trace) == len(profiler.events) and all(event["ph"] == "X" for event in trace)
+    # Complex metadata is written as text so the file stays plain JSON
+    assert next(event for event in trace if event["name"] == "solve")["args"]["s"] == "2j"
+    assert "solve" in profiler.report()
+
+    profiler.reset()
+    assert profiler.events == [] and profiler.phases == dict()
+
+def test_no_op_outside_profile_block():
+    circuit = multi()
+    assert profiling.active is None
+    assert not profiling.phase("anything")
+    with profiling.phase("anything", size=3) as phase:
+        phase.note(size=4)
+    profiling.note(size=5)
+
+    circuit.solve("g")
+    expected = node_voltages(circuit, ["a", "b", "c"])
+    with circuit.profile() as profiler:
+        circuit.solve("g")
+    assert close(node_voltages(circuit, ["a", "b", "c"]), expected, 0)
+    # Nothing run after the block reaches the profiler
+    count = len(profiler.events)
+    circuit.solve("g")
+    assert len(profiler.events) == count
+
+def test_nested_profilers_restore_the_outer_one():
+    circuit = multi()
+    with circuit.profile() as outer:
+        with circuit.profile() as inner:
+            circuit.solve("g")
+        circuit.solve("g")
+    assert inner.phases["solve"]["calls"] == 1 and outer.phases["solve"]["calls"] == 1
+
+def test_enable_and_disable():
+    profiler = profiling.enable()
+    try:
+        multi().sweep("g", 1j * np.logspace(0, 1, 3), ("R1", "Current"))
+    finally:
+        assert profiling.disable() is profiler
+    assert profiler.phases["sweep"]["calls"] == 1
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from benchmarks.circuits import GENERATORS
+from circuit_simulator import Circuit, rational
+from circuit_simulator.components import Capacitor, Inductor, Resistor, VoltageSource
+from conftest import close
+
+def transfer(components, output):
+    circuit = Circuit()
+    circuit.add_components([VoltageSource("V1", "in", "0", 1.0)] + components)
+    return circuit.transfer_function("0", ("V1", "Voltage"), output)
+
+def sorted_roots(roots) -> np.ndarray:
+    return np.sort_complex(np.round(np.asarray(roots), 6))
+
+def test_rc_lowpass():
+    fitted = transfer([Resistor("R1", "in", "out", 1e3), Capacitor("C1", "out", "0", 1e-6)], ("C1", "Voltage")).rational()
+    assert close(fitted.poles, [-1e3])
+    assert fitted.zeros.size == 0
+    assert abs(fitted.gain - 1e3) < 1e-6
+    assert fitted.is_stable()
+
+def test_rc_highpass_has_a_zero_at_the_origin():
+    fitted = transfer([Capacitor("C1", "in", "out", 1e-6), Resistor("R1", "out", "0", 1e3)], ("R1", "Voltage")).rational()
+    assert close(fitted.poles, [-1e3])
+    assert fitted.zeros.size == 1 and abs(fitted.zeros[0]) < 1e-6
+
+def test_series_rlc_poles():
+    r, l, c = 10., 1e-3, 1e-6
+    fitted = transfer([Resistor("R1", "in", "a", r), Inductor("L1", "a", "out", l), Capacitor("C1", "out", "0", c)],
+                      ("C1", "Voltage")).rational()
+    assert close(sorted_roots(fitted.poles), sorted_roots(np.roots([l * c, r * c, 1])), 1e-6)
+    assert fitted.zeros.size == 0
+
+LADDERS = [("rc_ladder", 20, 19), ("rlc_ladder", 20, 18), ("rlc_ladder", 41, 40)]
+
+def ladder(name: str, nodes: int):
+    benchmark = GENERATORS[name](nodes)
+    return benchmark, benchmark.circuit.transfer_function(benchmark.ground, benchmark.input, benchmark.output).rational()
+
+@pytest.mark.parametrize("name, nodes, poles", LADDERS)
+def test_passive_ladders_are_stable(name, nodes, poles):
+    benchmark, fitted = ladder(name, nodes)
+    assert np.all(fitted.poles.real < 0)
+    assert fitted.is_stable()
+    assert close(fitted.f(benchmark.frequencies), benchmark.reference(benchmark.frequencies), 1e-8)
+
+@pytest.mark.parametrize("name, nodes, poles", LADDERS)
+def test_ladders_have_every_pole_and_no_zeros(name, nodes, poles):
+    # Exact poles come from a QZ eigensolve of the pencil
+    pytest.importorskip("scipy")
+    benchmark, fitted = ladder(name, nodes)
+    assert fitted.poles.size == poles
+    assert fitted.zeros.size == 0
+    # The pole/zero/gain form reproduces the response too
+    s = benchmark.frequencies
+    assert close(fitted.gain / np.prod(s[:, None] - fitted.poles, axis=1), benchmark.reference(s), 1e-6)
+
+def test_fit_without_known_poles():
+    # Samples alone: spurious poles with negligible residues are dropped
+    s = 1j * np.logspace(-2, 2, 80)
+    h = (s + 3) / ((s + 1) * (s + 2) * (s ** 2 + 0.2 * s + 4))
+    fitted = rational.fit(s, h, real=True)
+    assert close(sorted_roots(fitted.poles), sorted_roots([-1, -2, -0.1 + np.sqrt(3.99) * 1j, -0.1 - np.sqrt(3.99) * 1j]),
+                 1e-6)
+    assert close(fitted.zeros, [-3], 1e-6)
+    assert fitted.error < 1e-9
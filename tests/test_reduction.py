@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from benchmarks.circuits import GENERATORS
+from circuit_simulator.sweep import FrequencySweep
+
+def setup(name: str, nodes: int = 200):
+    benchmark = GENERATORS[name](nodes)
+    transfer = benchmark.circuit.transfer_function(benchmark.ground, benchmark.input, benchmark.output)
+    band = (abs(benchmark.frequencies[0]), abs(benchmark.frequencies[-1]))
+    return benchmark, transfer, band
+
+def true_error(benchmark, reduced, band) -> float:
+    s = 1j * np.logspace(np.log10(band[0]), np.log10(band[1]), 50)
+    full = FrequencySweep(benchmark.circuit, benchmark.ground, benchmark.input[0]).evaluate(s, [benchmark.output])[0]
+    model = reduced.model.evaluate(s, [benchmark.output])[0]
+    return float(np.max(np.abs(full - model)) / np.max(np.abs(full)))
+
+@pytest.mark.parametrize("name, order, tolerance", [("rc_ladder", 10, 1e-8), ("rc_ladder", 20, 1e-10),
+                                                     ("rlc_ladder", 10, 1e-8), ("rlc_ladder", 20, 1e-10),
+                                                     ("amplifier", 20, 1e-10)])
+def test_reduced_model_matches_full_solve(name, order, tolerance):
+    benchmark, transfer, band = setup(name)
+    reduced = transfer.reduce(order, band=band)
+    assert reduced.model.size <= order
+    assert true_error(benchmark, reduced, band) < tolerance
+    s = benchmark.frequencies
+    assert np.max(np.abs(reduced.f(s) - benchmark.reference(s))) < tolerance * np.max(np.abs(benchmark.reference(s)))
+
+@pytest.mark.parametrize("name", ["rc_ladder", "rlc_ladder", "amplifier"])
+@pytest.mark.parametrize("order", [5, 10, 20])
+def test_error_estimate_tracks_true_error(name, order):
+    benchmark, transfer, band = setup(name)
+    for reduced, measured in [(transfer.reduce(order, band=band), band), (transfer.reduce(order), None)]:
+        model = reduced.model
+        measured = measured or model.band
+        estimate = model.estimate_error(outputs=[benchmark.output])
+        actual = true_error(benchmark, reduced, measured)
+        assert actual / 10 - 1e-13 <= estimate <= 10 * actual + 1e-13
+
+def test_default_band_ends_at_the_expansion_point():
+    _, transfer, _ = setup("rc_ladder")
+    model = transfer.reduce(10).model
+    s0 = abs(model.expansion_points[0])
+    assert model.band == pytest.approx((s0 / 100, s0))
+
+def test_controlled_sources_are_exact_at_the_expansion_point():
+    # A one-sided projection of the non-symmetric pencil is not even exact at s0
+    benchmark, transfer, _ = setup("amplifier")
+    model = transfer.reduce(5).model
+    assert model.controlled
+    s0 = model.expansion_points[0]
+    full = FrequencySweep(benchmark.circuit, benchmark.ground, benchmark.input[0]).solve(np.array([s0]))
+    assert np.linalg.norm(model.solve(np.array([s0])) - full) < 1e-10 * np.linalg.norm(full)
@@ -0,0 +1,42 @@
+import numpy as np
+
+from conftest import close
+
+def baseline(circuit, name: str):
+    # Per-component evaluation as component_info did it before results() existed
+    component = circuit.components[name]
+    voltage = np.ravel(component.voltage(circuit.terminals, circuit.voltages))[0]
+    current = np.ravel(component.current(circuit.terminals, circuit.voltages))[0]
+    return [voltage, current, voltage * current]
+
+def test_results_match_component_formulas(circuit):
+    circuit.solve("g")
+    results = circuit.results()
+    assert results.names == list(circuit.components)
+    for name in circuit.components:
+        expected = baseline(circuit, name)
+        assert close([results[name, kind] for kind in ["Voltage", "Current", "Power"]], expected)
+        info = circuit.component_info(name)
+        assert info["Name"] == name
+        assert close([info["Voltage"], info["Current"], info["Power"]], expected)
+
+def test_table_rows(circuit):
+    circuit.solve("g")
+    table = circuit.table(["R1", "C1", "H1"])
+    assert list(table.columns) == ["Name", "Voltage", "Current", "Power"]
+    assert list(table["Name"]) == ["R1", "C1", "H1"]
+    for _, row in table.iterrows():
+        assert close([row["Voltage"], row["Current"], row["Power"]], baseline(circuit, row["Name"]))
+
+def test_sweep_results_match_single_solves(circuit):
+    s_values = 1j * np.logspace(-1, 1, 4)
+    names = ["R1", "C1", "L1", "R3"]
+    sweep = circuit.sweep_results("g", s_values, names)
+    assert sweep.voltage.shape == (4, len(names))
+    frame = sweep.frame("Current")
+    assert list(frame.columns) == names and frame.index.name == "s"
+    for i, s in enumerate(s_values):
+        circuit.solve("g", s)
+        for name in names:
+            assert close([sweep[name, kind][i] for kind in ["Voltage", "Current", "Power"]],
+                         baseline(circuit, name))
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from conftest import close
+from circuit_simulator.sweep import FrequencySweep
+
+S_VALUES = np.array([0.3j, 1 + 2j, 5j])
+
+def central_difference(circuit, parameters, evaluate, step: float = 1e-6) -> np.ndarray:
+    columns = []
+    for name, field in parameters:
+        component = circuit.components[name]
+        value = getattr(component, field)
+        h = step * abs(value)
+        setattr(component, field, value + h)
+        upper = evaluate()
+        setattr(component, field, value - h)
+        lower = evaluate()
+        setattr(component, field, value)
+        columns.append((upper - lower) / (2 * h))
+    return np.array(columns).T
+
+def assert_gradient(values: np.ndarray, expected: np.ndarray, rtol: float = 1e-6) -> None:
+    assert values.shape == expected.shape
+    assert np.max(np.abs(values - expected)) <= rtol * np.max(np.abs(expected))
+
+@pytest.mark.parametrize("output", [("R3", "Voltage"), ("R1", "Current"), ("C1", "Current"), ("L1", "Current"),
+                                    ("H1", "Voltage"), ("G1", "Current"), ("R2", "Power"), ("V2", "Current")])
+def test_circuit_sensitivity_matches_finite_differences(circuit, output):
+    result = circuit.sensitivity("g", output, S_VALUES)
+    evaluate = lambda: FrequencySweep(circuit, "g").evaluate(S_VALUES, [output])[0]
+
+    assert np.allclose(result.quantity, evaluate(), rtol=1e-12, atol=0)
+    assert_gradient(result.values, central_difference(circuit, result.parameters, evaluate))
+
+@pytest.mark.parametrize("input_node, output", [(("V2", "Voltage"), ("R3", "Voltage")),
+                                                (("I1", "Current"), ("L1", "Current"))])
+def test_transfer_function_sensitivity_matches_finite_differences(circuit, input_node, output):
+    transfer = circuit.transfer_function("g", input_node, output)
+    result = transfer.sensitivity(S_VALUES)
+    evaluate = lambda: circuit.transfer_function("g", input_node, output).f(S_VALUES)
+
+    assert np.allclose(result.quantity, evaluate(), rtol=1e-12, atol=0)
+    assert_gradient(result.values, central_difference(circuit, result.parameters, evaluate))
+
+def test_sensitivity_covers_every_parameter(circuit):
+    result = circuit.sensitivity("g", ("R3", "Voltage"), 2j)
+    assert set(result.parameters) == {("R1", "resistance"), ("R2", "resistance"), ("R3", "resistance"),
+                                      ("R4", "resistance"), ("C1", "capacitance"), ("L1", "inductance"),
+                                      ("G1", "transconductance"), ("H1", "transresistance")}
+    assert result["R3", "resistance"].shape == ()
+    assert len(result.frame().columns) == len(result.parameters)
+
+def test_backends_agree(circuit):
+    dense = circuit.sensitivity("g", ("R2", "Power"), S_VALUES)
+    circuit.backend = "sparse" if circuit.backend == "dense" else "dense"
+    pytest.importorskip("scipy")
+    other = circuit.sensitivity("g", ("R2", "Power"), S_VALUES)
+    assert other.parameters == dense.parameters
+    assert close(other.values, dense.values, 1e-10)
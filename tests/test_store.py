@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from circuit_simulator import Circuit
+from conftest import Capacitor, Resistor, VoltageSource, close
+
+def divider() -> Circuit:
+    circuit = Circuit()
+    circuit.add_components([
+        VoltageSource("V1", "a", "g", 1.0),
+        Resistor("R1", "a", "b", 10),
+        Resistor("R2", "b", "g", 15),
+        Resistor("R3", "a", "g", 5),
+    ])
+    return circuit
+
+def current(circuit: Circuit, name: str) -> complex:
+    return circuit.component_info(name)["Current"]
+
+def test_field_views_are_plain_scalars():
+    circuit = divider()
+    resistor = circuit.components["R1"]
+    assert type(resistor.resistance) is float and resistor.resistance == 10
+    assert type(resistor.s) is complex
+    assert resistor.positive == "a" and resistor.terminals == ["a", "b", "R1_internal_i"]
+    resistor.resistance = 20
+    assert circuit.components["R1"].resistance == 20
+
+def test_standalone_component_becomes_view():
+    resistor = Resistor("R9", "a", "g", 2)
+    circuit = divider()
+    circuit.add_component(resistor)
+    resistor.resistance = 4
+    assert circuit.components["R9"].resistance == 4
+
+def test_second_circuit_gets_a_copy():
+    first = divider()
+    second = Circuit()
+    second.add_component(first.components["R1"])
+    first.components["R1"].resistance = 30
+    assert second.components["R1"].resistance == 10
+    second.components["R1"].resistance = 40
+    assert first.components["R1"].resistance == 30
+
+def test_node_reassignment():
+    circuit = divider()
+    circuit.solve("g")
+    assert close(abs(current(circuit, "R1")), 0.04)
+
+    # R2 now hangs from a, leaving R1 with nothing to drive
+    circuit.components["R2"].positive = "a"
+    circuit.solve("g")
+    assert close(abs(current(circuit, "R1")), 0)
+    assert close(abs(current(circuit, "R2")), 1 / 15)
+
+    # A new node is interned like any other
+    circuit.components["R1"].negative = "c"
+    circuit.components["R3"].positive = "c"
+    circuit.solve("g")
+    assert "c" in circuit.real_terminals
+    assert close(abs(current(circuit, "R1")), 1 / 15)
+
+def test_internal_unknown_cannot_be_reconnected():
+    resistor = divider().components["R1"]
+    with pytest.raises(AttributeError, match="cannot be reconnected"):
+        resistor.x = "d"
+
+def test_same_name_overwrites():
+    circuit = divider()
+    circuit.add_component(Resistor("R1", "a", "b", 25))
+    assert len(circuit.components) == 4 and circuit.components["R1"].resistance == 25
+
+    circuit.add_component(Capacitor("R1", "a", "b", 1e-3, 0.0))
+    assert isinstance(circuit.components["R1"], Capacitor)
+    assert list(circuit.components) == ["V1", "R1", "R2", "R3"]
+    # Solved at the source's s = 1, so the capacitor conducts 1e-3 S
+    circuit.solve("g")
+    assert close(circuit.voltages[circuit.terminals["b"], 0], 1e-3 / (1e-3 + 1 / 15))
+
+def test_bulk_extend_matches_add():
+    records = [(Resistor, f"R{i}", {"positive": f"n{i}", "negative": f"n{i + 1}"}, {"resistance": float(i + 1)})
+               for i in range(50)]
+    bulk = Circuit()
+    bulk.store.extend(records, block=7)
+    single = Circuit()
+    single.add_components(Resistor(name, nodes["positive"], nodes["negative"], values["resistance"])
+                          for _, name, nodes, values in records)
+    assert list(bulk.components) == list(single.components)
+    assert dict(bulk.real_terminals) == dict(single.real_terminals)
+    assert np.array_equal([bulk.components[name].resistance for name in bulk.components],
+                          [single.components[name].resistance for name in single.components])
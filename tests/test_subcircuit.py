@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from circuit_simulator import Circuit, Subcircuit
+from circuit_simulator.components import Capacitor, CurrentSource, Inductor, Resistor, VoltageSource
+from conftest import close, node_voltages
+
+S_VALUES = 1j * np.logspace(2, 6, 25)
+NODES = ["a", "b", "n0", "n1", "n2"]
+
+def filter_parts(prefix: str = "", nodes=None, r2: float = 50.):
+    nodes = nodes or {}
+    node = lambda name: nodes.get(name, f"{name}{prefix}")
+    return [Resistor(f"R1{prefix}", node("in"), node("m"), 100.),
+            Capacitor(f"C1{prefix}", node("m"), node("gnd"), 1e-6),
+            Inductor(f"L1{prefix}", node("m"), node("out"), 1e-3),
+            Resistor(f"R2{prefix}", node("out"), node("gnd"), r2),
+            Capacitor(f"C2{prefix}", node("in"), node("out"), 2e-7)]
+
+def cascade(inner, backend: str) -> Circuit:
+    # Three filter sections in cascade, as subcircuit instances of inner or flattened in place
+    circuit = Circuit()
+    circuit.backend = backend
+    components = [VoltageSource("V1", "a", "0", 1.0), Resistor("Rs", "a", "b", 10.)]
+    previous = "b"
+    for k in range(3):
+        ports = {"in": previous, "out": f"n{k}", "gnd": "0"}
+        if inner is None:
+            components.extend(filter_parts(f"_{k}", ports))
+        else:
+            components.append(Subcircuit(f"X{k}", inner, ports))
+        previous = f"n{k}"
+    components += [Resistor("RL", previous, "0", 75.), CurrentSource("I1", "0", "n1", 0.01)]
+    circuit.add_components(components)
+    return circuit
+
+@pytest.fixture
+def pair(backend):
+    inner = Circuit()
+    inner.add_components(filter_parts())
+    return inner, cascade(inner, backend), cascade(None, backend)
+
+def test_solve_matches_flattened(pair):
+    _, nested, flat = pair
+    for s in [1e3j, 1e4 + 2e4j, 3e5j]:
+        nested.solve("0", s)
+        flat.solve("0", s)
+        assert close(node_voltages(nested, NODES), node_voltages(flat, NODES))
+        # The port current is the current into the instance's "in" terminal
+        port = flat.component_info("R1_1")["Current"] + flat.component_info("C2_1")["Current"]
+        assert close(nested.component_info("X1")["Current"], port)
+
+def test_sweep_and_transfer_function_match_flattened(pair):
+    _, nested, flat = pair
+    assert close(nested.sweep("0", S_VALUES, ("RL", "Voltage")), flat.sweep("0", S_VALUES, ("RL", "Voltage")))
+    transfer = [circuit.transfer_function("0", ("V1", "Voltage"), ("RL", "Voltage")) for circuit in (nested, flat)]
+    assert close(transfer[0].f(S_VALUES), transfer[1].f(S_VALUES))
+
+def test_edits_to_the_definition_reach_instances(pair, backend):
+    inner, nested, _ = pair
+    nested.solve("0", 1e4j)
+    inner.components["R2"].resistance = 60.
+    nested.solve("0", 1e4j)
+    flat = cascade(None, backend)
+    for k in range(3):
+        flat.components[f"R2_{k}"].resistance = 60.
+    flat.solve("0", 1e4j)
+    assert close(node_voltages(nested, NODES), node_voltages(flat, NODES))
+
+def test_nested_subcircuits_match_flattened():
+    leaf = Circuit()
+    leaf.add_components([Resistor("R", "p", "q", 2.), Capacitor("C", "q", "r", 1e-3), Inductor("L", "q", "r", 1e-2)])
+    middle = Circuit()
+    middle.add_components([Subcircuit("A", leaf, {"p": "x", "r": "z"}), Subcircuit("B", leaf, {"p": "y", "r": "z"}),
+                           Resistor("Rm", "x", "y", 5.)])
+    top = Circuit()
+    top.add_components([VoltageSource("V", "i", "0", 1.), Subcircuit("M", middle, {"x": "i", "y": "o", "z": "0"}),
+                        Resistor("RL", "o", "0", 10.)])
+    flat = Circuit()
+    flat.add_components([VoltageSource("V", "i", "0", 1.),
+                         Resistor("Ra", "i", "qa", 2.), Capacitor("Ca", "qa", "0", 1e-3), Inductor("La", "qa", "0", 1e-2),
+                         Resistor("Rb", "o", "qb", 2.), Capacitor("Cb", "qb", "0", 1e-3), Inductor("Lb", "qb", "0", 1e-2),
+                         Resistor("Rm", "i", "o", 5.), Resistor("RL", "o", "0", 10.)])
+    s_values = 1j * np.logspace(0, 4, 30)
+    assert close(top.sweep("0", s_values, ("RL", "Voltage")), flat.sweep("0", s_values, ("RL", "Voltage")))
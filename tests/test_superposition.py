@@ -0,0 +1,63 @@
+import typing
+
+import pytest
+
+from circuit_simulator import Circuit
+from circuit_simulator.components import (Capacitor, CurrentControlledVoltageSource, CurrentSource, Inductor, Resistor,
+                                          VoltageControlledCurrentSource, VoltageSource)
+from conftest import close, node_voltages
+
+NODES = ["b", "c", "d"]
+
+def network(sources: typing.Iterable[str], backend: str) -> Circuit:
+    # Three sources at different s. Each superposition term is solved with only its own source
+    # stamped, so the reference for a term is the network with the other sources left out
+    sources = set(sources)
+    circuit = Circuit()
+    circuit.backend = backend
+    circuit.add_components([
+        Resistor("R1", "a", "b", 3),
+        Capacitor("C1", "b", "g", 0.5),
+        Inductor("L1", "b", "c", 0.7),
+        Resistor("R2", "c", "g", 4),
+        VoltageControlledCurrentSource("G1", "c", "g", "b", "g", 0.1),
+        CurrentControlledVoltageSource("H1", "d", "g", "b", "c", 2.0),
+        Resistor("R3", "d", "g", 5),
+    ])
+    circuit.add_components([source for source in [VoltageSource("V1", "a", "g", 2.0),
+                                                  CurrentSource("I1", "g", "b", 1.5),
+                                                  CurrentSource("I2", "g", "c", 3.0)] if source.name in sources])
+    return circuit
+
+def test_sum_of_single_source_solves(backend):
+    names = ["V1", "I1", "I2"]
+    circuit = network(names, backend)
+    circuit.solve("g")
+    total = 0
+    for name in names:
+        alone = network([name], backend)
+        alone.solve("g")
+        total = total + node_voltages(alone, NODES)
+    assert close(node_voltages(circuit, NODES), total)
+
+@pytest.mark.parametrize("sweep", [None, 2j])
+def test_grouped_matches_per_source(circuit, sweep):
+    circuit.solve("g", sweep, grouped=True)
+    grouped = circuit.table()
+    circuit.solve("g", sweep, grouped=False)
+    separate = circuit.table()
+    for column in ["Voltage", "Current", "Power"]:
+        assert close(grouped[column].to_numpy(complex), separate[column].to_numpy(complex))
+
+def test_sources_sharing_s_are_superposed():
+    # Equal s puts both current sources in one group, solved as one multi-column right-hand side
+    circuit = network(["I1", "I2"], "dense")
+    circuit.components["I2"].s = 1.5
+    circuit.solve("g")
+    total = 0
+    for name in ["I1", "I2"]:
+        alone = network([name], "dense")
+        alone.components[name].s = 1.5
+        alone.solve("g")
+        total = total + node_voltages(alone, NODES)
+    assert close(node_voltages(circuit, NODES), total)
@@ -0,0 +1,25 @@
+import numpy as np
+from conftest import close
+
+S_VALUES = np.array([0.1j, 1j, 2 + 3j, 40j])
+
+def test_sweep_matches_per_point_solve(circuit):
+    output = ("R3", "Voltage")
+    swept = circuit.sweep("g", S_VALUES, output)
+    table = circuit.sweep_results("g", S_VALUES)
+    for i, s in enumerate(S_VALUES):
+        circuit.solve("g", s)
+        assert close(swept[i], circuit.component_info("R3")["Voltage"])
+        for name in circuit.components:
+            for kind in ["Voltage", "Current", "Power"]:
+                assert close(table[name, kind][i], circuit.component_info(name)[kind])
+
+def test_transfer_function_matches_per_point_solve(circuit):
+    transfer = circuit.transfer_function("g", ("V2", "Voltage"), ("R3", "Voltage"))
+    values = transfer.f(S_VALUES)
+    for i, s in enumerate(S_VALUES):
+        circuit.components["V2"].s = s
+        circuit.solve("g", s)
+        ratio = circuit.component_info("R3")["Voltage"] / circuit.component_info("V2")["Voltage"]
+        assert close(values[i], ratio)
+    assert isinstance(transfer.f(1j), complex)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from circuit_simulator import sweepfile
+from circuit_simulator.sweep import FrequencySweep
+from conftest import close
+
+NODES = ["a", "b", "c"]
+S_VALUES = 1j * np.logspace(-2, 2, 37)
+
+def test_stream_matches_sweep(circuit):
+    streamed = np.zeros(shape=(S_VALUES.size, len(NODES)), dtype=complex)
+    for offset, block in circuit.sweep_chunks("g", S_VALUES, NODES, chunk=5):
+        streamed[offset:offset + len(block)] = block
+    for i, s in enumerate(S_VALUES):
+        circuit.solve("g", s)
+        assert close(streamed[i], [circuit.voltages[circuit.terminals[node], 0] for node in NODES])
+
+def test_chunk_sizes_agree(circuit, tmp_path):
+    stored = [circuit.sweep_to_file("g", S_VALUES, str(tmp_path / f"chunk{chunk}"), NODES, chunk)
+              for chunk in [1, 5, 37, 100]]
+    for each in stored:
+        assert each.complete and each.values.shape == (S_VALUES.size, len(NODES))
+        assert close(each.values, stored[0].values)
+    assert np.array_equal(stored[0].s, S_VALUES)
+    assert np.array_equal(stored[0]["b"], stored[0].values[:, 1])
+
+def test_interrupted_run_resumes(circuit, tmp_path, monkeypatch):
+    path = str(tmp_path / "sweep")
+    solve = FrequencySweep.solve
+    calls = []
+
+    def interrupted(self, s_values):
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        calls.append(s_values.size)
+        return solve(self, s_values)
+
+    monkeypatch.setattr(FrequencySweep, "solve", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        circuit.sweep_to_file("g", S_VALUES, path, NODES, chunk=5)
+    partial = sweepfile.SweepFile(path)
+    assert partial.completed == 15 and not partial.complete
+
+    calls.clear()
+    monkeypatch.setattr(FrequencySweep, "solve", lambda self, s_values: calls.append(s_values.size) or solve(self, s_values))
+    resumed = circuit.sweep_to_file("g", S_VALUES, path, NODES, chunk=5)
+    # Only the chunks after the last complete one are solved again
+    assert sum(calls) == S_VALUES.size - 15 and resumed.complete
+    reference = circuit.sweep_to_file("g", S_VALUES, str(tmp_path / "reference"), NODES, chunk=5)
+    assert close(resumed.values, reference.values)
+
+    # A finished file is returned without solving anything
+    calls.clear()
+    assert circuit.sweep_to_file("g", S_VALUES, path, NODES, chunk=5).complete and not calls
+
+def test_changed_inputs_start_over(circuit, tmp_path):
+    path = str(tmp_path / "sweep")
+    first = circuit.sweep_to_file("g", S_VALUES, path, NODES, chunk=5)
+    signature = first.meta["signature"]
+    before = np.array(first.values)
+    del first
+
+    circuit.components["R2"].resistance = 8
+    edited = circuit.sweep_to_file("g", S_VALUES, path, NODES, chunk=5)
+    assert edited.meta["signature"] != signature and edited.complete
+    assert not close(edited.values, before)
+    for chunk, nodes in [(7, NODES), (5, ["a"])]:
+        assert circuit.sweep_to_file("g", S_VALUES, path, nodes, chunk).meta["signature"] != edited.meta["signature"]
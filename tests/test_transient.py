@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from circuit_simulator import Circuit
+from circuit_simulator.components import Capacitor, CurrentSource, Inductor, Resistor, VoltageSource
+
+TAU = 1e-3
+STEP = 1e-5
+TOLERANCE = {"backward_euler": 5e-3, "trapezoidal": 1e-4}
+
+def build(components, backend: str) -> Circuit:
+    circuit = Circuit()
+    circuit.backend = backend
+    circuit.add_components(components)
+    return circuit
+
+@pytest.mark.parametrize("method", sorted(TOLERANCE))
+def test_rc_step_response(backend, method):
+    circuit = build([VoltageSource("V1", "in", "0", 1.0), Resistor("R1", "in", "out", 1e3),
+                     Capacitor("C1", "out", "0", 1e-6)], backend)
+    t, v = circuit.transient("0", STEP, method).run(500, outputs=["out"])
+    assert np.max(np.abs(v[:, 0] - (1 - np.exp(-t / TAU)))) < TOLERANCE[method]
+
+@pytest.mark.parametrize("method", sorted(TOLERANCE))
+def test_rl_step_response(backend, method):
+    circuit = build([VoltageSource("V1", "in", "0", 2.0), Resistor("R1", "in", "a", 1.0),
+                     Inductor("L1", "a", "0", 1e-3)], backend)
+    t, i = circuit.transient("0", STEP, method).run(500, outputs=["L1_internal_i"])
+    assert np.max(np.abs(i[:, 0] - 2 * (1 - np.exp(-t / TAU)))) < 2 * TOLERANCE[method]
+
+def test_rc_discharge_from_initial_voltage(backend):
+    circuit = build([Resistor("R1", "out", "0", 1e3), Capacitor("C1", "out", "0", 1e-6, initial_voltage=2.0),
+                     CurrentSource("I1", "out", "0", 0.0)], backend)
+    t, v = circuit.transient("0", STEP).run(500, outputs=["out"])
+    assert np.max(np.abs(v[:, 0] - 2 * np.exp(-t / TAU))) < 2 * TOLERANCE["trapezoidal"]
+
+def test_rl_decay_from_initial_current(backend):
+    circuit = build([Resistor("R1", "a", "0", 1.0), Inductor("L1", "a", "0", 1e-3, initial_current=0.5),
+                     CurrentSource("I1", "a", "0", 0.0)], backend)
+    t, i = circuit.transient("0", STEP).run(500, outputs=["L1_internal_i"])
+    assert np.max(np.abs(i[:, 0] - 0.5 * np.exp(-t / TAU))) < TOLERANCE["trapezoidal"]
+
+    # The initial current is a source term in the Laplace domain too: I(s) = i0 L / (R + sL)
+    circuit.solve("0", sweep=1000.0)
+    assert abs(circuit.component_info("L1")["Current"] - 0.5 / (1000 + 1000)) < 1e-12
+
+def test_waveforms_and_streaming_agree():
+    circuit = build([VoltageSource("V1", "in", "0", 0), Resistor("R1", "in", "a", 10), Inductor("L1", "a", "b", 1e-3),
+                     Capacitor("C1", "b", "0", 1e-6)], "dense")
+    w = 2 * np.pi * 1e3
+    transient = circuit.transient("0", 1e-6)
+    t, v = transient.run(2000, {"V1": lambda t: np.sin(w * t)}, ["b"])
+    _, sampled = transient.run(2000, {"V1": np.sin(w * np.arange(2001) * 1e-6)}, ["b"])
+    assert np.allclose(sampled, v, rtol=0, atol=1e-12)
+
+    chunks = list(transient.stream(2000, {"V1": lambda t: np.sin(w * t)}, ["b"], chunk=777))
+    assert len(chunks) == 3
+    assert np.allclose(np.concatenate([times for times, _ in chunks]), t, rtol=0, atol=0)
+    assert np.allclose(np.concatenate([values for _, values in chunks]), v, rtol=0, atol=1e-12)